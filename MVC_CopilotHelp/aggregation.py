@@ -0,0 +1,144 @@
+"""Time-bucketed statistics (1 min / 1 hour / 1 day means etc.) of the loaded data.
+
+Every row gets the start of its bucket as an integer code (time floored to the
+bucket size), and each column is reduced with one vectorized groupby over those
+codes. Results are kept per bucket size and segment filter, per column. Appending
+rows only recomputes the buckets the new rows fall into (usually the last partial
+bucket plus the new ones); replacing the data or recalculating a column drops the
+affected results.
+
+Example:
+    aggregator = TimeAggregator(constants.data_store)
+    hourly = aggregator.aggregate(['Bscat (1/Mm)', 'Babs (1/Mm)'], '1h')
+    hourly['Bscat (1/Mm)', 'mean']
+"""
+import numpy as np
+import pandas as pd
+
+from pax_model import get_time_axis, segment_mask
+
+aggregation_stats = ('mean', 'median', 'min', 'max', 'std', 'count')
+
+#Bucket code of rows without a time or outside the segment filter
+_excluded = np.iinfo(np.int64).min
+
+class _BucketTable:
+    """Bucket codes of every row and the per-column results for one bucket size and segment filter."""
+    def __init__(self, step):
+        self.step = step
+        self.rows = 0
+        self.codes = np.empty(0, dtype=np.int64)
+        self.results = {}  # column -> DataFrame indexed by bucket code, one column per statistic
+
+class TimeAggregator:
+    """
+    Bucketed statistics of a DataStore's data, cached per bucket size and kept current
+    through the store's change notifications.
+    """
+    def __init__(self, store):
+        self.store = store
+        self._tables = {}  # (rule, segment_filter) -> _BucketTable
+        store.subscribe(self._on_data_change)
+
+    def aggregate(self, columns, rule, segment_filter=None):
+        """
+        Statistics of the given columns per time bucket.
+
+        Parameters:
+        - columns: Numeric column names
+        - rule: Bucket size, e.g. '1min', '1h', '1D' (see constants.aggregation_levels)
+        - segment_filter: Optional Mode segment filter; rows outside it are left out
+
+        Returns:
+        - DataFrame indexed by bucket start time, with (column, statistic) columns
+          for every statistic in aggregation_stats; buckets without rows are absent
+        """
+        df = self.store.df
+        table = self._table(rule, segment_filter)
+        missing = [column for column in columns if column not in table.results]
+        if missing:
+            for column in missing:
+                if not pd.api.types.is_numeric_dtype(df[column]):
+                    raise ValueError(f"'{column}' is not numeric and cannot be aggregated")
+            rows = np.flatnonzero(table.codes != _excluded)
+            table.results.update(self._reduce(df, missing, rows, table.codes[rows]))
+
+        result = pd.concat({column: table.results[column] for column in columns}, axis=1)
+        result.index = pd.DatetimeIndex(result.index.to_numpy().astype('datetime64[ns]'), name='time')
+        return result
+
+    def series(self, column, rule, stat='mean', segment_filter=None):
+        """One statistic of one column per bucket, as a Series indexed by bucket start time."""
+        return self.aggregate([column], rule, segment_filter)[column, stat]
+
+    def clear(self):
+        self._tables.clear()
+
+    def _table(self, rule, segment_filter):
+        """The bucket table for rule/segment_filter, brought up to date with appended rows."""
+        key = (rule, segment_filter)
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = _BucketTable(pd.Timedelta(rule).value)
+        df = self.store.df
+        if table.rows == len(df):
+            return table
+
+        codes = self._codes(df, table.step, segment_filter)
+        if len(df) < table.rows:
+            table.results.clear()  # Fewer rows than before without a replace notification; start over
+        first_row = min(table.rows, len(df))
+        old = table.codes
+        table.codes, table.rows = codes, len(df)
+        if not table.results:
+            return table
+
+        # Buckets touched by the new rows, or by old rows whose segment changed (a Mode
+        # segment can end differently once more rows are known), are recomputed; the rest is kept
+        changed = np.flatnonzero(codes[:first_row] != old)
+        touched = np.concatenate([codes[first_row:], codes[changed], old[changed]])
+        touched = touched[touched != _excluded]
+        if not len(touched):
+            return table
+        first_bucket = touched.min()
+        rows = np.flatnonzero(codes >= first_bucket)
+        fresh = self._reduce(df, list(table.results), rows, codes[rows])
+        for column, result in table.results.items():
+            table.results[column] = pd.concat([result[result.index < first_bucket], fresh[column]])
+        print(f"📅 Updated {rule} buckets from {pd.Timestamp(first_bucket)} ({len(rows):,} rows)")
+        return table
+
+    @staticmethod
+    def _codes(df, step, segment_filter):
+        """Bucket code (bucket start in ns since the epoch) of every row."""
+        epoch_ns = get_time_axis(df)['epoch_ns'] if 'time' in df.columns else None
+        if epoch_ns is None:
+            raise ValueError("Time buckets need a date/time 'time' column")
+        codes = epoch_ns - epoch_ns % step
+        codes[epoch_ns == np.iinfo(np.int64).min] = _excluded  # NaT
+        mask = segment_mask(df, segment_filter)
+        if mask is not None:
+            codes[~mask] = _excluded
+        return codes
+
+    @staticmethod
+    def _reduce(df, columns, rows, codes):
+        """
+        Statistics per bucket for the given rows, one groupby for all columns.
+
+        Returns:
+        - dict of column -> DataFrame indexed by bucket code
+        """
+        frame = pd.DataFrame({column: df[column].to_numpy(dtype=float)[rows] for column in columns})
+        reduced = frame.groupby(codes, sort=True).agg(list(aggregation_stats))
+        return {column: reduced[column] for column in columns}
+
+    def _on_data_change(self, change):
+        if change.kind == 'append' and not change.restored:
+            return  # New rows are folded in by _table() on the next request
+        if change.rows_changed or 'time' in change.columns or 'Mode' in change.columns:
+            self._tables.clear()
+            return
+        for table in self._tables.values():
+            for column in change.columns:
+                table.results.pop(column, None)
@@ -0,0 +1,362 @@
+"""Vectorized decoding of the PAX Alarm column.
+
+Each Alarm entry is a string with one 'r'/'y'/'g' character per channel, in
+pax_config.alarm_names order. Only the distinct strings are decoded (a run usually
+has a handful); every row then just looks up its packed red and yellow bitmasks.
+"""
+import numpy as np
+import pandas as pd
+
+from pax_config import alarm_names
+from segments import find_runs
+
+class AlarmTimeline:
+    """
+    Packed per-row alarm state: bit k of red[i] / yellow[i] is set when channel k
+    (alarm_names[k]) was red / yellow on row i.
+    """
+    def __init__(self, alarm_values, channel_names=None):
+        self.channel_names = list(alarm_names if channel_names is None else channel_names)
+        n_channels = len(self.channel_names)
+        if n_channels > 64:
+            raise ValueError(f"{n_channels} alarm channels do not fit in a 64-bit mask")
+
+        # Decode each distinct alarm string once; codes are -1 for missing values
+        codes, uniques = pd.factorize(pd.Series(alarm_values, dtype=object), sort=False)
+        texts = [str(text).strip().lower()[:n_channels].ljust(n_channels, 'g') for text in uniques]
+        chars = np.frombuffer(''.join(texts).encode('ascii', errors='replace'), dtype=np.uint8).reshape(len(texts), n_channels)
+        bit_values = np.left_shift(np.uint64(1), np.arange(n_channels, dtype=np.uint64))
+
+        # One extra all-clear entry at the end for missing values (code -1)
+        unique_red = np.zeros(len(texts) + 1, dtype=np.uint64)
+        unique_yellow = np.zeros(len(texts) + 1, dtype=np.uint64)
+        unique_red[:-1] = np.where(chars == ord('r'), bit_values, np.uint64(0)).sum(axis=1, dtype=np.uint64)
+        unique_yellow[:-1] = np.where(chars == ord('y'), bit_values, np.uint64(0)).sum(axis=1, dtype=np.uint64)
+
+        self.red = unique_red[codes]
+        self.yellow = unique_yellow[codes]
+        self.length = len(codes)
+
+    @classmethod
+    def from_df(cls, df, column='Alarm'):
+        """Decode the Alarm column of a DataFrame (KeyError if it is missing)."""
+        return cls(df[column].to_numpy())
+
+    def _masks(self, color):
+        if color == 'red':
+            return self.red
+        if color == 'yellow':
+            return self.yellow
+        raise ValueError(f"Unknown alarm color: {color} (use 'red' or 'yellow')")
+
+    def channel_index(self, channel):
+        """Bit position of a channel, by name or index."""
+        return channel if isinstance(channel, (int, np.integer)) else self.channel_names.index(channel)
+
+    def channel_flags(self, channel, color='red'):
+        """
+        Boolean array: rows where the channel had the given color. A name shared by
+        several channels (e.g. 'Reserved') matches any of them.
+        """
+        if isinstance(channel, (int, np.integer)):
+            bits = np.uint64(1) << np.uint64(channel)
+        else:
+            positions = [k for k, name in enumerate(self.channel_names) if name == channel]
+            if not positions:
+                raise ValueError(f"Unknown alarm channel: {channel}")
+            bits = np.uint64(sum(1 << k for k in positions))
+        return (self._masks(color) & bits) != 0
+
+    def rows_in_alarm(self, color='red'):
+        """Boolean array: rows where any channel had the given color."""
+        return self._masks(color) != 0
+
+    def channels_in_alarm(self, color='red'):
+        """Names of the channels that had the given color at least once."""
+        seen = int(np.bitwise_or.reduce(self._masks(color))) if self.length else 0
+        return list(dict.fromkeys(name for k, name in enumerate(self.channel_names) if (seen >> k) & 1))
+
+    def intervals(self, channel, color='red'):
+        """
+        Row ranges where a channel had the given color.
+
+        Returns:
+        - List of (start, stop) tuples, stop exclusive
+        """
+        return find_runs(self.channel_flags(channel, color))
+
+    def summary(self, color='red', time=None):
+        """
+        Which channels had the given color, and when.
+
+        Parameters:
+        - color: 'red' or 'yellow'
+        - time: Optional array of row times, used for the first/last columns
+
+        Returns:
+        - DataFrame with one row per affected channel: channel, rows, episodes, first, last
+        """
+        records = []
+        for name in self.channels_in_alarm(color):
+            runs = self.intervals(name, color)
+            first, last = runs[0][0], runs[-1][1] - 1
+            records.append({
+                'channel': name,
+                'rows': sum(stop - start for start, stop in runs),
+                'episodes': len(runs),
+                'first': time[first] if time is not None else first,
+                'last': time[last] if time is not None else last,
+            })
+        return pd.DataFrame(records, columns=['channel', 'rows', 'episodes', 'first', 'last'])
+
+#Pseudo-channel name for "any channel" intervals in AlarmIntervalIndex
+any_channel = '*'
+
+class AlarmIntervalIndex:
+    """
+    Alarm episodes stored as sorted (start, end) intervals per channel and severity,
+    instead of one alarm string per row.
+
+    Times are int64 nanoseconds since the epoch when the data has a datetime 'time'
+    column, otherwise row positions. An episode ends one sample after its last row.
+    Because the intervals of one channel never overlap, both starts and ends are
+    sorted, so lookups are binary searches and durations come from a prefix sum:
+    - first_after: O(log n)
+    - intervals in a window: O(log n + k)
+    - total_duration / daily_totals: O(log n) per window
+    Rows are indexed in time order, whatever their order in the data. Rows newer than
+    every indexed one can be appended with extend() without re-decoding the old ones.
+    """
+    severities = ('red', 'yellow')
+
+    def __init__(self, channel_names=None, step=None):
+        self.channel_names = list(alarm_names if channel_names is None else channel_names)
+        self.step = step
+        self.length = 0
+        self.uses_time = None
+        self._last_time = None  # Time of the newest indexed row
+        self._open = set()  # Keys whose last episode runs up to the newest indexed row
+        self._intervals = {}  # (channel name or any_channel, severity) -> dict of arrays
+
+    @classmethod
+    def from_df(cls, df, column='Alarm'):
+        """Build the index from a DataFrame's Alarm (and time) columns."""
+        index = cls()
+        index.extend(df[column].to_numpy(), df_times(df))
+        return index
+
+    def can_extend(self, times=None):
+        """
+        Return True if rows with these times can be appended with extend(): they must all
+        come after the last indexed row. Rows from earlier (e.g. the previous day's file
+        appended after today's) need a rebuild with from_df on the combined data.
+        """
+        if self.length == 0 or times is None or len(times) == 0:
+            return True
+        return bool(np.asarray(times, dtype=np.int64).min() > self._last_time)
+
+    def extend(self, alarm_values, times=None):
+        """
+        Append rows (e.g. a newly concatenated file) to the index. Episodes that were
+        still open at the old last row are continued if the new rows start in alarm.
+        Rows whose times are out of order are indexed in time order; their row ranges
+        then cover every row of the episode.
+
+        Parameters:
+        - alarm_values: Alarm strings of the new rows
+        - times: int64 ns times of the new rows, or None to use row positions
+        """
+        offset = self.length
+        if self.uses_time is None:
+            self.uses_time = times is not None
+        elif self.uses_time != (times is not None):
+            raise ValueError("Appended rows must use the same time axis (datetime or row position) as the index")
+        alarm_values = np.asarray(alarm_values, dtype=object)
+        if times is None:
+            times = np.arange(offset, offset + len(alarm_values), dtype=np.int64)
+        times = np.asarray(times, dtype=np.int64)
+        if not self.can_extend(times):
+            raise ValueError("Appended rows start before the last indexed row; rebuild the index with from_df")
+
+        # Episodes must be built in time order; keep each sorted row's original position
+        positions = np.arange(offset, offset + len(times), dtype=np.int64)
+        if len(times) > 1 and np.any(np.diff(times) < 0):
+            order = np.argsort(times, kind='stable')
+            times, alarm_values, positions = times[order], alarm_values[order], positions[order]
+        timeline = AlarmTimeline(alarm_values, self.channel_names)
+
+        if self.step is None and len(times) > 1:
+            self.step = int(np.median(np.diff(times)))
+        step = self.step or 1
+
+        open_keys = set()
+        for severity in self.severities:
+            flags_by_channel = [(name, timeline.channel_flags(name, severity)) for name in timeline.channels_in_alarm(severity)]
+            flags_by_channel.append((any_channel, timeline.rows_in_alarm(severity)))
+            for name, flags in flags_by_channel:
+                runs = np.array(find_runs(flags), dtype=np.int64).reshape(-1, 2)
+                if len(runs):
+                    key = (name, severity)
+                    rows = np.array([(positions[a:b].min(), positions[a:b].max() + 1) for a, b in runs], dtype=np.int64)
+                    self._append(key, rows, times[runs[:, 0]], times[runs[:, 1] - 1] + step,
+                                 continues=runs[0, 0] == 0 and key in self._open)
+                    if runs[-1, 1] == timeline.length:
+                        open_keys.add(key)
+
+        if timeline.length:
+            self._last_time = int(times[-1])
+            self._open = open_keys
+        self.length += timeline.length
+
+    def _append(self, key, rows, starts, ends, continues):
+        old = self._intervals.get(key)
+        if old is not None:
+            # Continue an episode that ran to the end of the previous rows
+            if continues:
+                old['start_row'][-1] = min(old['start_row'][-1], rows[0, 0])
+                old['stop_row'][-1] = max(old['stop_row'][-1], rows[0, 1])
+                old['end'][-1] = ends[0]
+                rows, starts, ends = rows[1:], starts[1:], ends[1:]
+            rows = np.concatenate((np.column_stack((old['start_row'], old['stop_row'])), rows))
+            starts = np.concatenate((old['start'], starts))
+            ends = np.concatenate((old['end'], ends))
+        self._intervals[key] = {
+            'start_row': rows[:, 0].copy(),
+            'stop_row': rows[:, 1].copy(),
+            'start': starts,
+            'end': ends,
+            'elapsed': np.concatenate(([0], np.cumsum(ends - starts))),  # Total duration before each episode
+        }
+
+    def _get(self, channel, severity):
+        if severity not in self.severities:
+            raise ValueError(f"Unknown alarm severity: {severity} (use 'red' or 'yellow')")
+        return self._intervals.get((channel, severity))
+
+    def _time_key(self, t):
+        """Convert a timestamp (or row position) to the index's integer time unit."""
+        if t is None:
+            return None
+        if self.uses_time:
+            return int(pd.Timestamp(t).value) if not isinstance(t, (int, np.integer)) else int(t)
+        return int(t)
+
+    def channels(self, severity='red'):
+        """Channels with at least one episode of the given severity."""
+        return [name for name in self.channel_names if (name, severity) in self._intervals]
+
+    def first_after(self, channel, severity, t):
+        """
+        First episode of a channel that starts at or after t, e.g. the first red
+        Q factor after a time.
+
+        Returns:
+        - (start, end) in index time units, or None
+        """
+        data = self._get(channel, severity)
+        if data is None:
+            return None
+        i = int(np.searchsorted(data['start'], self._time_key(t), side='left'))
+        if i == len(data['start']):
+            return None
+        return int(data['start'][i]), int(data['end'][i])
+
+    def active_at(self, channel, severity, t):
+        """Return True if the channel was in the given alarm state at time t."""
+        data = self._get(channel, severity)
+        if data is None:
+            return False
+        t = self._time_key(t)
+        i = int(np.searchsorted(data['start'], t, side='right')) - 1
+        return i >= 0 and t < data['end'][i]
+
+    def intervals(self, channel, severity, t0=None, t1=None):
+        """
+        Episodes overlapping [t0, t1) (everything when not given).
+
+        Returns:
+        - starts, ends: int64 arrays in index time units
+        """
+        data = self._get(channel, severity)
+        if data is None:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        lo = 0 if t0 is None else int(np.searchsorted(data['end'], self._time_key(t0), side='right'))
+        hi = len(data['start']) if t1 is None else int(np.searchsorted(data['start'], self._time_key(t1), side='left'))
+        return data['start'][lo:hi], data['end'][lo:hi]
+
+    def row_intervals(self, channel, severity):
+        """
+        Row ranges of every episode, for drawing on a row-based time axis.
+
+        Returns:
+        - start_rows, stop_rows: int64 arrays, stop exclusive
+        """
+        data = self._get(channel, severity)
+        if data is None:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        return data['start_row'], data['stop_row']
+
+    def _elapsed_before(self, data, t):
+        """Total alarm duration before each time in t (vectorized)."""
+        t = np.asarray(t, dtype=np.int64)
+        i = np.searchsorted(data['start'], t, side='right') - 1
+        inside = np.clip(t - data['start'][np.maximum(i, 0)], 0, (data['end'] - data['start'])[np.maximum(i, 0)])
+        return np.where(i >= 0, data['elapsed'][np.maximum(i, 0)] + inside, 0)
+
+    def total_duration(self, channel, severity, t0=None, t1=None):
+        """Total time (index units) the channel spent in the given state within [t0, t1)."""
+        data = self._get(channel, severity)
+        if data is None:
+            return 0
+        t0 = data['start'][0] if t0 is None else self._time_key(t0)
+        t1 = data['end'][-1] if t1 is None else self._time_key(t1)
+        before = self._elapsed_before(data, [t0, t1])
+        return int(before[1] - before[0])
+
+    def daily_totals(self, severity='yellow'):
+        """
+        Hours per channel per calendar day in the given state (datetime data only).
+
+        Returns:
+        - DataFrame indexed by day with one column per affected channel
+        """
+        if not self.uses_time:
+            raise ValueError("Daily totals need a datetime 'time' column")
+        names = self.channels(severity)
+        if not names:
+            return pd.DataFrame()
+        day_ns = 86400 * 10**9
+        first = min(self._intervals[(n, severity)]['start'][0] for n in names) // day_ns * day_ns
+        last = max(self._intervals[(n, severity)]['end'][-1] for n in names)
+        edges = np.arange(first, last + day_ns, day_ns, dtype=np.int64)
+        totals = {name: np.diff(self._elapsed_before(self._intervals[(name, severity)], edges)) / 3.6e12 for name in names}
+        return pd.DataFrame(totals, index=pd.to_datetime(edges[:-1]).date)
+
+    def events(self, severity=None):
+        """
+        All episodes as a table sorted by start: channel, severity, start, end, duration.
+        """
+        frames = []
+        for (name, sev), data in self._intervals.items():
+            if name == any_channel or (severity is not None and sev != severity):
+                continue
+            frames.append(pd.DataFrame({
+                'channel': name,
+                'severity': sev,
+                'start': data['start'],
+                'end': data['end'],
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['channel', 'severity', 'start', 'end', 'duration'])
+        events = pd.concat(frames, ignore_index=True).sort_values('start', kind='stable', ignore_index=True)
+        if self.uses_time:
+            events['start'] = pd.to_datetime(events['start'])
+            events['end'] = pd.to_datetime(events['end'])
+        events['duration'] = events['end'] - events['start']
+        return events
+
+def df_times(df):
+    """int64 ns times of a DataFrame's datetime 'time' column, or None (row positions are used then)."""
+    if 'time' not in df.columns or not np.issubdtype(df['time'].dtype, np.datetime64):
+        return None
+    return df['time'].to_numpy().astype('datetime64[ns]').view('int64')
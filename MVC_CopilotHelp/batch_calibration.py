@@ -0,0 +1,210 @@
+"""Headless batch calibration of many PAX files from a manifest.
+
+Each manifest row names a file, the calibration mode, the I0 and calibration
+regions (row indices, as on the GUI sliders) and the filters. Rows run in parallel
+worker processes and the results go into one table.
+
+Manifest columns (CSV or .xlsx):
+    file, mode, i0_low, i0_high, calib_low, calib_high, min, max, percent
+and optionally segment_filter (e.g. "Sampling only", see pax_config.segment_filters).
+Relative file paths are resolved against the manifest's folder. Leave the I0 or
+calibration cells empty to use the best region found by segments.py.
+
+Example:
+    python batch_calibration.py weekly_manifest.csv --out calibration_results.csv --workers 8
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from pax_model import PAXModel, pax_filename_pattern
+
+manifest_columns = ['file', 'mode', 'i0_low', 'i0_high', 'calib_low', 'calib_high', 'min', 'max', 'percent', 'segment_filter']
+
+#Column order of the results table
+result_columns = [
+    'file', 'serial', 'mode', 'status',
+    'i0_low', 'i0_high', 'i0_baseline', 'extinction_column', 'calib_low', 'calib_high', 'region_source',
+    'min', 'max', 'percent', 'segment_filter',
+    'slope', 'intercept', 'r2', 'p_value', 'std_err',
+    'initial_points', 'after_percent', 'final_points', 'retention_pct',
+    'issues', 'recommendations', 'error',
+]
+
+def read_manifest(manifest_path):
+    """
+    Read a calibration manifest into a list of job dicts.
+
+    Returns:
+    - jobs: One dict per manifest row, with 'file' made absolute
+    """
+    if manifest_path.lower().endswith('.xlsx'):
+        manifest = pd.read_excel(manifest_path)
+    else:
+        manifest = pd.read_csv(manifest_path)
+    manifest.columns = [str(c).strip().lower() for c in manifest.columns]
+
+    missing = [c for c in ('file', 'mode') if c not in manifest.columns]
+    if missing:
+        raise ValueError(f"Manifest is missing required column(s): {missing}")
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for _, row in manifest.iterrows():
+        job = {c: (None if c not in manifest.columns or pd.isna(row[c]) else row[c]) for c in manifest_columns}
+        job['file'] = os.path.join(base_dir, str(job['file']))
+        job['mode'] = str(job['mode']).strip().capitalize()
+        for key in ('i0_low', 'i0_high', 'calib_low', 'calib_high'):
+            if job[key] is not None:
+                job[key] = int(job[key])
+        job['min'] = 0.0 if job['min'] is None else float(job['min'])
+        job['max'] = 100.0 if job['max'] is None else float(job['max'])
+        job['percent'] = 10.0 if job['percent'] is None else float(job['percent'])
+        jobs.append(job)
+    return jobs
+
+def calibrate_job(job, verbose=False):
+    """
+    Worker job: load one file, build the extinction column from its I0 region and
+    run the calibration regression on that column (PAXModel.load, add_extinction,
+    calibrate), so the fit always uses the reported I0 baseline.
+
+    Returns:
+    - result: dict with the keys in result_columns
+    """
+    match = pax_filename_pattern.search(os.path.basename(job['file']))
+    result = {c: None for c in result_columns}
+    result.update({
+        'file': job['file'],
+        'serial': match.group('serial') if match else None,
+        'mode': job['mode'],
+        'min': job['min'],
+        'max': job['max'],
+        'percent': job['percent'],
+        'segment_filter': job['segment_filter'],
+        'region_source': 'manifest',
+        'status': 'failed',
+    })
+
+    # The processing functions log every step; keep the worker output readable
+    log_target = sys.stdout if verbose else io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log_target):
+            model = PAXModel()
+            model.load(job['file'])
+            df = model.df
+
+            i0_low, i0_high = job['i0_low'], job['i0_high']
+            calib_low, calib_high = job['calib_low'], job['calib_high']
+            if i0_low is None or i0_high is None or calib_low is None or calib_high is None:
+                from segments import find_calibration_candidates, find_i0_candidates
+                result['region_source'] = 'auto'
+            if i0_low is None or i0_high is None:
+                i0_candidates = find_i0_candidates(df)
+                if not i0_candidates:
+                    raise ValueError("No particle-free region found for I0; set i0_low/i0_high in the manifest")
+                i0_low, i0_high = i0_candidates[0]['start'], i0_candidates[0]['stop']
+            result['i0_low'], result['i0_high'] = i0_low, i0_high
+
+            extinction = model.add_extinction(i0_low, i0_high)
+            result['i0_baseline'] = extinction.i0_baseline
+            df = model.df
+
+            if calib_low is None or calib_high is None:
+                calib_candidates = find_calibration_candidates(df, job['mode'], extinction.column)
+                if not calib_candidates:
+                    raise ValueError("No calibration region found; set calib_low/calib_high in the manifest")
+                calib_low, calib_high = calib_candidates[0]['start'], calib_candidates[0]['stop']
+            result['calib_low'], result['calib_high'] = calib_low, calib_high
+
+            # Fit the column built from this I0 region, even if the file has 'Debug Ext Calculation'
+            fit = model.calibrate(calib_low, calib_high, job['min'], job['max'], job['percent'], job['mode'],
+                                  segment_filter=job['segment_filter'], ext_column=extinction.column)
+
+        counts = fit.step_counts
+        result.update({
+            'status': 'ok' if not fit.issues else 'warning',
+            'extinction_column': fit.ext_column,
+            'slope': fit.slope,
+            'intercept': fit.intercept,
+            'r2': fit.r2,
+            'p_value': fit.p_value,
+            'std_err': fit.std_err,
+            'initial_points': counts.get('initial'),
+            'after_percent': counts.get('after_percent'),
+            'final_points': fit.count,
+            'retention_pct': fit.count / counts['initial'] * 100 if counts.get('initial') else None,
+            'issues': '; '.join(fit.issues),
+            'recommendations': '; '.join(fit.recommendations),
+        })
+    except Exception as e:
+        result['error'] = str(e)
+        debug_info = getattr(e, 'debug_info', None)  # CalibrationError: what the analysis found before failing
+        if debug_info:
+            result['issues'] = '; '.join(debug_info['issues'])
+            result['recommendations'] = '; '.join(debug_info['recommendations'])
+    return result
+
+def run_batch_calibration(jobs, workers=None, verbose=False):
+    """
+    Run every manifest job in a pool of worker processes.
+
+    Returns:
+    - results: DataFrame with one row per job, in manifest order
+    """
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(calibrate_job, job, verbose): i for i, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {c: None for c in result_columns}
+                result.update({'file': jobs[i]['file'], 'mode': jobs[i]['mode'], 'status': 'failed', 'error': str(e)})
+            results[i] = result
+
+            name = os.path.basename(jobs[i]['file'])
+            if result['status'] == 'failed':
+                print(f"❌ [{done}/{len(jobs)}] {name} ({jobs[i]['mode']}): {result['error']}")
+            else:
+                status = "✅" if result['status'] == 'ok' else "⚠️"
+                print(f"{status} [{done}/{len(jobs)}] {name} ({jobs[i]['mode']}): slope {result['slope']:.4f}, R² {result['r2']:.4f}, {result['final_points']} points")
+
+    return pd.DataFrame(results, columns=result_columns)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run PAX calibrations for every row of a manifest without the GUI.")
+    parser.add_argument('manifest', help="Manifest .csv/.xlsx with columns: " + ", ".join(manifest_columns))
+    parser.add_argument('--out', default='calibration_results.csv', help="Results table (.csv or .xlsx)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--verbose', action='store_true', help="Show the per-file processing log")
+    args = parser.parse_args(argv)
+
+    jobs = read_manifest(args.manifest)
+    if not jobs:
+        print("❌ Manifest has no rows")
+        return 1
+
+    print(f"📋 Calibrating {len(jobs)} manifest row(s)")
+    results = run_batch_calibration(jobs, args.workers, args.verbose)
+
+    if args.out.lower().endswith('.xlsx'):
+        results.to_excel(args.out, index=False)
+    else:
+        results.to_csv(args.out, index=False)
+
+    failed = int((results['status'] == 'failed').sum())
+    warnings = int((results['status'] == 'warning').sum())
+    print(f"🎉 Done: {len(results) - failed} calibrated ({warnings} with issues), {failed} failed -> {os.path.abspath(args.out)}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for worker processes in a PyInstaller build
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Headless batch export of the 'Big 5' and 4x sanity check plots.
+
+Renders with the Agg backend (no Tk windows are created) and spreads the files
+over worker processes, so nightly QA plots for a whole fleet come out of one run.
+
+Example:
+    python batch_export.py D:/PAX/2025 --out qa_plots --image-format png svg --by-day
+    python batch_export.py "D:/PAX/2025/PAX-123_202501*.csv" --since 2025-01-10 --workers 8
+"""
+import matplotlib
+matplotlib.use('Agg')  # Must be selected before anything imports pyplot
+
+import argparse
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from pax_model import PAXModel, file_formats, pax_filename_pattern
+from figures import draw_big5, draw_4x
+
+#Layout name -> (drawing function, figure size)
+layouts = {
+    'big5': (draw_big5, (12, 8)),
+    '4x': (draw_4x, (12, 8)),
+}
+
+def find_files(sources, recursive=False, serial=None, since=None, until=None):
+    """
+    Resolve directories, files and glob patterns into a sorted list of PAX data files.
+    Directories only contribute files named like PAX data (PAX-XXX_YYYYMMDD.csv), so
+    manifests and result tables saved next to the data are not picked up; files and
+    patterns given explicitly are taken as they are.
+
+    Parameters:
+    - sources: List of directories, file paths or glob patterns
+    - recursive: Search directories recursively
+    - serial: Only keep files whose name contains this serial (e.g. "PAX-123")
+    - since, until: Only keep files whose name date (YYYYMMDD) is within this range (datetime.date)
+
+    Returns:
+    - files: Sorted list of file paths
+    """
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for ext in file_formats:
+                pattern = os.path.join(source, '**', f'*{ext}') if recursive else os.path.join(source, f'*{ext}')
+                files.update(path for path in glob.glob(pattern, recursive=recursive)
+                             if pax_filename_pattern.search(os.path.basename(path)))
+        elif os.path.isfile(source):
+            files.add(source)
+        else:
+            files.update(glob.glob(source, recursive=recursive))
+
+    selected = []
+    for path in sorted(files):
+        if os.path.splitext(path)[1].lower() not in file_formats:
+            continue
+        name = os.path.basename(path)
+        match = pax_filename_pattern.search(name)
+        if serial and serial.lower() not in name.lower():
+            continue
+        if (since or until) and match:
+            file_date = datetime.strptime(match.group('date'), '%Y%m%d').date()
+            if (since and file_date < since) or (until and file_date > until):
+                continue
+        selected.append(path)
+    return selected
+
+def render_layout(df, layout, output_base, image_formats, dpi):
+    """
+    Render one layout to every requested image format with a plain Agg canvas.
+
+    Returns:
+    - written: List of written file paths
+    """
+    draw, figsize = layouts[layout]
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw(fig, df)
+    fig.tight_layout()
+
+    written = []
+    for image_format in image_formats:
+        path = f"{output_base}_{layout}.{image_format}"
+        fig.savefig(path, format=image_format)
+        written.append(path)
+    return written
+
+def export_file(file_path, out_dir, layout_names, image_formats, by_day=False, dpi=100, verbose=False):
+    """
+    Worker job: load one file and write every requested layout (per day if asked).
+
+    Returns:
+    - dict with 'file', 'written' (paths) and 'errors' (messages)
+    """
+    result = {'file': file_path, 'written': [], 'errors': []}
+
+    # The loading functions log every step; keep the worker output readable
+    log_target = sys.stdout if verbose else io.StringIO()
+    with contextlib.redirect_stdout(log_target):
+        df, _ = PAXModel.read_file(file_path)
+
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    if by_day and not df.empty and hasattr(df['time'], 'dt'):
+        groups = [(f"{stem}_{day}", day_df.reset_index(drop=True)) for day, day_df in df.groupby(df['time'].dt.date)]
+    else:
+        groups = [(stem, df)]
+
+    for name, group_df in groups:
+        for layout in layout_names:
+            try:
+                result['written'] += render_layout(group_df, layout, os.path.join(out_dir, name), image_formats, dpi)
+            except KeyError as e:
+                result['errors'].append(f"{name} {layout}: missing column {e}")
+            except Exception as e:
+                result['errors'].append(f"{name} {layout}: {str(e)}")
+    return result
+
+def run_batch_export(files, out_dir, layout_names=('big5', '4x'), image_formats=('png',), by_day=False, dpi=100, workers=None, verbose=False):
+    """
+    Export plots for many files, one worker process per file.
+
+    Returns:
+    - results: List of per-file result dicts (see export_file)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    results = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(export_file, path, out_dir, layout_names, image_formats, by_day, dpi, verbose): path
+            for path in files
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'file': path, 'written': [], 'errors': [f"load failed: {str(e)}"]}
+            results.append(result)
+
+            status = "✅" if not result['errors'] else "⚠️" if result['written'] else "❌"
+            print(f"{status} [{i}/{len(files)}] {os.path.basename(path)}: {len(result['written'])} image(s)")
+            for error in result['errors']:
+                print(f"    {error}")
+
+    return results
+
+def parse_date(text):
+    return datetime.strptime(text, '%Y-%m-%d').date()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render PAX 'Big 5' and 4x sanity check plots without the GUI.")
+    parser.add_argument('sources', nargs='+', help="Directories, files or glob patterns of PAX .csv/.xlsx files")
+    parser.add_argument('--out', default='qa_plots', help="Output directory (default: qa_plots)")
+    parser.add_argument('--layout', nargs='+', choices=sorted(layouts), default=['big5', '4x'], help="Layouts to render")
+    parser.add_argument('--image-format', nargs='+', choices=['png', 'svg', 'pdf'], default=['png'], help="Image formats to write")
+    parser.add_argument('--by-day', action='store_true', help="Write one set of plots per calendar day instead of per file")
+    parser.add_argument('--recursive', action='store_true', help="Search directories recursively")
+    parser.add_argument('--serial', help="Only files for this instrument, e.g. PAX-123")
+    parser.add_argument('--since', type=parse_date, help="Only files dated on/after YYYY-MM-DD (from the file name)")
+    parser.add_argument('--until', type=parse_date, help="Only files dated on/before YYYY-MM-DD (from the file name)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--verbose', action='store_true', help="Show the per-file processing log")
+    args = parser.parse_args(argv)
+
+    files = find_files(args.sources, args.recursive, args.serial, args.since, args.until)
+    if not files:
+        print("❌ No matching PAX files found")
+        return 1
+
+    print(f"📂 Exporting {len(files)} file(s) to {os.path.abspath(args.out)}")
+    results = run_batch_export(files, args.out, args.layout, args.image_format, args.by_day, args.dpi, args.workers, args.verbose)
+
+    written = sum(len(r['written']) for r in results)
+    failed = [r for r in results if r['errors']]
+    print(f"🎉 Done: {written} image(s) written, {len(failed)} file(s) with problems")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Needed for worker processes in a PyInstaller build
+    sys.exit(main())
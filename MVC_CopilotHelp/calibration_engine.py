@@ -0,0 +1,301 @@
+"""Fast calibration regression helpers that do not depend on the GUI.
+
+The incremental engine answers "what would the fit be for this calibration region
+and these filters" quickly enough to show live while sliders move.
+"""
+import numpy as np
+
+def calibration_xy(df, mode, ext_column):
+    """
+    Get the full-length X and Y arrays used by the calibration for a mode.
+    Mirrors enhanced_calibration_analysis: X is Bscat (scattering) or Babs (absorbing),
+    Y is the extinction column (scattering) or extinction - Bscat (absorbing).
+
+    Returns:
+    - x, y: float numpy arrays, x_column, y_column names
+    """
+    if mode == 'Scattering':
+        x_column = 'Bscat (1/Mm)'
+        y = df[ext_column].to_numpy(dtype=float)
+        y_column = ext_column
+    else:  # Absorbing mode
+        x_column = 'Babs (1/Mm)'
+        y = df[ext_column].to_numpy(dtype=float) - df['Bscat (1/Mm)'].to_numpy(dtype=float)
+        y_column = f"{ext_column} - Bscat"
+    x = df[x_column].to_numpy(dtype=float)
+    return x, y, x_column, y_column
+
+def abs_percent_change(x):
+    """
+    Absolute point-to-point percent change, like Series.pct_change().abs() * 100.
+    The first point (no predecessor) and 0/0 steps are NaN, which the filter lets through.
+    """
+    pct = np.full(len(x), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct[1:] = np.abs(x[1:] / x[:-1] - 1) * 100
+    return pct
+
+def fit_from_sums(n, sx, sy, sxx, syy, sxy):
+    """
+    Least-squares slope, intercept and R² from (centered) running sums.
+    Works elementwise on arrays, so a whole grid of fits can be evaluated at once.
+    Entries with fewer than 2 points or no X variance come back as NaN.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        slope = cov / var_x
+        intercept = (sy - slope * sx) / n
+        r2 = cov * cov / (var_x * var_y)
+    invalid = (n < 2) | ~(var_x > 0)
+    slope = np.where(invalid, np.nan, slope)
+    intercept = np.where(invalid, np.nan, intercept)
+    r2 = np.where(invalid, np.nan, r2)
+    return slope, intercept, r2
+
+class IncrementalCalibration:
+    """
+    Incremental regression engine for live calibration previews.
+
+    For the current percent-change and min/max settings, the pass/fail mask is built
+    once and cumulative sums of x, y, x², y² and xy are taken over the passing points.
+    After that the slope, intercept, R² and point count of any calibration region are
+    an O(1) difference of two prefix entries, so moving the region sliders costs nothing.
+    Changing a filter value rebuilds the mask and sums in one vectorized O(n) pass.
+    """
+    def __init__(self, df, mode='Scattering', ext_column='Extinction_Coefficient', row_mask=None, outlier_mask=None):
+        self.mode = mode
+        self.ext_column = ext_column
+        self.row_mask = row_mask  # Optional boolean mask of rows allowed at all (e.g. a Mode segment filter)
+        self.x, self.y, self.x_column, self.y_column = calibration_xy(df, mode, ext_column)
+        if outlier_mask is None:
+            self.abs_pct = abs_percent_change(self.x)
+        else:
+            # Spikes (True in outlier_mask) are rejected and skipped by the percent change,
+            # like enhanced_calibration_analysis with an outlier column
+            not_spike = ~np.asarray(outlier_mask, dtype=bool)
+            self.abs_pct = np.full(len(self.x), np.nan)
+            self.abs_pct[not_spike] = abs_percent_change(self.x[not_spike])
+            self.row_mask = not_spike if row_mask is None else row_mask & not_spike
+        self.filters = None
+        self.prefix = None
+        self.range_mask = None
+        self.offset = (0.0, 0.0)
+
+    def set_filters(self, min_val, max_val, percent):
+        """
+        Rebuild the prefix sums for new filter settings (no-op if they did not change).
+        """
+        filters = (float(min_val), float(max_val), float(percent))
+        if filters == self.filters:
+            return
+        self.filters = filters
+
+        x, y = self.x, self.y
+        self.range_mask = (x >= filters[0]) & (x <= filters[1]) & np.isfinite(y)
+        if self.row_mask is not None:
+            self.range_mask &= self.row_mask
+        pct_mask = (self.abs_pct <= filters[2]) | np.isnan(self.abs_pct)
+        mask = self.range_mask & pct_mask
+
+        # Center on the mean of the kept points so the squared sums do not lose precision
+        if mask.any():
+            self.offset = (float(x[mask].mean()), float(y[mask].mean()))
+        xc = np.where(mask, x - self.offset[0], 0.0)
+        yc = np.where(mask, y - self.offset[1], 0.0)
+
+        def prefix(values):
+            return np.concatenate(([0.0], np.cumsum(values)))
+
+        self.prefix = {
+            'n': prefix(mask.astype(float)),
+            'sx': prefix(xc),
+            'sy': prefix(yc),
+            'sxx': prefix(xc * xc),
+            'syy': prefix(yc * yc),
+            'sxy': prefix(xc * yc),
+        }
+
+    def region_sums(self, start, stop):
+        """
+        Sums over rows start..stop-1 (like .iloc[start:stop]) that pass the filters.
+        The first row of a region has no predecessor inside it, so like pct_change()
+        it always passes the percent filter.
+        """
+        if self.prefix is None:
+            raise ValueError("Call set_filters() before fitting")
+        start = max(0, int(start))
+        stop = min(len(self.x), int(stop))
+        sums = {name: values[stop] - values[start] if stop > start else 0.0 for name, values in self.prefix.items()}
+
+        if stop > start:
+            pct_first = self.abs_pct[start]
+            first_failed_pct = not (pct_first <= self.filters[2] or np.isnan(pct_first))
+            if first_failed_pct and self.range_mask[start]:
+                xc = self.x[start] - self.offset[0]
+                yc = self.y[start] - self.offset[1]
+                sums['n'] += 1
+                sums['sx'] += xc
+                sums['sy'] += yc
+                sums['sxx'] += xc * xc
+                sums['syy'] += yc * yc
+                sums['sxy'] += xc * yc
+        return sums
+
+    def fit(self, start, stop):
+        """
+        Regression for a calibration region using the current filters.
+
+        Returns:
+        - dict with 'slope', 'intercept', 'r2' (NaN when undefined) and 'count'
+        """
+        sums = self.region_sums(start, stop)
+        n = sums['n']
+        slope, intercept, r2 = fit_from_sums(np.float64(n), sums['sx'], sums['sy'], sums['sxx'], sums['syy'], sums['sxy'])
+        slope = float(slope)
+        # Undo the centering: y - y0 = m (x - x0) + c  ->  y = m x + (c + y0 - m x0)
+        intercept = float(intercept) + self.offset[1] - slope * self.offset[0]
+        return {'slope': slope, 'intercept': intercept, 'r2': float(r2), 'count': int(round(n))}
+
+def default_sweep_grid(x):
+    """
+    Candidate filter settings for a sweep, based on the X values of the region.
+
+    Returns:
+    - percents: Percent-change limits to try
+    - ranges: List of (min, max) pairs built from low and high quantiles of X
+    """
+    percents = np.array([1, 2, 3, 5, 7.5, 10, 15, 20, 30, 50, 100], dtype=float)
+    finite_x = x[np.isfinite(x)]
+    if finite_x.size == 0:
+        return percents, [(0.0, 100.0)]
+    mins = np.unique(np.percentile(finite_x, [0, 1, 5, 10]))
+    maxs = np.unique(np.percentile(finite_x, [90, 95, 99, 100]))
+    ranges = [(float(lo), float(hi)) for lo in mins for hi in maxs if hi > lo]
+    return percents, ranges
+
+def sweep_calibration_filters(df, mode, ext_column, start, stop, percents=None, ranges=None,
+                              r2_target=0.98, stability_target=0.05, retention_target=0.3, chunk_size=65536,
+                              row_mask=None, outlier_mask=None):
+    """
+    Evaluate a whole grid of filter settings for one calibration region at once.
+
+    Every (min/max range, percent limit) pair is a mask over the region; the sums the
+    regression needs are matrix products of the range masks with the percent masks
+    weighted by 1, x, y, x², y² and xy, so the grid costs a handful of matmuls
+    instead of one enhanced_calibration_analysis call per setting. Each half of the
+    region is summed separately, which gives the slope stability (relative slope
+    difference between the halves) for free.
+
+    Parameters:
+    - df, mode, ext_column: Data and calibration mode, as for IncrementalCalibration
+    - start, stop: Calibration region rows (like .iloc[start:stop])
+    - percents, ranges: Grid to evaluate (defaults from default_sweep_grid)
+    - r2_target, stability_target, retention_target: Quality targets for the recommendation
+    - chunk_size: Rows per matmul block, keeps the temporary masks small
+    - row_mask: Optional boolean mask over all rows (e.g. a Mode segment filter)
+    - outlier_mask: Optional spike mask over all rows (True = spike, see outliers.py);
+      spikes are rejected and skipped by the percent change
+
+    Returns:
+    - dict with 'percents', 'ranges', per-setting arrays of shape (len(ranges), len(percents))
+      'r2', 'slope', 'intercept', 'stability', 'count', 'retention', and 'recommended'
+      (dict with 'min', 'max', 'percent', 'r2', 'slope', 'stability', 'retention',
+      'meets_targets', or None if no setting has enough points)
+    """
+    x_all, y_all, x_column, y_column = calibration_xy(df, mode, ext_column)
+    start = max(0, int(start))
+    stop = min(len(x_all), int(stop))
+    x = x_all[start:stop]
+    y = y_all[start:stop]
+    if len(x) < 4:
+        raise ValueError(f"Calibration region has only {len(x)} rows, need at least 4 for a sweep")
+
+    # Percent change within the region, so its first row always passes (like pct_change())
+    if outlier_mask is None:
+        abs_pct = abs_percent_change(x)
+    else:
+        not_spike = ~np.asarray(outlier_mask, dtype=bool)[start:stop]
+        abs_pct = np.full(len(x), np.nan)
+        abs_pct[not_spike] = abs_percent_change(x[not_spike])
+
+    default_percents, default_ranges = default_sweep_grid(x)
+    percents = np.asarray(default_percents if percents is None else percents, dtype=float)
+    ranges = default_ranges if ranges is None else [(float(lo), float(hi)) for lo, hi in ranges]
+    range_min = np.array([r[0] for r in ranges])[:, None]
+    range_max = np.array([r[1] for r in ranges])[:, None]
+
+    finite = np.isfinite(x) & np.isfinite(y)
+    if row_mask is not None:
+        finite &= row_mask[start:stop]
+    if outlier_mask is not None:
+        finite &= not_spike
+    x0 = float(x[finite].mean()) if finite.any() else 0.0
+    y0 = float(y[finite].mean()) if finite.any() else 0.0
+    xc = np.where(finite, x - x0, 0.0)
+    yc = np.where(finite, y - y0, 0.0)
+    weights = np.stack([finite.astype(float), xc, yc, xc * xc, yc * yc, xc * yc])  # (6, n)
+
+    # sums[half, quantity, range, percent]
+    sums = np.zeros((2, 6, len(ranges), len(percents)))
+    half = len(x) // 2
+    for half_index, (lo, hi) in enumerate(((0, half), (half, len(x)))):
+        for block_start in range(lo, hi, chunk_size):
+            block = slice(block_start, min(block_start + chunk_size, hi))
+            xb = x[block]
+            range_mask = ((xb >= range_min) & (xb <= range_max)).astype(float)  # (ranges, rows)
+            pct_b = abs_pct[block]
+            pct_mask = ((pct_b <= percents[:, None]) | np.isnan(pct_b)).astype(float)  # (percents, rows)
+            weighted = pct_mask[None, :, :] * weights[:, None, block]  # (6, percents, rows)
+            sums[half_index] += range_mask[None, :, :] @ weighted.transpose(0, 2, 1)
+
+    total = sums.sum(axis=0)
+    slope, intercept, r2 = fit_from_sums(*total)
+    intercept = intercept + y0 - slope * x0
+    slope_a, _, _ = fit_from_sums(*sums[0])
+    slope_b, _, _ = fit_from_sums(*sums[1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stability = np.abs(slope_a - slope_b) / np.abs(slope)
+    count = total[0].round().astype(int)
+    retention = count / max(int(finite.sum()), 1)  # Share of the usable rows in the region
+
+    result = {
+        'percents': percents,
+        'ranges': ranges,
+        'r2': r2,
+        'slope': slope,
+        'intercept': intercept,
+        'stability': stability,
+        'count': count,
+        'retention': retention,
+        'x_column': x_column,
+        'y_column': y_column,
+        'targets': {'r2': r2_target, 'stability': stability_target, 'retention': retention_target},
+        'recommended': None,
+    }
+
+    valid = np.isfinite(r2) & np.isfinite(stability)
+    if not valid.any():
+        return result
+
+    # Prefer settings that meet every target and keep the most data; otherwise take the best R²
+    meets = valid & (r2 >= r2_target) & (stability <= stability_target) & (retention >= retention_target)
+    if meets.any():
+        score = np.where(meets, retention + 1e-3 * r2, -np.inf)
+    else:
+        score = np.where(valid, r2, -np.inf)
+    i, j = np.unravel_index(np.argmax(score), score.shape)
+    result['recommended'] = {
+        'min': ranges[i][0],
+        'max': ranges[i][1],
+        'percent': float(percents[j]),
+        'r2': float(r2[i, j]),
+        'slope': float(slope[i, j]),
+        'stability': float(stability[i, j]),
+        'retention': float(retention[i, j]),
+        'count': int(count[i, j]),
+        'meets_targets': bool(meets.any()),
+        'index': (int(i), int(j)),
+    }
+    return result
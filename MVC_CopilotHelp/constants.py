@@ -2,6 +2,10 @@ import csv
 import os
 import pandas as pd
 
+from data_store import DataStore
+#PAX definitions and settings the headless modules use too (kept free of GUI state)
+from pax_config import *
+
 # Constants for the GUI layout and configuration
 geometry_width_pct = 1.0
 geometry_height_pct = 1.0
@@ -13,64 +17,34 @@ logo_name = "assets\\DropletLogoTemp.png"
 #starting column index (if implemented)
 col_index = 0
 
-#Adding an easily accessible location for the dataframe to be saved to
-df_main = pd.DataFrame()
-#Adding a second dataframe for concatenation of dataframes
-df_to_add = pd.DataFrame()
+#Undo/redo history of the loaded dataset: number of steps, and memory the history may hold
+#beyond the current data (the newest step is always kept)
+undo_max_steps = 20
+undo_max_bytes = 1024 * 1024 * 1024
+
+#The loaded dataset, with version numbers so caches know when they are stale (see data_store.DataStore)
+data_store = DataStore(undo_max_steps=undo_max_steps, undo_max_bytes=undo_max_bytes)
+
+#Memory budget for the cache of rendered main-plot bitmaps (see plotting.RenderCache)
+render_cache_max_bytes = 256 * 1024 * 1024
+
+#Modules that are slow to import and only needed later (calibration fit, Excel reading);
+#main.py imports them on a background thread once the window is on screen
+background_preload_modules = ["scipy.stats", "openpyxl"]
+
+#Calibration plots: scatter points beyond this are thinned out (the fit always uses every point)
+calibration_scatter_max_points = 5000
+
+#X vs Y view: above this many points the scatter plot switches to a 2D histogram
+xy_density_threshold = 20000
+xy_density_bins = 200
 
-#Column names for the PAX alarm data
-alarm_names = [
-    "Bscat (1/Mm)",
-    "scat_raw",
-    "Babs (1/Mm)",
-    "Babs phase (deg)",
-    "Babs noise (1/Mm)",
-    "Detected Laser power (W)",
-    "Laser power phase (deg)",
-    "Q factor",
-    "Reserved",
-    "Resonance Frequency (Hz)",
-    "Background Bscat (1/Mm)",
-    "mic_raw",
-    "Background Babs (1/Mm)",
-    "Background Babs phase (deg)",
-    "Bext (1/Mm)",
-    "Single Scat Albedo",
-    "BC Mass (ug/m3)",
-    "Relative Humidity (%)",
-    "Cell Temperature (C)",
-    "Dewpoint (C)",
-    "Analong Input 1",
-    "Analong Input 2",
-    "Calibration Bscat",
-    "Calibration Babs",
-    "Alpha",
-    "Processing",
-    "HK Case Temperature (C)",
-    "HK Case Pressure (mbar)",
-    "Reserved",
-    "HK plus5V",
-    "HK 3.3V",
-    "Calibration Bext",
-    "HK 5Vdig",
-    "Calibration I0",
-    "Reserved",
-    "Reserved",
-    "HK Laser PD Current (Amp)",
-    "HK Laser Current (Amp)",
-    "HK Laser Temp (C)",
-    "HK minus5V",
-    "HK Cell Pressure (mbar)",
-    "HK Inlet Pressure (mbar)",
-    "HK Sample Pump Vac (mbar)",
-    "HK 12V",
-    "Reserved",
-    "Mode",
-    "Countdown Timer (secs)",
-    "Disk Free Space (Gbytes)",
-    "Laser on Time (hours)",
-    "Reserved",
-    "USB Status",
-] 
+#Time resolutions of the main plot: raw rows, or per-bucket mean with a min-max band (see aggregation.py)
+aggregation_levels = {
+    'Raw data': None,
+    '1 min': '1min',
+    '1 hour': '1h',
+    '1 day': '1D',
+}
 
 #Not too much to set up as initial values, but this constants file is a good place to put them
\ No newline at end of file
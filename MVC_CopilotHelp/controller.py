@@ -1,6 +1,9 @@
 """Starting point for the MVC_CopilotHelp project. Contains all helper/utility functions and classes."""
 import os
 import sys
+import time
+import threading
+import importlib
 import tkinter as tk
 from tkinter import messagebox
 
@@ -60,4 +63,54 @@ def are_you_sure(window):
 	- window: The Tkinter window to be destroyed.
 	"""
 	if messagebox.askyesno("Quit Dialog", "Are you sure you want to quit the app?"):
-		window.destroy()
\ No newline at end of file
+		window.destroy()
+
+class StartupTimer:
+	"""
+	Records named checkpoints during startup and reports where the time went.
+	"""
+	def __init__(self):
+		self.start = time.perf_counter()
+		self.last = self.start
+		self.steps = []
+
+	def mark(self, name):
+		"""Record the time spent since the previous mark under the given name."""
+		now = time.perf_counter()
+		self.steps.append((name, now - self.last))
+		self.last = now
+
+	def total(self):
+		return self.last - self.start
+
+	def report(self):
+		"""Return the timing report as text (one line per step)."""
+		lines = ["⏱️ Startup timing:"]
+		for name, seconds in self.steps:
+			lines.append(f"  {name:38} {seconds * 1000:8.1f} ms")
+		lines.append(f"  {'Total to first paint':38} {self.total() * 1000:8.1f} ms")
+		return "\n".join(lines)
+
+def preload_modules_in_background(module_names, on_done=None):
+	"""
+	Import heavy, rarely needed modules on a daemon thread so the first analysis does not pay for them.
+
+	Parameters:
+	- module_names: Module names to import, e.g. ['scipy.stats', 'seaborn']
+	- on_done: Optional callback receiving a list of (module_name, seconds or error message)
+	"""
+	def worker():
+		timings = []
+		for name in module_names:
+			started = time.perf_counter()
+			try:
+				importlib.import_module(name)
+				timings.append((name, time.perf_counter() - started))
+			except Exception as e:
+				timings.append((name, f"failed: {e}"))
+		if on_done is not None:
+			on_done(timings)
+
+	thread = threading.Thread(target=worker, name="module-preload", daemon=True)
+	thread.start()
+	return thread
@@ -0,0 +1,323 @@
+"""Owner of the loaded PAX dataset.
+
+Every mutation goes through a DataStore method, which bumps the version and tells
+subscribers what changed: new rows (load, append, clear) change every column, a
+derived column (extinction etc.) changes only itself. Caches key on
+columns_version(...) of the columns they read, so creating a derived column does
+not throw away plots and fits of unrelated columns.
+
+Mutations can be undone and redone. After each mutation the store records the
+dataset as a dict of column Series; a column that did not change is the same Series
+object in consecutive records, so undoing a derived column recompute only keeps the
+old values of that column alive, not a copy of the whole dataset.
+"""
+from dataclasses import dataclass
+from itertools import count
+
+import pandas as pd
+
+_store_uids = count(1)
+
+@dataclass(frozen=True)
+class DataChange:
+    """One mutation of a DataStore, as passed to subscribers."""
+    version: int
+    kind: str  # 'replace', 'append', 'clear' (rows changed) or 'columns' (values of some columns)
+    columns: frozenset  # Columns whose values changed (every column when rows changed)
+    rows_added: int = 0
+    restored: bool = False  # True when the change comes from undo() or redo()
+
+    @property
+    def rows_changed(self):
+        """True if rows were replaced or appended, i.e. row-indexed caches are stale."""
+        return self.kind != 'columns'
+
+    def touches(self, *columns):
+        """True if any of the given columns changed."""
+        return self.rows_changed or any(column in self.columns for column in columns)
+
+@dataclass
+class _State:
+    """The dataset after one mutation, for undo/redo."""
+    columns: dict  # name -> Series, in column order; shared with neighbouring states when unchanged
+    index: object
+    rows_id: int  # Changes whenever rows change, so two states with the same rows_id have the same rows
+    label: str  # What the mutation that produced this state did, e.g. "Clear data"
+    extras: dict  # State of add_state_hook() owners at that point
+
+class DataStore:
+    """
+    The dataset, its version number and the per-column versions.
+
+    Read the data through .df; change it only through replace(), append(), clear()
+    and update_columns(), never by assigning a new DataFrame elsewhere.
+    """
+    def __init__(self, df=None, undo_max_steps=20, undo_max_bytes=1024 * 1024 * 1024):
+        self._df = pd.DataFrame() if df is None else df
+        self.uid = next(_store_uids)  # Unlike id(store), never reused by a later store; use it in cache keys
+        self.version = 0
+        self.rows_version = 0  # Version of the last row change; every column is at least this new
+        self._column_versions = {}
+        self._subscribers = []
+        self.staged = pd.DataFrame()  # Rows loaded for a later append (was constants.df_to_add)
+
+        self.undo_max_steps = undo_max_steps
+        self.undo_max_bytes = undo_max_bytes  # Memory the history may hold beyond the current data
+        self._state_hooks = {}
+        self._rows_id = 0
+        self._undo = []
+        self._redo = []
+        self._state = self._capture(None)
+
+    @property
+    def df(self):
+        return self._df
+
+    @property
+    def empty(self):
+        return self._df.empty
+
+    def column_version(self, column):
+        """Version at which a column last changed."""
+        return max(self.rows_version, self._column_versions.get(column, 0))
+
+    def columns_version(self, columns):
+        """Newest version among the given columns; use it in cache keys of derived results."""
+        return max([self.rows_version] + [self._column_versions.get(column, 0) for column in columns])
+
+    def changed_since(self, version, columns=None):
+        """True if the data (or any of the given columns) changed after the given version."""
+        if columns is None:
+            return self.version > version
+        return self.columns_version(columns) > version
+
+    def subscribe(self, callback):
+        """
+        Call callback(change) after every mutation, with a DataChange.
+
+        Returns:
+        - The callback, so it can be passed to unsubscribe later
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def replace(self, df, label="Load data"):
+        """Replace the whole dataset (a fresh load)."""
+        from pax_model import invalidate_time_axis_cache
+        self._df = df
+        invalidate_time_axis_cache()
+        return self._rows_changed('replace', 0, label)
+
+    def append(self, df_to_add, label=None):
+        """Append rows after the current data; cached alarm intervals are extended, not rebuilt."""
+        from pax_model import append_rows
+        self._df = append_rows(self._df, df_to_add)
+        return self._rows_changed('append', len(df_to_add), label or f"Append {len(df_to_add):,} rows")
+
+    def clear(self, label="Clear data"):
+        """Drop the dataset and any staged rows."""
+        from pax_model import invalidate_time_axis_cache
+        self._df = pd.DataFrame()
+        self.staged = pd.DataFrame()
+        invalidate_time_axis_cache()
+        return self._rows_changed('clear', 0, label)
+
+    def update_columns(self, columns=None, df=None, label=None, record=True):
+        """
+        Record that column values were (re)calculated without changing the rows.
+        Assign new column values (df[name] = values) rather than writing into the
+        existing arrays, or undo cannot give the old values back.
+
+        Parameters:
+        - columns: Names of the changed columns; None when unknown (treated as all columns)
+        - df: The DataFrame returned by the calculation, if it is a new object with the same rows
+        - label: Description for the undo history (default "Update <columns>")
+        - record: False for automatic recalculations (derived columns following a slider):
+          the values become part of the current undo step instead of a step of their own,
+          so they do not push user actions out of the history
+        """
+        if df is not None:
+            if len(df) != len(self._df):
+                raise ValueError(f"update_columns changed the row count ({len(self._df)} -> {len(df)}); use replace()")
+            self._df = df
+        known = columns is not None
+        if columns is None:
+            columns = self._df.columns
+        self.version += 1
+        for column in columns:
+            self._column_versions[column] = self.version
+        change = self._notify(DataChange(self.version, 'columns', frozenset(columns)))
+        if not record:
+            self._state = self._capture(self._state.label, changed=set(columns) if known else None)
+            return change
+        self._record(label or (f"Update {', '.join(columns)}" if known else "Update all columns"),
+                     changed=set(columns) if known else None)
+        return change
+
+    # ==================== UNDO / REDO ====================
+
+    @property
+    def undo_label(self):
+        """Description of the mutation undo() would revert, or None."""
+        return self._state.label if self._undo else None
+
+    @property
+    def redo_label(self):
+        """Description of the mutation redo() would repeat, or None."""
+        return self._redo[-1].label if self._redo else None
+
+    def undo(self):
+        """
+        Go back to the dataset before the last mutation.
+
+        Returns:
+        - The DataChange passed to subscribers (restored=True), or None if there is nothing to undo
+        """
+        if not self._undo:
+            return None
+        self._redo.append(self._state)
+        return self._restore(self._undo.pop())
+
+    def redo(self):
+        """
+        Repeat the last undone mutation.
+
+        Returns:
+        - The DataChange passed to subscribers (restored=True), or None if there is nothing to redo
+        """
+        if not self._redo:
+            return None
+        self._undo.append(self._state)
+        return self._restore(self._redo.pop())
+
+    def clear_history(self):
+        """Forget every undo/redo step (frees the memory they hold)."""
+        self._undo.clear()
+        self._redo.clear()
+
+    def replace_column_data(self, convert):
+        """
+        Swap columns for equal ones held elsewhere, e.g. memory-mapped columns for
+        in-memory copies, in the data and in every undo/redo step. The values do not
+        change, so no version moves, nothing is recorded and subscribers are not told.
+
+        Parameters:
+        - convert: Called with a column Series (or the index); returns its replacement,
+          or None to keep it. A Series shared by several steps is converted once.
+
+        Returns:
+        - Number of Series/Index objects replaced
+        """
+        from pax_model import invalidate_time_axis_cache
+        converted = {}
+        def swap(values, index=None):
+            key = (id(values), id(index))
+            if key not in converted:
+                replacement = convert(values)
+                if index is not None and values.index is not index:
+                    replacement = (values if replacement is None else replacement).set_axis(index)
+                # Keep the original referenced until the end so its id is not reused
+                converted[key] = (values, values if replacement is None else replacement)
+            return converted[key][1]
+
+        for state in self._undo + self._redo + [self._state]:
+            state.index = swap(state.index)
+            state.columns = {name: swap(series, state.index) for name, series in state.columns.items()}
+        if self._df.index is not self._state.index:
+            self._df.index = self._state.index
+        replaced = {id(replacement) for original, replacement in converted.values() if original is not replacement}
+        for name, series in self._state.columns.items():
+            if name in self._df.columns and id(series) in replaced:
+                self._df[name] = series
+        invalidate_time_axis_cache()
+        return len(replaced)
+
+    def history_bytes(self):
+        """Estimated memory held by undo/redo steps beyond the current data."""
+        seen = {id(series) for series in self._state.columns.values()}
+        total = 0
+        for state in self._undo + self._redo:
+            for series in state.columns.values():
+                if id(series) not in seen:
+                    seen.add(id(series))
+                    total += int(series.memory_usage(index=False, deep=False))
+        return total
+
+    def add_state_hook(self, name, get_state, set_state):
+        """
+        Make other state follow undo/redo, e.g. which derived columns the registry wrote.
+        get_state() is called after every mutation; set_state(value) when that point is restored.
+        """
+        self._state_hooks[name] = (get_state, set_state)
+        self._state.extras[name] = get_state()
+
+    def _capture(self, label, changed=None):
+        """Record the current dataset; columns outside changed are taken over from the previous state."""
+        previous = getattr(self, '_state', None)
+        columns = {}
+        for name in self._df.columns:
+            if changed is not None and name not in changed and name in previous.columns:
+                columns[name] = previous.columns[name]
+            else:
+                columns[name] = self._df[name]
+        extras = {name: get_state() for name, (get_state, _) in self._state_hooks.items()}
+        return _State(columns, self._df.index, self._rows_id, label, extras)
+
+    def _record(self, label, changed=None):
+        # Called after subscribers ran, so hook state (derived column ownership) is final
+        self._undo.append(self._state)
+        self._redo.clear()
+        self._state = self._capture(label, changed)
+        while len(self._undo) > self.undo_max_steps or (len(self._undo) > 1 and self.history_bytes() > self.undo_max_bytes):
+            self._undo.pop(0)
+
+    def _restore(self, state):
+        from pax_model import invalidate_time_axis_cache
+        current = self._state
+        self.version += 1
+        if state.rows_id != current.rows_id:
+            self._df = pd.DataFrame(state.columns, index=state.index, copy=False) if state.columns else pd.DataFrame()
+            self._rows_id = state.rows_id
+            self.rows_version = self.version
+            self._column_versions.clear()
+            invalidate_time_axis_cache()
+            kind, changed = 'replace', set(self._df.columns)
+        else:
+            # Same rows: only swap the columns that differ, so the DataFrame stays the same object
+            changed = {name for name in set(state.columns) | set(current.columns)
+                       if state.columns.get(name) is not current.columns.get(name)}
+            for name in changed:
+                if name in state.columns:
+                    self._df[name] = state.columns[name]
+                elif name in self._df.columns:
+                    del self._df[name]
+                self._column_versions[name] = self.version
+            if list(self._df.columns) != list(state.columns):
+                self._df = self._df[list(state.columns)]
+            kind = 'columns'
+        self._state = state
+        for name, (_, set_state) in self._state_hooks.items():
+            if name in state.extras:
+                set_state(state.extras[name])
+        return self._notify(DataChange(self.version, kind, frozenset(changed), restored=True))
+
+    def _rows_changed(self, kind, rows_added, label):
+        self.version += 1
+        self.rows_version = self.version
+        self._column_versions.clear()
+        self._rows_id += 1
+        change = self._notify(DataChange(self.version, kind, frozenset(self._df.columns), rows_added))
+        self._record(label)
+        return change
+
+    def _notify(self, change):
+        for callback in list(self._subscribers):
+            try:
+                callback(change)
+            except Exception as e:
+                print(f"⚠️ Data change subscriber {getattr(callback, '__name__', callback)} failed: {str(e)}")
+        return change
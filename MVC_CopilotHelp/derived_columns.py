@@ -0,0 +1,320 @@
+"""Registry of derived columns, computed lazily from declared inputs and parameters.
+
+Each definition names its input columns (raw or derived) and the parameters it
+reads (I0 region, calibration constants, ...). A column is only computed when it is
+first asked for; after that it is recomputed only when one of its inputs (by
+DataStore column version) or parameters changed, and only when asked for again.
+Changing a parameter never touches columns that do not depend on it.
+
+Example:
+    registry = DerivedColumnRegistry(store)
+    register_pax_columns(registry)
+    registry.set_params(i0_low=0, i0_high=600)
+    registry.materialize('Extinction_Coefficient - Bscat')  # builds Extinction_Coefficient first
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from outliers import hampel_outliers, hampel_sigmas, hampel_window, outlier_column_name
+from pax_model import extinction_values, laser_power_columns
+
+@dataclass(frozen=True)
+class DerivedColumn:
+    """
+    One derived column. compute(df, params) returns the values (one per row), or
+    (values, info) where info is a dict kept for display (e.g. the I0 baseline).
+    """
+    name: str
+    inputs: tuple
+    compute: object
+    params: tuple = ()
+    optional_inputs: tuple = ()  # Read when present, e.g. 'Mode' for segment filters
+    description: str = ''
+
+class DerivedColumnRegistry:
+    """
+    Derived column definitions bound to a DataStore. Columns the registry wrote are
+    "materialized"; if any other code overwrites one, the registry lets go of it
+    (so e.g. a drift-corrected extinction is never replaced behind the user's back).
+    """
+    def __init__(self, store, memo=None):
+        self.store = store
+        self.memo = memo
+        self.definitions = {}
+        self.params = {}
+        self._written = {}  # name -> {'signature': ..., 'info': {...}}
+        self._writing = None
+        store.subscribe(self._on_data_change)
+        store.add_state_hook('derived_columns', self._history_state, self._restore_history_state)
+
+    def define(self, name, inputs, params=(), optional_inputs=(), description=''):
+        """Decorator form of register()."""
+        def decorator(compute):
+            self.register(DerivedColumn(name, tuple(inputs), compute, tuple(params), tuple(optional_inputs), description))
+            return compute
+        return decorator
+
+    def register(self, column):
+        """Add a definition; raises ValueError if it would create a dependency cycle."""
+        previous = self.definitions.get(column.name)
+        self.definitions[column.name] = column
+        try:
+            self.dependency_order(column.name)
+        except ValueError:
+            if previous is None:
+                del self.definitions[column.name]
+            else:
+                self.definitions[column.name] = previous
+            raise
+
+    def dependency_order(self, name, _visiting=None):
+        """Derived columns needed for name, inputs first, ending with name itself."""
+        visiting = set() if _visiting is None else _visiting
+        if name in visiting:
+            raise ValueError(f"Derived column dependency cycle through '{name}'")
+        visiting.add(name)
+        order = []
+        for input_name in self.definitions[name].inputs + self.definitions[name].optional_inputs:
+            if input_name in self.definitions:
+                order += [n for n in self.dependency_order(input_name, visiting) if n not in order]
+        visiting.discard(name)
+        return order + [name]
+
+    def dependents(self, *names):
+        """Derived columns that read any of the given columns or parameters, directly or indirectly."""
+        result, frontier = set(), list(names)
+        while frontier:
+            name = frontier.pop()
+            for column in self.definitions.values():
+                if column.name not in result and (name in column.inputs or name in column.optional_inputs or name in column.params):
+                    result.add(column.name)
+                    frontier.append(column.name)
+        return result
+
+    def set_params(self, **values):
+        """
+        Update parameters. Nothing is recomputed here.
+
+        Returns:
+        - Sorted names of the materialized columns that are now stale
+        """
+        changed = [name for name, value in values.items() if self.params.get(name, _unset) != value]
+        self.params.update(values)
+        return sorted(name for name in self.dependents(*changed) if name in self._written)
+
+    def is_materialized(self, name):
+        """True if the column in the data was written by the registry (and not overwritten since)."""
+        return name in self._written
+
+    def is_stale(self, name):
+        """True if a materialized column no longer matches its inputs and parameters."""
+        if name not in self._written:
+            return False
+        column = self.definitions[name]
+        if any(self.is_stale(input_name) for input_name in column.inputs + column.optional_inputs if input_name in self.definitions):
+            return True
+        return self._written[name]['signature'] != self._signature(column)
+
+    def missing_inputs(self, name):
+        """Required raw inputs that are neither in the data nor derivable."""
+        columns = self.store.df.columns
+        missing = []
+        for input_name in self.definitions[name].inputs:
+            if input_name in columns:
+                continue
+            if input_name in self.definitions:
+                missing += self.missing_inputs(input_name)
+            else:
+                missing.append(input_name)
+        return missing
+
+    def info(self, name):
+        """Info dict returned by the last computation of a materialized column (None otherwise)."""
+        state = self._written.get(name)
+        return None if state is None else state['info']
+
+    def materialize(self, name, overwrite=False, record=False):
+        """
+        Make sure the column exists in the data and is current, computing it (and any
+        stale or missing derived inputs) only if needed.
+
+        Parameters:
+        - name: Registered column name
+        - overwrite: Replace a column of that name that the registry did not write
+          (a raw column, or one written by other code)
+        - record: True when the user asked for the column (a button), so the computation
+          is an undo step; refreshes that follow parameters or inputs are not
+
+        Returns:
+        - The info dict of the column
+        """
+        column = self.definitions[name]
+        df = self.store.df
+        if name in df.columns and name not in self._written and not overwrite:
+            raise ValueError(f"'{name}' already exists in the data and was not derived here")
+
+        for input_name in column.inputs + column.optional_inputs:
+            if input_name in self.definitions and (input_name not in df.columns or self.is_stale(input_name)):
+                self.materialize(input_name)
+            elif input_name not in df.columns and input_name in column.inputs:
+                raise KeyError(input_name)
+
+        signature = self._signature(column)
+        state = self._written.get(name)
+        if state is not None and state['signature'] == signature and name in df.columns:
+            return state['info']
+
+        params = {param: self.params.get(param) for param in column.params}
+        def compute():
+            result = column.compute(df, params)
+            values, info = result if isinstance(result, tuple) else (result, {})
+            return np.asarray(values), info
+        if self.memo is not None:
+            (values, info), hit = self.memo.get_or_compute(('derived', name, id(df), signature), compute)
+        else:
+            (values, info), hit = compute(), False
+        print(f"🧮 {'Reused' if hit else 'Computed'} derived column '{name}'")
+
+        self._writing = name
+        try:
+            df[name] = values.copy()  # The memo keeps its own copy
+            # Recorded before the store is told, so the undo history sees the column as derived
+            self._written[name] = {'signature': signature, 'info': info}
+            self.store.update_columns([name], label=f"Recalculate {name}", record=record)
+        finally:
+            self._writing = None
+        return info
+
+    def refresh(self, columns):
+        """
+        Recompute the given columns if they are materialized and stale (call before
+        reading them). Columns that are not derived are ignored.
+
+        Returns:
+        - Names of the columns that were recomputed
+        """
+        refreshed = []
+        for name in columns:
+            if name in self.definitions and self.is_stale(name):
+                self.materialize(name)
+                refreshed.append(name)
+        return refreshed
+
+    def snapshot(self):
+        """
+        Parameters and current materialized columns, for saving with the data.
+
+        Returns:
+        - dict with 'params' and 'columns' (name -> info dict)
+        """
+        return {
+            'params': dict(self.params),
+            'columns': {name: state['info'] for name, state in self._written.items() if not self.is_stale(name)},
+        }
+
+    def restore(self, snapshot):
+        """
+        Take back a snapshot() after the data it was taken with has been loaded again:
+        the saved column values are adopted as current instead of being recomputed.
+        Columns that are not in the data (or no longer defined) are skipped.
+        """
+        self.params.update(snapshot.get('params', {}))
+        columns = self.store.df.columns
+        for name, info in snapshot.get('columns', {}).items():
+            if name in self.definitions and name in columns:
+                self._written[name] = {'signature': self._signature(self.definitions[name]), 'info': info}
+
+    def _signature(self, column):
+        columns = self.store.df.columns
+        read = column.inputs + tuple(name for name in column.optional_inputs if name in columns)
+        return (tuple(self.store.column_version(name) for name in read),
+                tuple(self.params.get(param) for param in column.params))
+
+    def _history_state(self):
+        return {'params': dict(self.params), 'written': {name: dict(state) for name, state in self._written.items()}}
+
+    def _restore_history_state(self, state):
+        self.params = dict(state['params'])
+        self._written = {name: dict(written) for name, written in state['written'].items()}
+
+    def _on_data_change(self, change):
+        if change.restored:
+            return  # Ownership and parameters were put back by _restore_history_state
+        if change.kind in ('replace', 'clear'):
+            self._written.clear()
+        elif change.kind == 'append':
+            # The new rows have no values yet; keep the columns but recompute on next access
+            for state in self._written.values():
+                state['signature'] = None
+        else:
+            for name in change.columns:
+                if name in self._written and name != self._writing:
+                    del self._written[name]
+
+_unset = object()
+
+def register_pax_columns(registry):
+    """Define the standard PAX derived columns on a registry."""
+
+    # Any other spelling of the laser power column will do (see pax_model.laser_power_columns)
+    @registry.define('Detected Laser power (W)', inputs=(), optional_inputs=laser_power_columns[1:],
+                     description="Alias of the laser power column for files that spell it differently")
+    def detected_laser_power(df, params):
+        for column in laser_power_columns[1:]:
+            if column in df.columns:
+                return df[column].to_numpy(dtype=float)
+        raise ValueError(f"Laser power column not found (expected one of {list(laser_power_columns)})")
+
+    @registry.define('Extinction_Coefficient', inputs=('Detected Laser power (W)',),
+                     params=('i0_low', 'i0_high', 'i0_segment_filter'), optional_inputs=('Mode',),
+                     description="-ln(I/I0) in 1/Mm, I0 = mean laser power over the I0 rows")
+    def extinction(df, params):
+        if params['i0_low'] is None or params['i0_high'] is None:
+            raise ValueError("Set the I0 region first")
+        values, i0_mean = extinction_values(df, params['i0_low'], params['i0_high'],
+                                            'Detected Laser power (W)', params['i0_segment_filter'])
+        return values, {'i0_mean': float(i0_mean)}
+
+    @registry.define('Extinction_Coefficient - Bscat', inputs=('Extinction_Coefficient', 'Bscat (1/Mm)'),
+                     description="Absorbing-mode calibration Y: extinction minus scattering")
+    def extinction_minus_bscat(df, params):
+        return df['Extinction_Coefficient'].to_numpy(dtype=float) - df['Bscat (1/Mm)'].to_numpy(dtype=float)
+
+    @registry.define('Calculated SSA', inputs=('Bscat (1/Mm)', 'Babs (1/Mm)'),
+                     description="Single scattering albedo Bscat / (Bscat + Babs)")
+    def calculated_ssa(df, params):
+        bscat = df['Bscat (1/Mm)'].to_numpy(dtype=float)
+        bext = bscat + df['Babs (1/Mm)'].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(bext != 0, bscat / bext, np.nan)
+
+    for mode, x_column in (('scattering', 'Bscat (1/Mm)'), ('absorbing', 'Babs (1/Mm)')):
+        def calibrated(df, params, mode=mode, x_column=x_column):
+            slope, intercept = params[f'{mode}_slope'], params[f'{mode}_intercept']
+            if slope is None:
+                raise ValueError(f"Run a {mode} calibration first")
+            return slope * df[x_column].to_numpy(dtype=float) + (intercept or 0.0)
+        registry.register(DerivedColumn(
+            f"{x_column.split(' ')[0]} calibrated (1/Mm)", (x_column,), calibrated,
+            params=(f'{mode}_slope', f'{mode}_intercept'),
+            description=f"{x_column} through the last {mode} calibration line",
+        ))
+
+def register_outlier_column(registry, column):
+    """
+    Define the spike mask of a data column (True where the Hampel filter flags a
+    spike), if not defined yet. The window and threshold are the registry parameters
+    'spike_window' and 'spike_sigmas', so masks are kept per column and window size.
+
+    Returns:
+    - Name of the mask column
+    """
+    name = outlier_column_name(column)
+    if name not in registry.definitions:
+        def spikes(df, params):
+            return hampel_outliers(df[column].to_numpy(dtype=float), params['spike_window'] or hampel_window,
+                                   params['spike_sigmas'] or hampel_sigmas)
+        registry.register(DerivedColumn(name, (column,), spikes, params=('spike_window', 'spike_sigmas'),
+                                        description=f"Hampel filter spikes of {column} (rolling median/MAD)"))
+    return name
@@ -0,0 +1,63 @@
+"""Figure layouts shared by the Tk windows and the headless batch export.
+
+Only matplotlib and pax_model are imported here (no Tk, no GUI data store), so
+batch worker processes can draw the same figures without building the GUI state.
+"""
+import matplotlib.dates as mdates
+
+from pax_model import get_time_axis
+
+#Layout of the 'Big 5' figure: (subplot position, column, y label)
+big5_layout = [
+    (321, 'Bscat (1/Mm)', 'Bscat'),
+    (323, 'Babs (1/Mm)', 'Babs'),
+    (325, 'Bext (1/Mm)', 'Bext'),
+    (322, 'Single Scat Albedo', 'SSA'),
+    (324, 'BC Mass (ug/m3)', 'BC Mass'),
+]
+
+#Layout of the 4x sanity check figure: (subplot position, column, legend label, y label)
+sanity_4x_layout = [
+    (221, 'scat_raw', 'Bscat RAW', 'Bscat RAW'),
+    (222, 'Bext (1/Mm)', 'Bext (1/Mm)', 'Bext'),
+    (223, 'Detected Laser power (W)', 'Detected Laser power (W)', 'Laser Power'),
+    (224, 'time', 'Placeholder', 'Placeholder. "Generate calibration frame" for r^2'),  # Placeholder for the last column
+]
+
+def draw_big5(fig, df):
+    """
+    Draw the 'Big 5' measurements onto a figure. Shared by the Tk window and the headless batch export.
+
+    Parameters:
+    - fig: matplotlib Figure to draw on.
+    - df: pandas DataFrame containing the data to plot.
+    """
+    t = get_time_axis(df)['num']
+    for position, label, y_label in big5_layout:
+        ax = fig.add_subplot(position)
+        locator = mdates.AutoDateLocator()
+        formatter = mdates.ConciseDateFormatter(locator)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(formatter)
+        ax.plot(t, df[label].to_numpy(), label=label)
+        ax.tick_params(axis='both', labelsize='small', labelrotation=20)
+        ax.set_ylabel(y_label)
+
+def draw_4x(fig, df):
+    """
+    Draw the 4x sanity check layout onto a figure. Shared by the Tk window and the headless batch export.
+
+    Parameters:
+    - fig: matplotlib Figure to draw on.
+    - df: pandas DataFrame containing the data to plot.
+    """
+    t = get_time_axis(df)['num']
+    for position, column, label, y_label in sanity_4x_layout:
+        ax = fig.add_subplot(position)
+        locator = mdates.AutoDateLocator()
+        formatter = mdates.ConciseDateFormatter(locator)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(formatter)
+        ax.plot(t, df[column].to_numpy(), label=label)
+        ax.tick_params(axis='both', labelsize='small', labelrotation=20)
+        ax.set_ylabel(y_label)
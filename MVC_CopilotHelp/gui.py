@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.figure import Figure
-import seaborn as sns
 import matplotlib.dates as mdates
 from PIL import ImageTk, Image
 import os
@@ -29,13 +28,22 @@ from data_processing import (
     process_multiple_files_automatically_flexible,
     enhanced_calibration_analysis,
     fix_pax_data_time_issue,
-    calculate_extinction_coefficient,
+    calculate_extinction_coefficient_drift,
     create_extinction_column_if_needed,
-    update_listbox_with_new_column
+    create_extinction_column,
+    derived_columns,
+    update_listbox_with_new_column,
+    segment_mask,
+    spike_mask_columns
 )
 from controller import resource_path, alarm_translate, writeToLog
 from plotting import *
-from modern_calibration_window import ModernCalibrationWindow
+from calibration_engine import IncrementalCalibration
+from memo import analysis_memo
+from segments import find_calibration_candidates, find_i0_candidates
+from session import save_session, load_session, release_session, session_extension, session_is_mapped
+from outliers import hampel_window, is_outlier_column, outlier_column_name
+# modern_calibration_window is imported when the calibration window is first opened
 
 #One class handles the main viewing window, and calls it root for reference; can be passed main application window
 class PAXView:
@@ -102,6 +110,25 @@ class PAXView:
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
         self.ax = self.main_axes.get_axes()
+        
+        # Subplot mode keeps its panels between redraws and only builds the ones on screen.
+        # The scrollbar is only packed when there are more panels than fit in the view
+        self.subplot_grid = SubplotGrid(self.main_plot.get_figure())
+        self.subplot_scrollbar = tk.Scrollbar(self.frame_MC, orient="vertical", command=self.on_subplot_scroll)
+        self.canvas.get_tk_widget().bind('<MouseWheel>', self.on_subplot_mousewheel)
+        self.canvas.get_tk_widget().bind('<Button-4>', self.on_subplot_mousewheel)  # Linux scroll up
+        self.canvas.get_tk_widget().bind('<Button-5>', self.on_subplot_mousewheel)  # Linux scroll down
+        
+        # Recently shown plots are kept as bitmaps, so flipping back to a view is a blit.
+        # After a blit the figure itself is not rebuilt; pending_main_plot holds the build
+        # it still owes, done before anything else draws or scrolls the figure
+        self.render_cache = RenderCache(max_bytes=render_cache_max_bytes)
+        self.pending_main_plot = None
+        self.canvas.mpl_connect('resize_event', lambda event: self.sync_main_figure())
+        constants.data_store.subscribe(self.on_data_change)
+        self.root.bind('<Control-z>', self.undo_data_change)
+        self.root.bind('<Control-y>', self.redo_data_change)
+        self.root.bind('<Control-Z>', self.redo_data_change)  # Ctrl+Shift+Z
 
         #The Middle Right (MR) frame for the calibration options (this will be a collapsible frame)
         self.container_MR = CollapsibleFrame(root, title="Calibration Options")
@@ -156,7 +183,7 @@ class PAXView:
             variable=self.current_valueI0Low,
             command=lambda event: slider_changed(
                 event, 
-                constants.df_main,
+                constants.data_store.df,
                 self.label_sliderI0Low,
                 self.update_plot_from_sliders
             )
@@ -175,7 +202,7 @@ class PAXView:
             variable=self.current_valueI0High,
             command=lambda event: slider_changed(
                 event, 
-                constants.df_main,
+                constants.data_store.df,
                 self.label_sliderI0High,
                 self.update_plot_from_sliders
             )
@@ -204,7 +231,7 @@ class PAXView:
             variable=self.current_valueCalibLow,
             command=lambda event: slider_changed(
                 event, 
-                constants.df_main,
+                constants.data_store.df,
                 self.label_sliderCalibLow,
                 self.update_plot_from_sliders
             )
@@ -223,7 +250,7 @@ class PAXView:
             variable=self.current_valueCalibHigh,
             command=lambda event: slider_changed(
                 event, 
-                constants.df_main,
+                constants.data_store.df,
                 self.label_sliderCalibHigh,
                 self.update_plot_from_sliders
             )
@@ -236,6 +263,12 @@ class PAXView:
         self.label_sliderCalibHigh = tk.Label(self.frame_MR, text="Calib High: Not set", fg='green')
         self.label_sliderCalibHigh.grid(row=10, column=2)
 
+        # Live preview of the calibration fit, refreshed as the sliders and filter entries change
+        self.label_live_fit = tk.Label(self.frame_MR, text="Live fit: --", fg='blue')
+        self.label_live_fit.grid(row=11, column=0, columnspan=3)
+        self.live_calibration = None
+        self.live_calibration_key = None
+
 
         #The text box for the alarm translation; this will be used to translate the alarm codes into the corresponding messages
         self.alarmTextbox = ttk.Entry(self.frame_MR)
@@ -245,6 +278,11 @@ class PAXView:
              text = "Translate Alarm", 
              command = lambda: alarm_translate(self.alarmTextbox.get(), alarm_names, self.log), bg = 'light blue')
         self.translateButton.grid(row = 12, column = 2)
+        
+        self.alarmTimelineButton = tk.Button(self.frame_MR, 
+             text = "Alarm Timeline", 
+             command = lambda: alarm_timeline_window(constants.data_store.df, self.root), bg = 'light blue')
+        self.alarmTimelineButton.grid(row = 13, column = 2)
         # ==========End of the calibration region selection and I0 sliders==========
 
 
@@ -273,18 +311,69 @@ class PAXView:
         )
         self.subplot_checkbox.grid(row=3, column=0, sticky='w')
         
+        self.button_xy = tk.Button(self.frame_BM, text="📈 X vs Y Plot", command=lambda: plot_xy_window(constants.data_store.df, self.root, self), bg='light blue')
+        self.button_xy.grid(row=4, column=0, sticky='w')
+        
+        self.button_find_regions = tk.Button(self.frame_BM, text="🔎 Find Regions", command=self.open_region_finder, bg='light blue')
+        self.button_find_regions.grid(row=5, column=0, sticky='w')
+        
+        self.button_instruments = tk.Button(self.frame_BM, text="🛰️ Instruments", command=lambda: instrument_overlay_window(self.root, self), bg='light blue')
+        self.button_instruments.grid(row=7, column=0, sticky='w')
+        
+        self.button_allan = tk.Button(self.frame_BM, text="📉 Allan Deviation", command=lambda: allan_deviation_window(self.root, self), bg='light blue')
+        self.button_allan.grid(row=9, column=0, sticky='w')
+        
+        # Raw rows, or per-minute/hour/day means for long-term trends (see constants.aggregation_levels)
+        self.aggregation_frame = tk.Frame(self.frame_BM)
+        self.aggregation_frame.grid(row=8, column=0, sticky='w')
+        tk.Label(self.aggregation_frame, text="Resolution:").pack(side="left")
+        self.aggregation_var = tk.StringVar(value='Raw data')
+        self.aggregation_select = ttk.Combobox(self.aggregation_frame, textvariable=self.aggregation_var,
+                                               values=list(aggregation_levels), state='readonly', width=10)
+        self.aggregation_select.pack(side="left")
+        self.aggregation_select.bind('<<ComboboxSelected>>', lambda event: self.update_plot_from_sliders())
+        tk.Button(self.aggregation_frame, text="Export", command=self.export_aggregated_data,
+                  bg='light blue').pack(side="left", padx=(8, 0))
+        
+        # Hampel spike filter for the plots and the calibration (see outliers.py)
+        self.spike_frame = tk.Frame(self.frame_BM)
+        self.spike_frame.grid(row=10, column=0, sticky='w')
+        self.spike_filter = tk.BooleanVar()
+        tk.Checkbutton(self.spike_frame, text="Hide spikes, window:", variable=self.spike_filter,
+                       command=self.update_plot_from_sliders).pack(side="left")
+        self.spike_window_var = tk.StringVar(value=str(hampel_window))
+        self.spike_window_spin = tk.Spinbox(self.spike_frame, from_=3, to=1001, increment=2, width=5,
+                                            textvariable=self.spike_window_var, command=self.on_spike_window_change)
+        self.spike_window_spin.pack(side="left")
+        self.spike_window_spin.bind('<Return>', self.on_spike_window_change)
+        self.spike_window_spin.bind('<FocusOut>', self.on_spike_window_change)
+        
+        # Mode segment filter for the plots and the calibration (see constants.segment_filters)
+        self.segment_filter_frame = tk.Frame(self.frame_BM)
+        self.segment_filter_frame.grid(row=6, column=0, sticky='w')
+        tk.Label(self.segment_filter_frame, text="Show:").pack(side="left")
+        self.segment_filter_var = tk.StringVar(value='All data')
+        self.segment_filter_select = ttk.Combobox(self.segment_filter_frame, textvariable=self.segment_filter_var,
+                                                  values=list(segment_filters), state='readonly', width=14)
+        self.segment_filter_select.pack(side="left")
+        self.segment_filter_select.bind('<<ComboboxSelected>>', self.on_segment_filter_change)
+        # Shade red/yellow alarm episodes behind the traces
+        self.show_alarms = tk.BooleanVar()
+        tk.Checkbutton(self.segment_filter_frame, text="Alarms", variable=self.show_alarms,
+                       command=self.update_plot_from_sliders).pack(side="left", padx=(8, 0))
+        
         # Optional: Add a label to show current mode
-        self.plot_mode_label = tk.Label(self.frame_BM, text="Mode: Subplots (max 4)", fg='blue', font=('Arial', 8))
+        self.plot_mode_label = tk.Label(self.frame_BM, text="Mode: Subplots (scroll for more)", fg='blue', font=('Arial', 8))
         self.plot_mode_label.grid(row=2, column=0, sticky='w')
 
 
         #The bottom middle (BM) frame for the big 5 and 4x plots
         #Commented out for now, as these are redundant with the new plotting system
         # self.frame_BM = tk.Frame(root)
-        # self.button_big5 = tk.Button(self.frame_BM, text="Plot Big 5", command=lambda: plot_big5(constants.df_main, self.root), bg='light blue')
+        # self.button_big5 = tk.Button(self.frame_BM, text="Plot Big 5", command=lambda: plot_big5(constants.data_store.df, self.root), bg='light blue')
         # self.button_big5.grid(row=0, column=0)
         # self.frame_BM.grid(row=4, column=3)
-        # self.button_4x = tk.Button(self.frame_BM, text="Plot 4x", command=lambda: plot_4x(constants.df_main, self.root), bg='light blue')
+        # self.button_4x = tk.Button(self.frame_BM, text="Plot 4x", command=lambda: plot_4x(constants.data_store.df, self.root), bg='light blue')
         # self.button_4x.grid(row=1, column=0)
 
         #The bottom right (BR) frame for the progress bar and version info
@@ -314,6 +403,7 @@ class PAXView:
         self.scrollbar.pack(side="right", fill="y")
 
         self.stored_selection = ()  # Initialize storage
+        self.session_notes = ''  # Calibration window notes, saved with the session
         
         # Bind to preserve selection during focus changes
         self.entry_min.bind('<FocusIn>', self.on_entry_focus_in)
@@ -324,6 +414,11 @@ class PAXView:
         
         self.entry_percent.bind('<FocusIn>', self.on_entry_focus_in)
         self.entry_percent.bind('<FocusOut>', self.on_entry_focus_out)
+        
+        # Live fit preview follows every keystroke and mode change
+        for entry in (self.entry_min, self.entry_max, self.entry_percent):
+            entry.bind('<KeyRelease>', self.update_live_fit)
+        self.calibration_select.bind('<<ComboboxSelected>>', self.update_live_fit)
 
     def on_entry_focus_in(self, event=None):
         """Store selection when entry widget gets focus."""
@@ -450,6 +545,61 @@ class PAXView:
             font=('Arial', 9, 'bold')
         )
         self.debug_button.grid(row=3, column=0, columnspan=3, pady=2, padx=2, sticky='ew')
+        
+        self.drift_extinction_button = tk.Button(
+            self.frame_TL,
+            text="📉 Drift-corrected Extinction",
+            command=self.create_drift_corrected_extinction,
+            width=25,
+            bg='#e67e22',
+            fg='white',
+            font=('Arial', 9, 'bold')
+        )
+        self.drift_extinction_button.grid(row=4, column=0, columnspan=3, pady=2, padx=2, sticky='ew')
+        
+        self.derived_columns_button = tk.Button(
+            self.frame_TL,
+            text="🧮 Derived Columns",
+            command=self.open_derived_columns,
+            width=25,
+            bg='#16a085',
+            fg='white',
+            font=('Arial', 9, 'bold')
+        )
+        self.derived_columns_button.grid(row=5, column=0, columnspan=3, pady=2, padx=2, sticky='ew')
+        
+        self.save_session_button = tk.Button(
+            self.frame_TL,
+            text="💾 Save Session",
+            command=self.save_session_file,
+            width=25,
+            bg='#34495e',
+            fg='white',
+            font=('Arial', 9, 'bold')
+        )
+        self.save_session_button.grid(row=6, column=0, columnspan=3, pady=2, padx=2, sticky='ew')
+        
+        self.open_session_button = tk.Button(
+            self.frame_TL,
+            text="📂 Open Session",
+            command=self.open_session_file,
+            width=25,
+            bg='#34495e',
+            fg='white',
+            font=('Arial', 9, 'bold')
+        )
+        self.open_session_button.grid(row=7, column=0, columnspan=3, pady=2, padx=2, sticky='ew')
+        
+        # Undo/redo of data changes (load, append, clear, recalculated columns); also Ctrl+Z / Ctrl+Y
+        self.history_frame = tk.Frame(self.frame_TL)
+        self.history_frame.grid(row=8, column=0, columnspan=3, pady=2, padx=2, sticky='ew')
+        self.history_frame.columnconfigure((0, 1), weight=1)
+        self.undo_button = tk.Button(self.history_frame, text="↶ Undo", command=self.undo_data_change,
+                                     state='disabled', bg='#bdc3c7', font=('Arial', 9, 'bold'))
+        self.undo_button.grid(row=0, column=0, sticky='ew', padx=(0, 1))
+        self.redo_button = tk.Button(self.history_frame, text="↷ Redo", command=self.redo_data_change,
+                                     state='disabled', bg='#bdc3c7', font=('Arial', 9, 'bold'))
+        self.redo_button.grid(row=0, column=1, sticky='ew', padx=(1, 0))
 
         # Layout the components
         # self.load_single_button.grid(row=0, column=0, columnspan=3, pady=2, padx=2, sticky='ew') #Commented out to avoid confusion with the new multi-file button
@@ -535,7 +685,7 @@ class PAXView:
 
     def analyze_current_data(self):
         """Analyze the currently loaded data (works for both single and multi-file data)."""
-        if constants.df_main.empty:
+        if constants.data_store.df.empty:
             messagebox.showwarning("No Data", "Please load data files first!")
             return
         
@@ -547,9 +697,9 @@ class PAXView:
             self.update_slider_ranges_after_load()
             
             # Show success message
-            row_count = len(constants.df_main)
-            if 'source_file' in constants.df_main.columns:
-                file_count = constants.df_main['source_file'].nunique()
+            row_count = len(constants.data_store.df)
+            if 'source_file' in constants.data_store.df.columns:
+                file_count = constants.data_store.df['source_file'].nunique()
                 message = f"Analysis complete!\n\nData loaded: {row_count:,} rows from {file_count} file(s)"
             else:
                 message = f"Analysis complete!\n\nData loaded: {row_count:,} rows"
@@ -563,7 +713,7 @@ class PAXView:
 
     def show_data_summary(self):
         """Show a detailed summary of the currently loaded data."""
-        if constants.df_main.empty:
+        if constants.data_store.df.empty:
             messagebox.showinfo("Data Summary", "No data currently loaded.")
             return
         
@@ -593,7 +743,8 @@ class PAXView:
             
             # Show columns info
             excluded_cols = ['Alarm', 'time', 'source_file']
-            data_columns = [col for col in constants.df_main.columns if col not in excluded_cols]
+            data_columns = [col for col in constants.data_store.df.columns
+                            if col not in excluded_cols and not is_outlier_column(col)]
             summary += f"\n📊 Data columns: {len(data_columns)}\n"
             
             messagebox.showinfo("Data Summary", summary)
@@ -603,11 +754,11 @@ class PAXView:
 
     def clear_all_data(self):
         """Clear all loaded data with confirmation."""
-        if constants.df_main.empty:
+        if constants.data_store.df.empty:
             messagebox.showinfo("Clear Data", "No data to clear.")
             return
         
-        if messagebox.askyesno("Clear Data", "Are you sure you want to clear all loaded data?\n\nThis action cannot be undone."):
+        if messagebox.askyesno("Clear Data", "Are you sure you want to clear all loaded data?\n\nYou can get it back with Undo (Ctrl+Z)."):
             clear_df()
             self.listbox.delete(0, 'end')
             self.file_path.set("")
@@ -615,12 +766,121 @@ class PAXView:
             messagebox.showinfo("Data Cleared", "All data has been cleared successfully.")
 
 
+    def collect_session_state(self):
+        """Everything besides the data that a saved session restores."""
+        return {
+            'file_path': self.file_path.get(),
+            'file_type': self.selected.get(),
+            'sliders': {
+                'i0_low': int(self.current_valueI0Low.get()),
+                'i0_high': int(self.current_valueI0High.get()),
+                'calib_low': int(self.current_valueCalibLow.get()),
+                'calib_high': int(self.current_valueCalibHigh.get()),
+            },
+            'calibration_mode': self.calibvar.get(),
+            'min': self.entry_min.get(),
+            'max': self.entry_max.get(),
+            'percent': self.entry_percent.get(),
+            'segment_filter': self.segment_filter_var.get(),
+            'show_alarms': bool(self.show_alarms.get()),
+            'resolution': self.aggregation_var.get(),
+            'spike_filter': bool(self.spike_filter.get()),
+            'spike_window': self.spike_window_var.get(),
+            'subplot_mode': bool(self.subplot_mode.get()),
+            'selected_columns': [self.listbox.get(i) for i in self.listbox.curselection()],
+            'notes': self.session_notes,
+            'derived_columns': derived_columns.snapshot(),
+        }
+
+    def apply_session_state(self, state):
+        """Put the GUI back the way collect_session_state() found it (after the data is loaded)."""
+        derived_columns.restore(state.get('derived_columns', {}))
+        self.file_path.set(state.get('file_path', ''))
+        self.selected.set(state.get('file_type', self.selected.get()))
+        self.calibvar.set(state.get('calibration_mode', self.calibvar.get()))
+        for entry, key in ((self.entry_min, 'min'), (self.entry_max, 'max'), (self.entry_percent, 'percent')):
+            entry.delete(0, 'end')
+            entry.insert(0, state.get(key, ''))
+        self.segment_filter_var.set(state.get('segment_filter', 'All data'))
+        self.show_alarms.set(state.get('show_alarms', False))
+        self.aggregation_var.set(state.get('resolution', 'Raw data'))
+        self.spike_filter.set(state.get('spike_filter', False))
+        self.spike_window_var.set(state.get('spike_window', str(hampel_window)))
+        self.subplot_mode.set(state.get('subplot_mode', True))
+        self.on_subplot_toggle()
+        self.session_notes = state.get('notes', '')
+        
+        self.select_listbox_columns(state.get('selected_columns', []))
+        self.update_slider_ranges_after_load(state.get('sliders'))
+
+    def save_session_file(self):
+        """Save the data, sliders, calibration settings, selection and notes to a .paxsession file."""
+        if constants.data_store.df.empty:
+            messagebox.showwarning("No Data", "Please load data files first!")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Save Session",
+            defaultextension=session_extension,
+            filetypes=(("PAX Session", "*" + session_extension),)
+        )
+        if not path:
+            return
+        try:
+            if session_is_mapped(path):
+                self.release_session_file(path)
+            # Spike masks are rebuilt from the data when the filter is used again
+            df = constants.data_store.df
+            save_session(path, df.drop(columns=[column for column in df.columns if is_outlier_column(column)]),
+                         self.collect_session_state())
+            writeToLog(f"Session saved: {os.path.basename(path)}", self.log)
+        except Exception as e:
+            messagebox.showerror("Save Session Error", f"Error saving the session:\n{str(e)}")
+            writeToLog(f"Error saving session: {str(e)}", self.log)
+
+    def release_session_file(self, path):
+        """
+        Before saving over the session the data was opened from: drop the plotted lines
+        and cached analyses that still read the memory-mapped file, load its columns into
+        memory and draw the plots again from those.
+        """
+        self.pending_main_plot = None
+        self.subplot_grid.reset()
+        self.main_plot.get_figure().clear()
+        self.render_cache.clear()
+        analysis_memo.clear()
+        released = release_session(path, constants.data_store)
+        writeToLog(f"Loaded {os.path.basename(path)} into memory to save over it", self.log)
+        if not released:
+            print(f"⚠️ {os.path.basename(path)} is still mapped by an open window")
+        self.update_plot_from_sliders()
+
+    def open_session_file(self):
+        """Replace the current data and settings with a saved session."""
+        if not constants.data_store.df.empty and not messagebox.askyesno(
+                "Open Session", "Opening a session replaces the loaded data and settings. Continue?"):
+            return
+        path = filedialog.askopenfilename(
+            title="Open Session",
+            filetypes=(("PAX Session", "*" + session_extension),)
+        )
+        if not path:
+            return
+        try:
+            df, state = load_session(path)
+            update_df_main(df)
+            self.apply_session_state(state)
+            writeToLog(f"Session opened: {os.path.basename(path)} ({len(df):,} rows)", self.log)
+        except Exception as e:
+            messagebox.showerror("Open Session Error", f"Error opening the session:\n{str(e)}")
+            writeToLog(f"Error opening session: {str(e)}", self.log)
+
     def quit_app(self):
         if messagebox.askyesno("Quit Dialog", "Are you sure you want to quit the app?"):
                   self.root.destroy()
 
     #TODO: Figure out if this is needed, or if it is just a remnant of the old code
     def plot(self, df, x_column, y_column):
+        import seaborn as sns  # Only needed by this legacy method
         fig = Figure(figsize=(5,5))
         ax = fig.add_subplot(111)
         sns.lineplot(data=df, x=x_column, y=y_column, ax=ax)
@@ -638,12 +898,16 @@ class PAXView:
     def mainloop(self):
         self.root.mainloop()
 
-    def update_slider_ranges_after_load(self):
+    def update_slider_ranges_after_load(self, positions=None):
         """
         Call this after loading data to update slider ranges.
+        
+        Parameters:
+        - positions: Optional dict with i0_low, i0_high, calib_low, calib_high (row indices),
+          e.g. from a saved session; default positions are used otherwise
         """
-        if not constants.df_main.empty:
-            max_index = len(constants.df_main) - 1
+        if not constants.data_store.df.empty:
+            max_index = len(constants.data_store.df) - 1
             
             # Update all slider ranges
             self.slider_I0Low.config(to=max_index)
@@ -651,12 +915,18 @@ class PAXView:
             self.slider_CalibLow.config(to=max_index)
             self.slider_CalibHigh.config(to=max_index)
             
-            # Set reasonable default values
-            quarter = max_index // 4
-            self.current_valueI0Low.set(quarter)
-            self.current_valueI0High.set(quarter * 2)
-            self.current_valueCalibLow.set(quarter * 2.5)
-            self.current_valueCalibHigh.set(quarter * 3)
+            if positions:
+                self.current_valueI0Low.set(min(positions['i0_low'], max_index))
+                self.current_valueI0High.set(min(positions['i0_high'], max_index))
+                self.current_valueCalibLow.set(min(positions['calib_low'], max_index))
+                self.current_valueCalibHigh.set(min(positions['calib_high'], max_index))
+            else:
+                # Set reasonable default values
+                quarter = max_index // 4
+                self.current_valueI0Low.set(quarter)
+                self.current_valueI0High.set(quarter * 2)
+                self.current_valueCalibLow.set(quarter * 2.5)
+                self.current_valueCalibHigh.set(quarter * 3)
             
             # Update labels immediately
             self.update_plot_from_sliders()
@@ -666,7 +936,7 @@ class PAXView:
         Handle subplot mode toggle.
         """
         if self.subplot_mode.get():
-            self.plot_mode_label.config(text="Mode: Subplots (max 4)")
+            self.plot_mode_label.config(text="Mode: Subplots (scroll for more)")
         else:
             self.plot_mode_label.config(text="Mode: Single Axis")
         
@@ -677,9 +947,13 @@ class PAXView:
         """
         Enhanced version that preserves listbox selection.
         """
-        if constants.df_main.empty:
+        if constants.data_store.df.empty:
             return
         
+        # Derived columns follow the I0 sliders; they are recomputed only when read below
+        derived_columns.set_params(i0_low=int(self.current_valueI0Low.get()), i0_high=int(self.current_valueI0High.get()))
+        self.update_live_fit()
+        
         # Store current selection BEFORE any updates
         current_selection = self.preserve_listbox_selection()
         
@@ -692,20 +966,38 @@ class PAXView:
         calib_low = int(self.current_valueCalibLow.get())
         calib_high = int(self.current_valueCalibHigh.get())
         
-        # Use the plotting function
-        plot_data_subplots(
-            constants.df_main,
-            current_selection,  # Use stored selection
-            self.main_plot.get_figure(),
-            self.subplot_mode.get(),
-            i0_low,
-            i0_high,
-            calib_low,
-            calib_high
+        # Panels only need rebuilding when one of the plotted columns changed
+        df = constants.data_store.df
+        selected_columns = [df.columns[i] for i in current_selection if i < len(df.columns)]
+        self.refresh_derived_columns(selected_columns)
+        spike_masks = self.spike_masks(selected_columns)
+        
+        plot_args = dict(
+            df=constants.data_store.df,
+            selection=current_selection,  # Use stored selection
+            fig=self.main_plot.get_figure(),
+            subplot_mode=self.subplot_mode.get(),
+            xloc1=i0_low,
+            xloc2=i0_high,
+            xlocA=calib_low,
+            xlocB=calib_high,
+            grid=self.subplot_grid,
+            data_version=constants.data_store.columns_version(selected_columns + list(spike_masks.values())),
+            segment_filter=self.current_segment_filter(),
+            show_alarms=bool(self.show_alarms.get()),
+            aggregation=self.current_aggregation(),
+            hide_spikes=bool(spike_masks)
         )
         
-        # Redraw the canvas
-        self.canvas.draw()
+        # An identical earlier view is blitted without building any artist
+        key = self.main_view_key(current_selection, (i0_low, i0_high, calib_low, calib_high))
+        if self.render_cache.blit(self.canvas, key):
+            self.pending_main_plot = plot_args
+        else:
+            self.pending_main_plot = None
+            plot_data_subplots(**plot_args)
+            self.render_cache.draw(self.canvas, key)
+        self.update_subplot_scrollbar()
         
         # Ensure selection is maintained after plot update
         if current_selection:
@@ -717,34 +1009,187 @@ class PAXView:
         """
         
         #Error alert if no data is loaded or no selection is made; commented out for now due to focus logic for listbox
-        # if constants.df_main.empty or not self.listbox.curselection():
+        # if constants.data_store.df.empty or not self.listbox.curselection():
         #     messagebox.showerror("Error", "No data to plot or no selection made")
         #     return
         
-        # Update the plot mode label based on selection count
+        self.update_plot_from_sliders()
+        self.update_plot_mode_label()
+
+    def main_view_key(self, selection, markers):
+        """
+        Render cache key of the main plot, known before the figure is built. It covers
+        everything that changes the picture: selected columns, plot mode, visible panels,
+        region markers, filters and the version of the plotted columns. The main canvas
+        has no navigation toolbar, so the axis limits follow from these.
+        """
+        columns = tuple(constants.data_store.df.columns[i] for i in selection if i < len(constants.data_store.df.columns))
+        spike_window = self.current_spike_window()
+        if spike_window:
+            columns += tuple(outlier_column_name(column) for column in columns)
+        grid_mode = bool(self.subplot_mode.get()) and len(selection) > 1
+        return (
+            constants.data_store.uid,
+            constants.data_store.columns_version(columns),
+            columns,
+            grid_mode,
+            self.subplot_grid.visible_range(selection) if grid_mode else None,
+            tuple(markers),
+            self.current_segment_filter(),
+            bool(self.show_alarms.get()),
+            self.current_aggregation(),
+            spike_window,
+        )
+
+    def sync_main_figure(self):
+        """Build the figure a blitted view skipped, before the figure is drawn or scrolled."""
+        if self.pending_main_plot is not None:
+            plot_args, self.pending_main_plot = self.pending_main_plot, None
+            plot_data_subplots(**plot_args)
+
+    def draw_main_canvas(self, selection, markers):
+        """Draw the main plot, already built for the given view, through the render cache."""
+        self.render_cache.draw(self.canvas, self.main_view_key(selection, markers))
+
+    def on_data_change(self, change):
+        """
+        React to a DataStore mutation. Bitmaps of older rows can never be shown again,
+        so they are freed straight away; after a derived column changes, views of the
+        other columns stay cached (the keys carry per-column versions).
+        """
+        if change.rows_changed:
+            self.render_cache.clear()
+        self.update_history_buttons()
+
+    def update_history_buttons(self):
+        """Enable the undo/redo buttons when there is something to undo/redo."""
+        self.undo_button.config(state='normal' if constants.data_store.undo_label else 'disabled')
+        self.redo_button.config(state='normal' if constants.data_store.redo_label else 'disabled')
+
+    def undo_data_change(self, event=None):
+        """Revert the last change to the data (button or Ctrl+Z)."""
+        if event is not None and isinstance(event.widget, (tk.Entry, tk.Text)):
+            return  # Leave the shortcut to the text field
+        label = constants.data_store.undo_label
+        if label is None:
+            writeToLog("Nothing to undo", self.log)
+            return
+        self.after_history_change(constants.data_store.undo())
+        writeToLog(f"Undone: {label}", self.log)
+
+    def redo_data_change(self, event=None):
+        """Repeat the last undone change to the data (button, Ctrl+Y or Ctrl+Shift+Z)."""
+        if event is not None and isinstance(event.widget, (tk.Entry, tk.Text)):
+            return
+        label = constants.data_store.redo_label
+        if label is None:
+            writeToLog("Nothing to redo", self.log)
+            return
+        self.after_history_change(constants.data_store.redo())
+        writeToLog(f"Redone: {label}", self.log)
+
+    def after_history_change(self, change):
+        """Bring the listbox, sliders and plot in line with data restored by undo/redo."""
+        selected = [self.listbox.get(i) for i in self.listbox.curselection()]
+        self.select_listbox_columns(selected)
+        
+        # Put the I0 sliders back where the restored extinction column was calculated
+        params = derived_columns.params
+        positions = {
+            'i0_low': params.get('i0_low') if params.get('i0_low') is not None else int(self.current_valueI0Low.get()),
+            'i0_high': params.get('i0_high') if params.get('i0_high') is not None else int(self.current_valueI0High.get()),
+            'calib_low': int(self.current_valueCalibLow.get()),
+            'calib_high': int(self.current_valueCalibHigh.get()),
+        }
+        if constants.data_store.df.empty:
+            self.pending_main_plot = None
+            self.main_plot.get_figure().clear()
+            self.canvas.draw_idle()
+        else:
+            self.update_slider_ranges_after_load(positions)
+
+    def select_listbox_columns(self, names):
+        """Reload the listbox from the data and select the given column names (where present)."""
+        simple_listbox_load(self.listbox)
+        names = set(names)
+        for i, name in enumerate(self.listbox.get(0, 'end')):
+            if name in names:
+                self.listbox.selection_set(i)
+
+    def update_plot_mode_label(self):
+        """
+        Update the plot mode label based on selection count and the visible subplot panels.
+        """
         selection_count = len(self.listbox.curselection())
         if self.subplot_mode.get() and selection_count > 1:
-            shown_plots = min(selection_count, 4)
-            self.plot_mode_label.config(text=f"Mode: Subplots ({shown_plots} of {selection_count} shown)")
+            first, last = self.subplot_grid.visible_range()
+            self.plot_mode_label.config(text=f"Mode: Subplots ({first + 1}-{last} of {selection_count} shown)")
         elif self.subplot_mode.get():
             self.plot_mode_label.config(text="Mode: Single Plot")
         else:
             self.plot_mode_label.config(text=f"Mode: Single Axis ({selection_count} traces)")
-        
-        self.update_plot_from_sliders()
+
+    def update_subplot_scrollbar(self):
+        """
+        Show the subplot scrollbar only when there are more panels than fit on screen.
+        """
+        panel_count = len(self.subplot_grid.selection)
+        if self.subplot_mode.get() and panel_count > self.subplot_grid.panels_per_view:
+            first, last = self.subplot_grid.visible_range()
+            self.subplot_scrollbar.set(first / panel_count, last / panel_count)
+            if not self.subplot_scrollbar.winfo_ismapped():
+                self.subplot_scrollbar.pack(side="right", fill="y", before=self.canvas.get_tk_widget())
+        elif self.subplot_scrollbar.winfo_ismapped():
+            self.subplot_scrollbar.pack_forget()
+
+    def scroll_subplots(self, first_panel):
+        """
+        Move the subplot window; panels scrolling into view for the first time are created here.
+        """
+        if not self.subplot_mode.get() or not self.subplot_grid.selection:
+            return
+        self.sync_main_figure()
+        previous = self.subplot_grid.first_panel
+        self.subplot_grid.scroll_to(first_panel)
+        if self.subplot_grid.first_panel != previous:
+            self.draw_main_canvas(self.subplot_grid.selection, self.subplot_grid.markers)
+            self.update_subplot_scrollbar()
+            self.update_plot_mode_label()
+
+    def on_subplot_scroll(self, *args):
+        """
+        Scrollbar command handler ('moveto', fraction) or ('scroll', n, 'units'/'pages').
+        """
+        panel_count = len(self.subplot_grid.selection)
+        if args[0] == 'moveto':
+            self.scroll_subplots(round(float(args[1]) * panel_count))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.subplot_grid.panels_per_view
+            self.scroll_subplots(self.subplot_grid.first_panel + step)
+
+    def on_subplot_mousewheel(self, event):
+        """
+        Scroll the subplot panels one at a time with the mouse wheel.
+        """
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_subplots(self.subplot_grid.first_panel - 1)
+        else:
+            self.scroll_subplots(self.subplot_grid.first_panel + 1)
 
     #Possibly move this to data_processing.py if it is more relevant there
     def create_extinction_column_manually(self):
         """
         Manually create an extinction coefficient column for calibration analysis.
         """
-        if constants.df_main.empty:
+        if constants.data_store.df.empty:
             messagebox.showwarning("No Data", "Please load data files first!")
             return
         
         try:
             # Check if extinction column already exists
-            if 'Extinction_Coefficient' in constants.df_main.columns:
+            if 'Extinction_Coefficient' in constants.data_store.df.columns:
                 overwrite = messagebox.askyesno(
                     "Column Exists", 
                     "Extinction_Coefficient column already exists.\n\nDo you want to recalculate it?"
@@ -767,12 +1212,7 @@ class PAXView:
                                     f"I0 region only has {i0_high - i0_low} points. Consider using a larger region for better baseline calculation.")
             
             # Create the extinction coefficient column
-            constants.df_main, i0_baseline = calculate_extinction_coefficient(
-                constants.df_main, 
-                i0_low, 
-                i0_high,
-                calculated_column_name='Extinction_Coefficient'
-            )
+            i0_baseline = create_extinction_column(i0_low, i0_high)
             
             # Update the listbox and highlight the new column
             update_listbox_with_new_column(self, highlight_column='Extinction_Coefficient')
@@ -794,12 +1234,321 @@ class PAXView:
             messagebox.showerror("Error", error_msg)
             writeToLog(f"Extinction coefficient error: {str(e)}", self.log)
 
+    def create_drift_corrected_extinction(self):
+        """
+        Build the Extinction_Coefficient column from a time-varying I0 baseline,
+        interpolated between every particle-free period found in the data.
+        """
+        if constants.data_store.df.empty:
+            messagebox.showwarning("No Data", "Please load data files first!")
+            return
+        
+        try:
+            df, info = calculate_extinction_coefficient_drift(
+                constants.data_store.df,
+                calculated_column_name='Extinction_Coefficient'
+            )
+            constants.data_store.update_columns(['Extinction_Coefficient', 'I0_Baseline (W)'], df)
+            
+            # Update the listbox and highlight the recalculated column
+            update_listbox_with_new_column(self, highlight_column='Extinction_Coefficient')
+            
+            success_msg = (
+                f"✅ Drift-corrected Extinction Created!\n\n"
+                f"📊 I0 from {len(info['periods'])} zero period(s)\n"
+                f"📈 Baseline: {info['baseline_min']:.6f} to {info['baseline_max']:.6f} W\n"
+                f"🔬 Columns: 'Extinction_Coefficient', 'I0_Baseline (W)'"
+            )
+            if 'Debug Ext Calculation' in constants.data_store.df.columns:
+                success_msg += "\n\n⚠️ 'Debug Ext Calculation' exists and is still preferred by the calibration."
+            
+            messagebox.showinfo("Success", success_msg)
+            writeToLog(f"Created drift-corrected Extinction_Coefficient ({len(info['periods'])} zero periods)", self.log)
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Error creating drift-corrected extinction column: {str(e)}")
+            writeToLog(f"Drift-corrected extinction error: {str(e)}", self.log)
+
+    def refresh_derived_columns(self, columns):
+        """Recompute the given derived columns if their inputs or parameters changed since they were built."""
+        try:
+            refreshed = derived_columns.refresh(columns)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ Could not update derived columns: {str(e)}")
+            return
+        if refreshed:
+            writeToLog(f"Updated derived column(s): {', '.join(refreshed)}", self.log)
+
+    def open_derived_columns(self):
+        """
+        List the registered derived columns with their inputs and state, and add the
+        selected ones to the data. Added columns are kept up to date when they are read.
+        """
+        window = tk.Toplevel(self.root)
+        window.title("Derived Columns")
+        window.geometry("900x320")
+        
+        columns = ('name', 'inputs', 'status', 'description')
+        tree = ttk.Treeview(window, columns=columns, show='headings', selectmode='extended', height=8)
+        for column, width in zip(columns, (210, 230, 140, 300)):
+            tree.heading(column, text=column.capitalize())
+            tree.column(column, width=width)
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        def status(name):
+            if derived_columns.is_stale(name):
+                return "stale (updates when read)"
+            if derived_columns.is_materialized(name):
+                return "in data"
+            if name in constants.data_store.df.columns:
+                return "provided by file"
+            missing = derived_columns.missing_inputs(name)
+            return f"missing {', '.join(missing)}" if missing else "available"
+        
+        def fill():
+            tree.delete(*tree.get_children())
+            for name, column in derived_columns.definitions.items():
+                inputs = ", ".join(column.inputs + column.params)
+                tree.insert('', 'end', iid=name, values=(name, inputs, status(name), column.description))
+        
+        def add_selected():
+            if constants.data_store.df.empty:
+                messagebox.showwarning("No Data", "Please load data first!", parent=window)
+                return
+            added = []
+            for name in tree.selection():
+                if name in constants.data_store.df.columns and not derived_columns.is_materialized(name):
+                    continue  # Never replace a column the file provides
+                try:
+                    derived_columns.materialize(name, record=True)
+                    added.append(name)
+                except (ValueError, KeyError) as e:
+                    messagebox.showerror("Derived Column", f"Could not build '{name}': {str(e)}", parent=window)
+            if added:
+                update_listbox_with_new_column(self, highlight_column=added[-1])
+                writeToLog(f"Added derived column(s): {', '.join(added)}", self.log)
+            fill()
+        
+        tk.Button(window, text="Add / Update Selected", command=add_selected, bg='light blue').pack(pady=(0, 10))
+        fill()
+
+    def current_segment_filter(self):
+        """Return the selected Mode segment filter name, or None when all data is shown."""
+        name = self.segment_filter_var.get()
+        return None if segment_filters.get(name, None) is None else name
+
+    def current_aggregation(self):
+        """Return the selected bucket size (e.g. '1h'), or None for raw data."""
+        return aggregation_levels.get(self.aggregation_var.get())
+
+    def export_aggregated_data(self):
+        """
+        Save mean/median/min/max/std/count per time bucket of the selected columns
+        (at the chosen resolution, within the segment filter) to .csv or .xlsx.
+        """
+        df = constants.data_store.df
+        if df.empty:
+            messagebox.showwarning("No Data", "Please load data files first!")
+            return
+        columns = [self.listbox.get(i) for i in self.listbox.curselection()]
+        columns = [column for column in columns
+                   if column in df.columns and not is_outlier_column(column) and pd.api.types.is_numeric_dtype(df[column])]
+        if not columns:
+            messagebox.showwarning("No Columns", "Select the columns to aggregate in the list first.")
+            return
+        rule = self.current_aggregation()
+        if rule is None:
+            messagebox.showwarning("No Resolution", "Choose a resolution (1 min, 1 hour, 1 day) first.")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Aggregated Data",
+            defaultextension='.csv',
+            filetypes=(("Comma Separated", "*.csv"), ("Excel", "*.xlsx"))
+        )
+        if not path:
+            return
+        try:
+            self.refresh_derived_columns(columns)
+            table = time_aggregator.aggregate(columns, rule, self.current_segment_filter())
+            table.columns = [f"{column} {stat}" for column, stat in table.columns]
+            if path.lower().endswith('.xlsx'):
+                table.to_excel(path)
+            else:
+                table.to_csv(path)
+            writeToLog(f"Exported {len(table):,} {self.aggregation_var.get()} buckets to {os.path.basename(path)}", self.log)
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Error exporting aggregated data: {str(e)}")
+
+    def current_spike_window(self):
+        """Return the Hampel spike filter window (samples) when the filter is on, else None."""
+        if not self.spike_filter.get():
+            return None
+        try:
+            window = int(self.spike_window_var.get())
+        except ValueError:
+            return None
+        return window if window >= 3 else None
+
+    def spike_masks(self, columns):
+        """
+        Make the spike mask columns of the given columns current when the spike filter is on.
+        
+        Returns:
+        - dict of column -> mask column name (empty when the filter is off)
+        """
+        spike_window = self.current_spike_window()
+        if spike_window is None:
+            return {}
+        try:
+            return spike_mask_columns(columns, spike_window)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ Could not update spike masks: {str(e)}")
+            return {}
+
+    def on_spike_window_change(self, event=None):
+        if self.spike_filter.get():
+            self.update_plot_from_sliders()  # Also refreshes the live fit
+
+    def on_segment_filter_change(self, event=None):
+        if not constants.data_store.df.empty and self.current_segment_filter() and 'Mode' not in constants.data_store.df.columns:
+            messagebox.showwarning("No Mode Column", "This data has no 'Mode' column, so the segment filter has no effect.")
+        self.update_plot_from_sliders()  # Also refreshes the live fit
+
+    def update_live_fit(self, event=None):
+        """
+        Show the slope, R² and point count the calibration would give for the current
+        region and filters. The engine keeps prefix sums, so slider moves are O(1);
+        it is rebuilt only when the data, mode or extinction column changes.
+        """
+        mode = self.calibvar.get()
+        if constants.data_store.df.empty or mode not in ('Scattering', 'Absorbing'):
+            self.label_live_fit.config(text="Live fit: --")
+            return
+        
+        if 'Debug Ext Calculation' in constants.data_store.df.columns:
+            ext_column = 'Debug Ext Calculation'
+        elif 'Extinction_Coefficient' in constants.data_store.df.columns:
+            ext_column = 'Extinction_Coefficient'
+        else:
+            self.label_live_fit.config(text="Live fit: create an extinction column first")
+            return
+        
+        try:
+            min_val = float(self.entry_min.get()) if self.entry_min.get() else 0
+            max_val = float(self.entry_max.get()) if self.entry_max.get() else 100
+            percent = float(self.entry_percent.get()) if self.entry_percent.get() else 10
+        except ValueError:
+            self.label_live_fit.config(text="Live fit: invalid filter value")
+            return
+        
+        try:
+            segment_filter = self.current_segment_filter()
+            # Rebuilt only when a column the fit reads changed (not for unrelated derived columns)
+            fit_columns = (ext_column, 'Bscat (1/Mm)', 'Babs (1/Mm)')
+            self.refresh_derived_columns(fit_columns)
+            x_column = 'Bscat (1/Mm)' if mode == 'Scattering' else 'Babs (1/Mm)'
+            spike_column = self.spike_masks([x_column]).get(x_column)
+            if spike_column:
+                fit_columns += (spike_column,)
+            key = (constants.data_store.columns_version(fit_columns), mode, ext_column, segment_filter, spike_column)
+            if self.live_calibration_key != key:
+                df = constants.data_store.df
+                self.live_calibration = IncrementalCalibration(df, mode, ext_column, row_mask=segment_mask(df, segment_filter),
+                                                               outlier_mask=df[spike_column].to_numpy(dtype=bool) if spike_column else None)
+                self.live_calibration_key = key
+            self.live_calibration.set_filters(min_val, max_val, percent)
+            
+            calib_low = int(self.current_valueCalibLow.get())
+            calib_high = int(self.current_valueCalibHigh.get())
+            fit = self.live_calibration.fit(min(calib_low, calib_high), max(calib_low, calib_high))
+        except KeyError as e:
+            self.label_live_fit.config(text=f"Live fit: missing column {e}")
+            return
+        
+        if np.isnan(fit['slope']):
+            self.label_live_fit.config(text=f"Live fit: not enough points (n={fit['count']})")
+        else:
+            self.label_live_fit.config(text=f"Live fit: slope {fit['slope']:.4f}, R² {fit['r2']:.4f}, n={fit['count']}")
+
+    def open_region_finder(self):
+        """
+        Scan the whole dataset for particle-free (I0) plateaus and calibration ramps
+        and list them ranked; double-click (or Jump) moves the sliders to a candidate.
+        """
+        if constants.data_store.df.empty:
+            messagebox.showwarning("No Data", "Please load data first!")
+            return
+        
+        mode = self.calibvar.get() if self.calibvar.get() in ('Scattering', 'Absorbing') else 'Scattering'
+        ext_column = None
+        for column in ('Debug Ext Calculation', 'Extinction_Coefficient'):
+            if column in constants.data_store.df.columns:
+                ext_column = column
+                break
+        
+        try:
+            i0_candidates = find_i0_candidates(constants.data_store.df)
+            calib_candidates = find_calibration_candidates(constants.data_store.df, mode, ext_column)
+        except KeyError as e:
+            messagebox.showerror("Find Regions", f"Missing column needed for region detection: {e}")
+            return
+        
+        print(f"🔎 Found {len(i0_candidates)} I0 and {len(calib_candidates)} calibration candidates ({mode})")
+        
+        finder = tk.Toplevel(self.root)
+        finder.title("Find Regions")
+        
+        def describe_range(candidate):
+            start_text = time_of_day_text(constants.data_store.df, candidate['start']) or candidate['start']
+            stop_text = time_of_day_text(constants.data_store.df, candidate['stop']) or candidate['stop']
+            return f"{start_text} - {stop_text}"
+        
+        sections = (
+            ("Particle-free (I0) regions", i0_candidates, ('mean', 'std'),
+             self.current_valueI0Low, self.current_valueI0High, self.label_sliderI0Low, self.label_sliderI0High),
+            (f"Calibration regions ({mode}{'' if ext_column else ', no extinction column yet'})", calib_candidates, ('r2', 'x_min', 'x_max'),
+             self.current_valueCalibLow, self.current_valueCalibHigh, self.label_sliderCalibLow, self.label_sliderCalibHigh),
+        )
+        
+        for title, candidates, extra_columns, low_var, high_var, low_label, high_label in sections:
+            frame = ttk.Labelframe(finder, text=title)
+            frame.pack(fill="both", expand=True, padx=10, pady=5)
+            
+            columns = ('rank', 'kind', 'range', 'rows', 'score') + extra_columns
+            tree = ttk.Treeview(frame, columns=columns, show='headings', height=6)
+            for column in columns:
+                tree.heading(column, text=column)
+                tree.column(column, width=150 if column == 'range' else 80, anchor='center')
+            for rank, candidate in enumerate(candidates, start=1):
+                extras = tuple('--' if candidate[c] is None else f"{candidate[c]:.3f}" for c in extra_columns)
+                tree.insert('', 'end', iid=str(rank - 1), values=(
+                    rank, candidate['kind'], describe_range(candidate),
+                    candidate['stop'] - candidate['start'], f"{candidate['score']:.2f}") + extras)
+            tree.pack(side="left", fill="both", expand=True)
+            
+            def jump(event=None, tree=tree, candidates=candidates, low_var=low_var, high_var=high_var, low_label=low_label, high_label=high_label):
+                chosen = tree.selection()
+                if not chosen:
+                    return
+                candidate = candidates[int(chosen[0])]
+                low_var.set(candidate['start'])
+                high_var.set(candidate['stop'])
+                # Update the slider labels the same way a drag would (the last call redraws the plot)
+                slider_changed(candidate['start'], constants.data_store.df, low_label, lambda: None)
+                slider_changed(candidate['stop'], constants.data_store.df, high_label, self.update_plot_from_sliders)
+                writeToLog(f"Jumped to {candidate['kind']} region rows {candidate['start']}-{candidate['stop']}", self.log)
+            
+            tree.bind('<Double-1>', jump)
+            tk.Button(frame, text="Jump", command=jump, bg='light green').pack(side="right", padx=5)
+            if not candidates:
+                tk.Label(frame, text="No candidates found", fg='red').pack(side="right")
+
     def debug_current_calibration(self):
         """
         Debug current calibration settings.
         """
         
-        if constants.df_main.empty:
+        if constants.data_store.df.empty:
             messagebox.showwarning("No Data", "Please load data first!")
             return
         
@@ -820,8 +1569,11 @@ class PAXView:
             
             # Run the enhanced analysis in debug mode
             try:
+                x_column = 'Bscat (1/Mm)' if mode == 'Scattering' else 'Babs (1/Mm)'
                 filtered_data, debug_info = enhanced_calibration_analysis(
-                    constants.df_main, xlocA, xlocB, min_val, max_val, percent, mode
+                    constants.data_store.df, xlocA, xlocB, min_val, max_val, percent, mode,
+                    segment_filter=self.current_segment_filter(),
+                    outlier_column=self.spike_masks([x_column]).get(x_column)
                 )
                 
                 # Show success summary
@@ -843,6 +1595,7 @@ class PAXView:
                         summary += f"• {rec}\n"
                 
                 messagebox.showinfo("Debug Results", summary)
+                print(analysis_memo.report())
                 
             except ValueError as e:
                 # Show detailed error analysis
@@ -901,6 +1654,7 @@ def create_modern_calibration_window(parent_window, gui_instance, constants_modu
     Function to create the calibration window.
     Call this from the "Generate calibration frame" button.
     """
+    from modern_calibration_window import ModernCalibrationWindow
     return ModernCalibrationWindow(parent_window, gui_instance, constants_module)
 
 #Creates a collapsible tkinter frame, for selectively hiding elements. Each instance of the collapsible frame can toggle itself
@@ -0,0 +1,253 @@
+"""Several instruments loaded side by side for intercomparisons.
+
+Each instrument (a PAX serial number, or e.g. a reference nephelometer named after
+its file) has its own DataStore, so its rows, versions and caches stay separate
+instead of being concatenated into one stream. For comparisons the instruments are
+aligned onto one time grid with a sorted as-of join: every grid time takes the
+nearest sample of each instrument within a tolerance, or NaN when there is none.
+
+Example:
+    instruments = InstrumentSet()
+    instruments.load_files(['PAX-001_20250130.csv', 'PAX-002_20250130.csv'])
+    aligned = instruments.align(['Bscat (1/Mm)'], freq='1min', tolerance='30s')
+    print(instruments.compare(aligned, 'Bscat (1/Mm)'))
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from data_store import DataStore
+from memo import analysis_memo
+from outliers import is_outlier_column
+from pax_model import PAXModel, build_time_axis
+
+instrument_serial_pattern = re.compile(r'(?P<serial>PAX-[^_]+)_', re.IGNORECASE)
+
+#Columns that are not measurements
+metadata_columns = ('Alarm', 'time', 'source_file')
+
+def instrument_name(file_path):
+    """Instrument a file belongs to: its PAX serial (PAX-123_20250131.csv), else the file name."""
+    base = os.path.basename(file_path)
+    match = instrument_serial_pattern.search(base)
+    return match.group('serial').upper() if match else os.path.splitext(base)[0]
+
+def aligned_column_name(column, instrument):
+    """Name of one instrument's column in an align() result."""
+    return f"{column} [{instrument}]"
+
+def _sorted_times(df):
+    """
+    Sample times of a dataset as sorted datetime64[ns], with the row of each.
+
+    Returns:
+    - times, rows: numpy arrays; rows is None when the data is already in time order
+    """
+    if 'time' not in df.columns or not np.issubdtype(df['time'].dtype, np.datetime64):
+        raise ValueError("Aligning instruments needs a date/time 'time' column")
+    times = df['time'].to_numpy().astype('datetime64[ns]')
+    valid = ~np.isnat(times)
+    if valid.all() and (len(times) < 2 or (times[1:] >= times[:-1]).all()):
+        return times, None
+    rows = np.flatnonzero(valid)
+    rows = rows[np.argsort(times[rows], kind='stable')]
+    return times[rows], rows
+
+class InstrumentSet:
+    """
+    One DataStore per instrument, in the order they were added.
+    Read an instrument's data through instruments[name].df.
+    """
+    def __init__(self):
+        self.stores = {}
+        self._time_axes = {}  # name -> (store, rows_version, axis), one per instrument
+
+    def __len__(self):
+        return len(self.stores)
+
+    def __contains__(self, name):
+        return name in self.stores
+
+    def __getitem__(self, name):
+        return self.stores[name]
+
+    @property
+    def names(self):
+        return list(self.stores)
+
+    def add(self, name, df):
+        """
+        Put a dataset in the instrument's store (replacing what it held).
+
+        Returns:
+        - The instrument's DataStore
+        """
+        store = self.stores.get(name)
+        if store is None:
+            # Instruments have no undo history; the main data store keeps that
+            store = self.stores[name] = DataStore(undo_max_steps=0)
+        store.replace(df)
+        return store
+
+    def remove(self, name):
+        self.stores.pop(name, None)
+        self._time_axes.pop(name, None)
+
+    def time_axis(self, name):
+        """
+        Time axis of an instrument's data (see pax_model.get_time_axis), cached per
+        instrument and rebuilt when its rows change. Kept apart from the main data's
+        cache, so overlaying many instruments does not evict each other's axes.
+        """
+        store = self.stores[name]
+        entry = self._time_axes.get(name)
+        if entry is None or entry[0] is not store or entry[1] != store.rows_version:
+            entry = self._time_axes[name] = (store, store.rows_version, build_time_axis(store.df))
+        return entry[2]
+
+    def load_files(self, file_paths, file_format=None):
+        """
+        Load files, grouped by instrument (see instrument_name); the files of one
+        instrument are combined in time order into its store.
+
+        Returns:
+        - results: dict of instrument name -> pax_model.LoadResult
+        """
+        groups = {}
+        for file_path in file_paths:
+            groups.setdefault(instrument_name(file_path), []).append(file_path)
+        results = {}
+        for name, paths in groups.items():
+            model = PAXModel()
+            results[name] = model.load(*paths, file_format=file_format)
+            self.add(name, model.df)
+            print(f"🛰️ {name}: {results[name].rows:,} rows from {len(results[name].files)} file(s)")
+        return results
+
+    def time_range(self, name):
+        """First and last sample time of an instrument (None, None without times)."""
+        try:
+            times, _ = _sorted_times(self.stores[name].df)
+        except ValueError:
+            return None, None
+        if not len(times):
+            return None, None
+        return pd.Timestamp(times[0]), pd.Timestamp(times[-1])
+
+    def overlap(self, names=None):
+        """
+        Time span covered by every given instrument.
+
+        Returns:
+        - (start, end), or None if the instruments never ran at the same time
+        """
+        ranges = [self.time_range(name) for name in (names or self.names)]
+        if not ranges or any(start is None for start, _ in ranges):
+            return None
+        start, end = max(r[0] for r in ranges), min(r[1] for r in ranges)
+        return (start, end) if start <= end else None
+
+    def common_columns(self, names=None):
+        """Numeric measurement columns present in every given instrument, in the first one's order."""
+        names = names or self.names
+        if not names:
+            return []
+        frames = [self.stores[name].df for name in names]
+        return [column for column in frames[0].columns
+                if column not in metadata_columns and not is_outlier_column(column)
+                and all(column in df.columns and pd.api.types.is_numeric_dtype(df[column]) for df in frames)]
+
+    def align(self, columns, names=None, freq=None, reference=None, tolerance='2s'):
+        """
+        Put columns of several instruments side by side on one time grid.
+
+        Parameters:
+        - columns: Column names to take from every instrument
+        - names: Instruments to include (default all)
+        - freq: Regular grid spacing over the common time span (e.g. '1s', '1min');
+          default: the timestamps of the reference instrument
+        - reference: Instrument whose timestamps form the grid when freq is None (default the first)
+        - tolerance: Largest time difference between a grid time and the sample used for it
+
+        Returns:
+        - DataFrame with 'time' and one column per column and instrument (see aligned_column_name)
+        """
+        names = list(names or self.names)
+        if not names:
+            raise ValueError("No instruments loaded")
+        tolerance = pd.Timedelta(tolerance)
+
+        if freq is None:
+            reference = reference or names[0]
+            grid, _ = _sorted_times(self.stores[reference].df)
+            grid_key = ('reference', reference, self.stores[reference].rows_version, id(self.stores[reference]))
+        else:
+            span = self.overlap(names)
+            if span is None:
+                raise ValueError("The instruments have no common time span")
+            grid = pd.date_range(span[0].floor(freq), span[1].ceil(freq), freq=freq).to_numpy().astype('datetime64[ns]')
+            grid_key = ('freq', freq, grid[0], len(grid))
+
+        aligned = {'time': grid}
+        for name in names:
+            store = self.stores[name]
+            rows = self._aligned_rows(name, grid, grid_key, tolerance)
+            matched = rows >= 0
+            for column in columns:
+                if column not in store.df.columns:
+                    raise KeyError(f"{name} has no column '{column}'")
+                values = store.df[column].to_numpy(dtype=float)
+                out = np.full(len(grid), np.nan)
+                out[matched] = values[rows[matched]]
+                aligned[aligned_column_name(column, name)] = out
+        return pd.DataFrame(aligned)
+
+    def _aligned_rows(self, name, grid, grid_key, tolerance):
+        """Row of the instrument's data used for every grid time (-1 when none is within tolerance)."""
+        store = self.stores[name]
+        key = ('instrument_rows', name, store.uid, store.rows_version, grid_key, tolerance.value)
+
+        def compute():
+            times, order = _sorted_times(store.df)
+            right = pd.DataFrame({'time': times, 'row': np.arange(len(times)) if order is None else order})
+            joined = pd.merge_asof(pd.DataFrame({'time': grid}), right, on='time',
+                                   direction='nearest', tolerance=tolerance)
+            return joined['row'].fillna(-1).to_numpy(dtype=np.int64)
+
+        rows, _ = analysis_memo.get_or_compute(key, compute)
+        return rows
+
+    def compare(self, aligned, column, reference=None):
+        """
+        Agreement of every instrument with a reference for one aligned column.
+
+        Parameters:
+        - aligned: Result of align() that includes column
+        - column: Measurement column, e.g. 'Bscat (1/Mm)'
+        - reference: Reference instrument (default the first aligned one)
+
+        Returns:
+        - DataFrame with one row per other instrument: pairs, mean difference, slope,
+          intercept and R² of instrument vs reference
+        """
+        names = [name for name in self.names if aligned_column_name(column, name) in aligned.columns]
+        reference = reference or names[0]
+        x_all = aligned[aligned_column_name(column, reference)].to_numpy()
+        rows = []
+        for name in names:
+            if name == reference:
+                continue
+            y_all = aligned[aligned_column_name(column, name)].to_numpy()
+            both = np.isfinite(x_all) & np.isfinite(y_all)
+            x, y = x_all[both], y_all[both]
+            row = {'instrument': name, 'reference': reference, 'pairs': int(both.sum()),
+                   'mean_difference': np.nan, 'slope': np.nan, 'intercept': np.nan, 'r2': np.nan}
+            if len(x) >= 2 and np.ptp(x) > 0:
+                slope, intercept = np.polyfit(x, y, 1)
+                r = np.corrcoef(x, y)[0, 1]
+                row.update(mean_difference=float(np.mean(y - x)), slope=float(slope),
+                           intercept=float(intercept), r2=float(r * r))
+            rows.append(row)
+        return pd.DataFrame(rows, columns=['instrument', 'reference', 'pairs', 'mean_difference', 'slope', 'intercept', 'r2'])
@@ -1,22 +1,19 @@
 #This is the main file that runs the application. It runs the main loop.
+#Only what is needed to put the window on screen is imported up front; the heavy
+#analysis modules (scipy, seaborn, Excel engines) are preloaded after the first paint.
 
+from controller import StartupTimer, preload_modules_in_background, writeToLog #provides utility functions for common tasks
+startup_timer = StartupTimer()
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from matplotlib.figure import Figure
-import seaborn as sns
-import matplotlib.dates as mdates
+startup_timer.mark("Import tkinter")
 
-#Imports the other modules in the same directory
-from controller import * #provides utility functions for common tasks
-from gui import * #The central hub that interfaces with the user
 from constants import * #Constants and global variables
-from plotting import * #functions that handle visualization
-from data_processing import * #functions that handle file loading and data frame manipulation
-from modern_calibration_window import * #handles the calibration window for the PAX data
+startup_timer.mark("Import constants (pandas)")
+
+#The central hub that interfaces with the user; also pulls in plotting (matplotlib) and data_processing
+from gui import PAXView
+startup_timer.mark("Import gui/plotting (matplotlib)")
 
 def main():
     """
@@ -24,9 +21,27 @@ def main():
     Initializes the Tkinter root window and starts the main loop.
     """
     root = tk.Tk()  # Create the root window
+    startup_timer.mark("Create Tk root")
     app = PAXView(root)  # Instantiate the PAXView class
+    startup_timer.mark("Build main window")
+    root.update()  # First paint, before anything else is loaded
+    startup_timer.mark("First paint")
+    
+    print(startup_timer.report())
+    writeToLog(f"Window ready in {startup_timer.total():.2f} s", app.log)
+    
+    def report_preload(timings):
+        lines = ["📦 Background preload:"]
+        for name, result in timings:
+            lines.append(f"  {name:38} {result * 1000:8.1f} ms" if isinstance(result, float) else f"  {name:38} {result}")
+        print("\n".join(lines))
+    
+    # Load the heavy modules while the user is still picking files
+    root.after(200, lambda: preload_modules_in_background(background_preload_modules, report_preload))
     app.mainloop()  # Start the Tkinter main loop
 
 #If this file is run as a script, call the main function
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import multiprocessing
+    multiprocessing.freeze_support()  # Needed for worker processes (Allan deviation sweep) in a PyInstaller build
+    main()
@@ -0,0 +1,116 @@
+"""Shared memoization of derived analyses (extinction columns, calibration filtering,
+plot preprocessing).
+
+Keys are tuples of whatever determines the result: the DataStore column versions of
+the columns read plus the call parameters. Entries are evicted least recently used
+first once their estimated size exceeds the byte budget.
+"""
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from pax_config import analysis_memo_max_bytes
+
+_missing = object()
+
+def estimate_bytes(value):
+    """Rough memory footprint of a cached value (arrays and frames dominate)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.Series, pd.DataFrame, pd.Index)):
+        usage = value.memory_usage(index=True, deep=False)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+class Memo:
+    """
+    LRU memo table with a memory budget and hit/miss statistics.
+    Cached values are shared between callers, so treat them as read-only.
+    """
+    def __init__(self, max_bytes=analysis_memo_max_bytes, name='memo'):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+
+    def get(self, key, default=None):
+        """Return the cached value for key (counted as a hit or miss)."""
+        entry = self._entries.get(key, _missing)
+        if entry is _missing:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, or call compute() and cache its result.
+
+        Returns:
+        - value, hit (True if it came from the cache)
+        """
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value, True
+        value = compute()
+        self.put(key, value)
+        return value, False
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used ones to stay within budget."""
+        size = estimate_bytes(value)
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            # Too big to cache; the old value of the key (dropped above) is stale
+            return
+        self._entries[key] = (value, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (the statistics are kept)."""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        """Hit/miss counts, entry count and memory use."""
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def report(self):
+        """One-line summary of stats() for the log."""
+        s = self.stats()
+        return (f"🧠 {s['name']} cache: {s['hits']} hits / {s['misses']} misses ({s['hit_rate']:.0%}), "
+                f"{s['entries']} entries, {s['bytes'] / 1e6:.1f} of {s['max_bytes'] / 1e6:.0f} MB, {s['evictions']} evicted")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+#Shared by the extinction column, calibration analysis and plot preprocessing
+analysis_memo = Memo(name='Analysis')
@@ -4,17 +4,25 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import matplotlib.dates as mdates
-import seaborn as sns
 import pandas as pd
 import numpy as np
-from scipy.stats import linregress
+# scipy.stats is imported inside the analysis methods; it is slow to import and only
+# needed once an analysis runs (main.py preloads it in the background)
 
-from data_processing import create_extinction_column_if_needed, update_listbox_with_new_column, enhanced_calibration_analysis
+from data_processing import create_extinction_column_if_needed, update_listbox_with_new_column, memoized_calibration_analysis, time_of_day_text, segment_mask, derived_columns
 from constants import *
+from calibration_engine import sweep_calibration_filters
+
+def decimation_index(count, max_points=calibration_scatter_max_points):
+    """
+    Evenly spaced positions that thin a scatter plot down to at most max_points (all positions if fewer).
+    """
+    if count <= max_points:
+        return np.arange(count)
+    return np.linspace(0, count - 1, max_points).astype(int)
 
 class ModernCalibrationWindow:
     def __init__(self, parent_window, gui_instance, constants_module):
@@ -190,7 +198,7 @@ class ModernCalibrationWindow:
         
         # Data info
         self.create_parameter_display_enhanced(params_grid, "Total Data Points:", 
-                                    lambda: f"{len(self.constants.df_main)}" if not self.constants.df_main.empty else "0", 1, 2)
+                                    lambda: f"{len(self.constants.data_store.df)}" if not self.constants.data_store.df.empty else "0", 1, 2)
                                     
         self.create_parameter_display_enhanced(params_grid, "Selected Range:", 
                                     self.get_time_range_text, 1, 3)
@@ -226,14 +234,16 @@ class ModernCalibrationWindow:
     def get_time_range_text(self):
         """Get formatted time range text"""
         try:
-            if self.constants.df_main.empty:
+            if self.constants.data_store.df.empty:
                 return "No data"
             
             start_idx = int(self.gui.current_valueCalibLow.get())
             end_idx = int(self.gui.current_valueCalibHigh.get())
             
-            start_time = self.constants.df_main['time'].iloc[start_idx].strftime('%H:%M:%S')
-            end_time = self.constants.df_main['time'].iloc[end_idx].strftime('%H:%M:%S')
+            start_time = time_of_day_text(self.constants.data_store.df, start_idx)
+            end_time = time_of_day_text(self.constants.data_store.df, end_idx)
+            if start_time is None or end_time is None:
+                return "Invalid range"
             
             return f"{start_time} - {end_time}"
         except:
@@ -371,6 +381,20 @@ class ModernCalibrationWindow:
         )
         validate_btn.pack(side="left", padx=(0, 10))
         
+        # Filter sweep button
+        sweep_btn = tk.Button(
+            button_frame,
+            text="🧭 Sweep Filters",
+            command=self.show_filter_sweep,
+            bg="#8e44ad",
+            fg="white",
+            font=("Arial", 11, "bold"),
+            relief="flat",
+            padx=30,
+            pady=10
+        )
+        sweep_btn.pack(side="left", padx=(0, 10))
+        
         # Export results button
         export_btn = tk.Button(
             button_frame,
@@ -424,7 +448,7 @@ class ModernCalibrationWindow:
             xlocB = int(self.gui.current_valueCalibHigh.get())
             
             # Get data
-            df = self.constants.df_main
+            df = self.constants.data_store.df
             
             if df.empty:
                 messagebox.showerror("Error", "No data loaded!")
@@ -493,8 +517,10 @@ class ModernCalibrationWindow:
                     return
             
             # STEP 2: Run enhanced analysis with debugging
-            filtered_data, debug_info = enhanced_calibration_analysis(
-                df, xlocA, xlocB, min_val, max_val, percent, mode='Scattering'
+            filtered_data, debug_info = memoized_calibration_analysis(
+                df, xlocA, xlocB, min_val, max_val, percent, mode='Scattering',
+                segment_filter=self.gui.current_segment_filter(),
+                spike_window=self.gui.current_spike_window()
             )
             
             # STEP 3: Store results for access by other methods
@@ -513,16 +539,16 @@ class ModernCalibrationWindow:
             self.store_results(slope, intercept, r_value, p_value, std_err, filtered_data['count'])
             
             # STEP 5: Create plots with proper labels (UPDATED)
-            import seaborn as sns
-            sns.regplot(x=filtered_data['x'], y=filtered_data['y'], ax=self.ax1, 
-                    marker='x', line_kws=dict(color='red'), scatter_kws={'alpha': 0.6})
+            # Fit line and confidence band come from the regression stored above (no re-fit/bootstrap)
+            self.draw_regression_plot(filtered_data['x'], filtered_data['y'])
             # UPDATED: Use dynamic column names from filtered_data
             self.ax1.set_xlabel(self.x_column_name)
             self.ax1.set_ylabel(self.y_column_name)
             self.ax1.set_title(f'Scattering Mode: {filtered_data["count"]} points')
             
             # Time series plot (UPDATED)
-            self.ax2.scatter(filtered_data['time'], filtered_data['y'], alpha=0.6, color='blue')
+            shown = decimation_index(filtered_data['count'])
+            self.ax2.scatter(filtered_data['time'].iloc[shown], filtered_data['y'].iloc[shown], alpha=0.6, color='blue')
             self.ax2.set_xlabel('Time')
             self.ax2.set_ylabel(self.y_column_name)  # UPDATED: Use stored column name
             self.ax2.set_title('Filtered Data Over Time')
@@ -576,8 +602,10 @@ class ModernCalibrationWindow:
                     return
             
             # STEP 2: Run enhanced analysis with debugging
-            filtered_data, debug_info = enhanced_calibration_analysis(
-                df, xlocA, xlocB, min_val, max_val, percent, mode='Absorbing'
+            filtered_data, debug_info = memoized_calibration_analysis(
+                df, xlocA, xlocB, min_val, max_val, percent, mode='Absorbing',
+                segment_filter=self.gui.current_segment_filter(),
+                spike_window=self.gui.current_spike_window()
             )
             
             # STEP 3: Store results (UPDATED)
@@ -596,16 +624,16 @@ class ModernCalibrationWindow:
             self.store_results(slope, intercept, r_value, p_value, std_err, filtered_data['count'])
             
             # STEP 5: Create plots with proper labels (UPDATED)
-            import seaborn as sns
-            sns.regplot(x=filtered_data['x'], y=filtered_data['y'], ax=self.ax1,
-                    marker='x', line_kws=dict(color='red'), scatter_kws={'alpha': 0.6})
+            # Fit line and confidence band come from the regression stored above (no re-fit/bootstrap)
+            self.draw_regression_plot(filtered_data['x'], filtered_data['y'])
             # UPDATED: Use dynamic column names from filtered_data
             self.ax1.set_xlabel(self.x_column_name)
             self.ax1.set_ylabel(self.y_column_name)
             self.ax1.set_title(f'Absorbing Mode: {filtered_data["count"]} points')
             
             # Time series plot (UPDATED)
-            self.ax2.scatter(filtered_data['time'], filtered_data['y'], alpha=0.6, color='green')
+            shown = decimation_index(filtered_data['count'])
+            self.ax2.scatter(filtered_data['time'].iloc[shown], filtered_data['y'].iloc[shown], alpha=0.6, color='green')
             self.ax2.set_xlabel('Time')
             self.ax2.set_ylabel(self.y_column_name)  # UPDATED: Use stored column name
             self.ax2.set_title('Filtered Data Over Time')
@@ -651,11 +679,50 @@ class ModernCalibrationWindow:
         self.std_error.config(text=f"{std_err:.4f}")
         self.data_points.config(text=f"{data_points}")
         
+        # Calibrated Bscat/Babs derived columns follow the latest fit of their mode
+        mode = self.gui.calibvar.get().lower()
+        if mode in ('scattering', 'absorbing'):
+            derived_columns.set_params(**{f'{mode}_slope': slope, f'{mode}_intercept': intercept})
+        
         # Update equation
         sign = "+" if intercept >= 0 else "-"
         equation = f"y = {slope:.4f}x {sign} {abs(intercept):.4f}"
         self.equation_label.config(text=equation)
         
+    def draw_regression_plot(self, x, y, confidence=0.95):
+        """
+        Draw the calibration scatter, fit line and confidence band on ax1.
+        
+        Uses the slope/intercept already stored by store_results and the closed-form
+        standard error of the fitted mean, instead of sns.regplot re-fitting the line
+        and bootstrapping the band 1000 times. Only the scatter is thinned out for
+        large regions; the band is computed from every point.
+        """
+        from scipy.stats import t as t_dist
+        
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n = len(x)
+        slope = self.analysis_results['slope']
+        intercept = self.analysis_results['intercept']
+        
+        shown = decimation_index(n)
+        self.ax1.scatter(x[shown], y[shown], marker='x', alpha=0.6)
+        
+        x_line = np.linspace(x.min(), x.max(), 100)
+        y_line = intercept + slope * x_line
+        
+        # Band: t * s * sqrt(1/n + (x - mean)^2 / Sxx), s = residual standard deviation
+        x_mean = x.mean()
+        sxx = np.sum((x - x_mean) ** 2)
+        if n > 2 and sxx > 0:
+            residuals = y - (intercept + slope * x)
+            s = np.sqrt(np.sum(residuals ** 2) / (n - 2))
+            half_width = t_dist.ppf(0.5 + confidence / 2, n - 2) * s * np.sqrt(1 / n + (x_line - x_mean) ** 2 / sxx)
+            self.ax1.fill_between(x_line, y_line - half_width, y_line + half_width, color='red', alpha=0.15, linewidth=0)
+        
+        self.ax1.plot(x_line, y_line, color='red')
+        
     def finalize_plots(self):
         """Finalize plot formatting and refresh canvas"""
         
@@ -799,6 +866,10 @@ class ModernCalibrationWindow:
         )
         clear_btn.pack(side="right")
         
+        # Notes travel with the session (see PAXView.save_session_file)
+        if getattr(self.gui, 'session_notes', ''):
+            self.notes_text.insert("1.0", self.gui.session_notes)
+        
         # Auto-save binding
         self.notes_text.bind('<KeyRelease>', self.on_notes_changed)
         
@@ -888,6 +959,7 @@ class ModernCalibrationWindow:
                 # Load into text widget
                 self.notes_text.delete("1.0", "end")
                 self.notes_text.insert("1.0", notes_content)
+                self.gui.session_notes = notes_content
                 
                 # Update timestamp
                 from datetime import datetime
@@ -904,6 +976,7 @@ class ModernCalibrationWindow:
             if messagebox.askyesno("Clear Notes", "Are you sure you want to clear all notes?"):
                 self.notes_text.delete("1.0", "end")
                 self.notes_timestamp.config(text="")
+                self.gui.session_notes = ''
 
     def on_notes_changed(self, event=None):
         """
@@ -911,6 +984,7 @@ class ModernCalibrationWindow:
         """
         from datetime import datetime
         self.notes_timestamp.config(text=f"Modified: {datetime.now().strftime('%H:%M:%S')}")
+        self.gui.session_notes = self.notes_text.get("1.0", "end-1c")
 
     def get_analysis_metadata(self):
         """
@@ -924,7 +998,7 @@ class ModernCalibrationWindow:
     % Change Limit: {self.gui.entry_percent.get()}%
     Calibration Start: {int(self.gui.current_valueCalibLow.get())}
     Calibration End: {int(self.gui.current_valueCalibHigh.get())}
-    Total Data Points: {len(self.constants.df_main) if not self.constants.df_main.empty else 0}
+    Total Data Points: {len(self.constants.data_store.df) if not self.constants.data_store.df.empty else 0}
     Time Range: {self.get_time_range_text()}"""
 
             # UPDATED: Add column information if available
@@ -1035,7 +1109,7 @@ class ModernCalibrationWindow:
         """
         try:
             # Pre-validate required columns exist
-            df = self.constants.df_main
+            df = self.constants.data_store.df
             if df.empty:
                 messagebox.showerror("Error", "No data loaded!")
                 return
@@ -1070,12 +1144,117 @@ class ModernCalibrationWindow:
             messagebox.showerror("Analysis Error", f"Error during analysis: {str(e)}")
             self.status_label.config(text="● Analysis Failed", fg="#e74c3c")
 
+    def show_filter_sweep(self):
+        """
+        Evaluate a grid of percent-change limits and min/max ranges for the current
+        calibration region and show R² and data retention as heatmaps, with the
+        recommended setting marked and an Apply button.
+        """
+        df = self.constants.data_store.df
+        if df.empty:
+            messagebox.showwarning("No Data", "Please load data first!")
+            return
+        
+        mode = self.gui.calibvar.get()
+        if mode not in ('Scattering', 'Absorbing'):
+            messagebox.showerror("Error", "Please select a calibration mode (Scattering or Absorbing)")
+            return
+        
+        if 'Debug Ext Calculation' in df.columns:
+            ext_column = 'Debug Ext Calculation'
+        elif 'Extinction_Coefficient' in df.columns:
+            ext_column = 'Extinction_Coefficient'
+        else:
+            messagebox.showerror("Missing Data", "No extinction column yet.\n\nRun the analysis once to create it, then sweep.")
+            return
+        
+        xlocA = int(self.gui.current_valueCalibLow.get())
+        xlocB = int(self.gui.current_valueCalibHigh.get())
+        try:
+            x_column = 'Bscat (1/Mm)' if mode == 'Scattering' else 'Babs (1/Mm)'
+            spike_column = self.gui.spike_masks([x_column]).get(x_column)
+            sweep = sweep_calibration_filters(df, mode, ext_column, min(xlocA, xlocB), max(xlocA, xlocB),
+                                              row_mask=segment_mask(df, self.gui.current_segment_filter()),
+                                              outlier_mask=df[spike_column].to_numpy(dtype=bool) if spike_column else None)
+        except (KeyError, ValueError) as e:
+            messagebox.showerror("Sweep Error", f"Could not run the filter sweep:\n{str(e)}")
+            return
+        
+        print(f"🧭 Swept {sweep['r2'].size} filter settings for {mode} mode")
+        
+        sweep_window = tk.Toplevel(self.calib_window)
+        sweep_window.title(f"Filter Sweep - {mode}")
+        sweep_window.geometry("1100x650")
+        
+        fig = Figure(figsize=(11, 5), dpi=100, facecolor='white')
+        ax_r2 = fig.add_subplot(121)
+        ax_retention = fig.add_subplot(122)
+        
+        range_labels = [f"{lo:.2f} - {hi:.2f}" for lo, hi in sweep['ranges']]
+        percent_labels = [f"{p:g}%" for p in sweep['percents']]
+        panels = (
+            (ax_r2, sweep['r2'], "R²", 'viridis', (0, 1)),
+            (ax_retention, sweep['retention'] * 100, "Data retained (%)", 'magma', (0, 100)),
+        )
+        for ax, values, title, cmap, (vmin, vmax) in panels:
+            image = ax.imshow(np.ma.masked_invalid(values), aspect='auto', cmap=cmap, vmin=vmin, vmax=vmax, origin='lower')
+            fig.colorbar(image, ax=ax)
+            ax.set_title(title)
+            ax.set_xlabel("Pct change limit")
+            ax.set_xticks(range(len(percent_labels)))
+            ax.set_xticklabels(percent_labels, rotation=45, fontsize=8)
+            ax.set_yticks(range(len(range_labels)))
+            ax.set_yticklabels(range_labels, fontsize=8)
+        ax_r2.set_ylabel(f"{sweep['x_column']} min - max")
+        
+        recommended = sweep['recommended']
+        if recommended:
+            i, j = recommended['index']
+            for ax in (ax_r2, ax_retention):
+                ax.plot(j, i, marker='*', color='red', markersize=16, markeredgecolor='white')
+        fig.tight_layout()
+        
+        canvas = FigureCanvasTkAgg(fig, master=sweep_window)
+        canvas.draw()
+        canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+        
+        bottom_frame = tk.Frame(sweep_window)
+        bottom_frame.pack(side="bottom", fill="x", padx=10, pady=10)
+        
+        targets = sweep['targets']
+        if recommended is None:
+            summary = "❌ No filter setting kept enough points for a fit"
+        else:
+            status = "✅ Meets targets" if recommended['meets_targets'] else "⚠️ No setting meets all targets, showing best R²"
+            summary = (f"{status} (R² ≥ {targets['r2']}, slope stability ≤ {targets['stability']:.0%}, "
+                       f"retention ≥ {targets['retention']:.0%})\n"
+                       f"Recommended: min {recommended['min']:.3f}, max {recommended['max']:.3f}, "
+                       f"pct change {recommended['percent']:g}%  →  R² {recommended['r2']:.4f}, "
+                       f"slope {recommended['slope']:.4f}, stability {recommended['stability']:.1%}, "
+                       f"{recommended['count']} points ({recommended['retention']:.0%})")
+        tk.Label(bottom_frame, text=summary, justify="left", font=("Arial", 10)).pack(side="left")
+        
+        def apply_recommendation():
+            for entry, value in ((self.gui.entry_min, recommended['min']),
+                                 (self.gui.entry_max, recommended['max']),
+                                 (self.gui.entry_percent, recommended['percent'])):
+                entry.delete(0, tk.END)
+                entry.insert(0, f"{value:.10g}")
+            self.gui.update_live_fit()
+            sweep_window.destroy()
+            self.run_calibration_analysis_with_validation()
+        
+        tk.Button(bottom_frame, text="Close", command=sweep_window.destroy).pack(side="right", padx=(10, 0))
+        if recommended is not None:
+            tk.Button(bottom_frame, text="✅ Apply Recommended", command=apply_recommendation,
+                      bg="#27ae60", fg="white").pack(side="right")
+
     def validate_parameters_interactive(self):
         """
         Interactive parameter validation with suggestions.
         """
         try:
-            df = self.constants.df_main
+            df = self.constants.data_store.df
             if df.empty:
                 messagebox.showwarning("No Data", "Please load data first!")
                 return
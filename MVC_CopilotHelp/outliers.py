@@ -0,0 +1,77 @@
+"""Spike detection with a Hampel filter (rolling median / median absolute deviation).
+
+A sample is a spike when it lies more than n_sigmas robust standard deviations
+(1.4826 x MAD) from the median of the window centred on it. Unlike the percent-change
+filter this only flags the spike itself, not the normal sample after it. The windows
+are strided views of the data, so the medians of a whole block of rows come from one
+np.partition call instead of a Python loop per row.
+
+Example:
+    spikes = hampel_outliers(df['Bscat (1/Mm)'].to_numpy(), window=21)
+    clean = df['Bscat (1/Mm)'].where(~spikes)
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+#Default window (samples) and threshold (robust standard deviations)
+hampel_window = 21
+hampel_sigmas = 3.0
+
+#MAD of normally distributed data times this is its standard deviation
+mad_scale = 1.4826
+
+#Window values (rows) held in memory at once, bounds the temporary arrays to ~32 MB
+_block_values = 4_000_000
+
+def outlier_column_name(column):
+    """Name of the spike mask column of a data column."""
+    return f"{column} outlier"
+
+def is_outlier_column(name):
+    """True for a spike mask column, which is bookkeeping rather than a measurement."""
+    return isinstance(name, str) and name.endswith(" outlier")
+
+def hampel_outliers(values, window=hampel_window, n_sigmas=hampel_sigmas):
+    """
+    Hampel filter spike mask.
+
+    Parameters:
+    - values: Samples in row order; NaNs are never spikes and are skipped, so windows
+      span the neighbouring valid samples
+    - window: Samples per window (made odd); rows near the ends use the first/last full window
+    - n_sigmas: Threshold in robust standard deviations
+
+    Returns:
+    - Boolean array, True for spikes
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    outliers = np.zeros(len(values), dtype=bool)
+    x = values[finite] if not finite.all() else values
+    n = len(x)
+    if n < 3:
+        return outliers
+
+    half = max(int(window) // 2, 1)
+    width = min(2 * half + 1, n)
+    half = width // 2
+    starts = n - width + 1
+    median = np.empty(starts)
+    mad = np.empty(starts)
+    windows = sliding_window_view(x, width)
+    block = max(_block_values // width, 1)
+    for first in range(0, starts, block):
+        chunk = np.partition(windows[first:first + block], half, axis=1)  # Copy; x is untouched
+        chunk_median = chunk[:, half].copy()
+        np.subtract(chunk, chunk_median[:, None], out=chunk)
+        np.abs(chunk, out=chunk)
+        median[first:first + block] = chunk_median
+        mad[first:first + block] = np.partition(chunk, half, axis=1)[:, half]
+
+    # Window of every sample: centred on it, clamped at the ends
+    start = np.clip(np.arange(n) - half, 0, starts - 1)
+    spikes = np.abs(x - median[start]) > n_sigmas * mad_scale * mad[start]
+    if finite.all():
+        return spikes
+    outliers[finite] = spikes
+    return outliers
@@ -0,0 +1,78 @@
+"""PAX instrument definitions and processing settings shared by the headless modules
+(pax_model, segments, alarms, memo, batch runners) and the GUI.
+
+Importing this module has no side effects. constants, which also builds the GUI's
+DataStore, re-exports everything here, so only the GUI needs to import constants.
+"""
+
+#Memory budget for memoized analyses: extinction columns, calibration filtering, plot preprocessing (see memo.Memo)
+analysis_memo_max_bytes = 256 * 1024 * 1024
+
+#PAX Mode column codes. Not confirmed against the PAX documentation or a real zero/flush cycle yet: check a file
+#with a known zero before trusting the segment filters and the drift I0, and adjust here if the firmware differs.
+#Codes missing from this table become "mode <code>" states and are reported when the Mode column is indexed
+pax_mode_states = {0: 'sampling', 1: 'zero', 2: 'flush'}
+#Rows ignored at the start of every Mode run while the cell settles after a switch
+mode_settle_rows = 10
+#Segment filters offered for plots and calibration: name -> Mode states kept (None keeps everything)
+segment_filters = {
+    'All data': None,
+    'Sampling only': ('sampling',),
+    'Zero only': ('zero',),
+    'Zero + flush': ('zero', 'flush'),
+}
+
+#Column names for the PAX alarm data
+alarm_names = [
+    "Bscat (1/Mm)",
+    "scat_raw",
+    "Babs (1/Mm)",
+    "Babs phase (deg)",
+    "Babs noise (1/Mm)",
+    "Detected Laser power (W)",
+    "Laser power phase (deg)",
+    "Q factor",
+    "Reserved",
+    "Resonance Frequency (Hz)",
+    "Background Bscat (1/Mm)",
+    "mic_raw",
+    "Background Babs (1/Mm)",
+    "Background Babs phase (deg)",
+    "Bext (1/Mm)",
+    "Single Scat Albedo",
+    "BC Mass (ug/m3)",
+    "Relative Humidity (%)",
+    "Cell Temperature (C)",
+    "Dewpoint (C)",
+    "Analong Input 1",
+    "Analong Input 2",
+    "Calibration Bscat",
+    "Calibration Babs",
+    "Alpha",
+    "Processing",
+    "HK Case Temperature (C)",
+    "HK Case Pressure (mbar)",
+    "Reserved",
+    "HK plus5V",
+    "HK 3.3V",
+    "Calibration Bext",
+    "HK 5Vdig",
+    "Calibration I0",
+    "Reserved",
+    "Reserved",
+    "HK Laser PD Current (Amp)",
+    "HK Laser Current (Amp)",
+    "HK Laser Temp (C)",
+    "HK minus5V",
+    "HK Cell Pressure (mbar)",
+    "HK Inlet Pressure (mbar)",
+    "HK Sample Pump Vac (mbar)",
+    "HK 12V",
+    "Reserved",
+    "Mode",
+    "Countdown Timer (secs)",
+    "Disk Free Space (Gbytes)",
+    "Laser on Time (hours)",
+    "Reserved",
+    "USB Status",
+]
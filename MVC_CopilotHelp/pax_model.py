@@ -0,0 +1,1135 @@
+"""Headless PAX processing model: loading, cleaning, time axes, derived columns
+and calibration, with no Tk imports.
+
+The functions here work on any DataFrame and never touch the GUI's DataStore or
+show dialogs, so batch jobs, notebooks and benchmarks can use them directly.
+data_processing re-exports them for the GUI. PAXModel wraps them around one
+DataFrame and returns the dataclass results below.
+
+Example:
+    model = PAXModel()
+    model.load('PAX-123_20250131.csv')
+    model.add_extinction(0, 600)
+    result = model.calibrate(1000, 5000, 0, 100, 10, mode='Scattering')
+    print(result.slope, result.r2)
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import pandas as pd
+import numpy as np
+import matplotlib.dates as mdates
+
+from segments import ModeSegments, find_i0_candidates
+from alarms import AlarmTimeline, AlarmIntervalIndex, df_times
+from outliers import hampel_outliers, outlier_column_name
+
+#File extension -> loader format code used by process_single_file_with_flexible_time
+file_formats = {'.csv': 'V1', '.xlsx': 'V2'}
+
+#Standard PAX file names look like "PAX-XXX_20250131.csv"
+pax_filename_pattern = re.compile(r'(?P<serial>PAX-[^_]+)_(?P<date>\d{8})', re.IGNORECASE)
+
+# ==================== CLEANING ====================
+
+def clearNaN(df):
+    """
+    Small function to loop through the columns and clean up the df.
+    """
+    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    df.bfill(inplace=True)
+
+# ==================== SHARED TIME AXIS CACHE ====================
+
+# Only a handful of dataframes are ever plotted at once (the loaded data plus the odd legacy frame)
+frame_cache_size = 4
+
+def _cached_for_frame(cache, df, build):
+    """
+    Value built from a dataframe, cached per dataframe. The entry keeps the frame
+    itself and is only used for that very object (and length): a freed frame's id
+    can be reused by a new one, so the bare id is never trusted.
+    """
+    entry = cache.get(id(df))
+    if entry is not None and entry[0] is df and entry[1] == len(df):
+        return entry[2]
+    value = build()
+    if len(cache) >= frame_cache_size and id(df) not in cache:
+        cache.clear()
+    cache[id(df)] = (df, len(df), value)
+    return value
+
+# Numeric copies of the 'time' column per dataframe. Only cleared when the data is
+# replaced or appended to, so derived columns (extinction etc.) never force the
+# time axis to be rebuilt.
+_time_axis_cache = {}
+
+def get_time_axis(df):
+    """
+    Get the numeric time axis for a dataframe, converting the 'time' column only once.
+    
+    Parameters:
+    - df: DataFrame containing a 'time' column
+    
+    Returns:
+    - dict with:
+        'num': float days as produced by matplotlib's date2num (used for plotting)
+        'epoch_ns': int64 nanoseconds since the epoch (None if 'time' is not a datetime column)
+    """
+    return _cached_for_frame(_time_axis_cache, df, lambda: build_time_axis(df))
+
+def build_time_axis(df):
+    """Convert the 'time' column as get_time_axis does, without caching."""
+    time_values = df['time'].to_numpy()
+    
+    if np.issubdtype(time_values.dtype, np.datetime64):
+        epoch_ns = time_values.astype('datetime64[ns]').view('int64')
+        num = mdates.date2num(time_values)
+    else:
+        # Index based fallback time (see create_time_column), already numeric
+        epoch_ns = None
+        num = time_values.astype(float)
+    return {'num': num, 'epoch_ns': epoch_ns}
+
+def invalidate_time_axis_cache():
+    """
+    Drop all cached time axes (and Mode segment and alarm indexes). Call whenever
+    the loaded data is replaced or has rows appended.
+    """
+    _time_axis_cache.clear()
+    _mode_segments_cache.clear()
+    _alarm_timeline_cache.clear()
+    _alarm_index_cache.clear()
+
+_mode_segments_cache = {}
+
+def get_mode_segments(df):
+    """
+    Get the run-length index of the 'Mode' column, built once per dataframe.
+    
+    Returns:
+    - ModeSegments, or None if the data has no 'Mode' column
+    """
+    if 'Mode' not in df.columns:
+        return None
+    return _cached_for_frame(_mode_segments_cache, df, lambda: ModeSegments.from_df(df))
+
+_alarm_timeline_cache = {}
+
+def get_alarm_timeline(df):
+    """
+    Get the decoded Alarm column (packed red/yellow bitmasks per row), built once per dataframe.
+    
+    Returns:
+    - AlarmTimeline, or None if the data has no 'Alarm' column
+    """
+    if 'Alarm' not in df.columns:
+        return None
+    return _cached_for_frame(_alarm_timeline_cache, df, lambda: AlarmTimeline.from_df(df))
+
+_alarm_index_cache = {}
+
+def get_alarm_index(df):
+    """
+    Get the alarm episode index (sorted intervals per channel and severity), built once per dataframe.
+    
+    Returns:
+    - AlarmIntervalIndex, or None if the data has no 'Alarm' column
+    """
+    if 'Alarm' not in df.columns:
+        return None
+    return _cached_for_frame(_alarm_index_cache, df, lambda: AlarmIntervalIndex.from_df(df))
+
+def append_rows(df, df_to_add):
+    """
+    Append rows (e.g. a concatenated file) to a DataFrame. The alarm index of the old
+    data, if it was built, is extended with the new rows instead of being rebuilt,
+    unless the new rows reach back before the indexed ones (e.g. the previous day's file).
+    
+    Parameters:
+    - df: Current DataFrame (may be None or empty)
+    - df_to_add: DataFrame with the new rows, in the same format as df
+    
+    Returns:
+    - The combined DataFrame (a new object; cached indexes of df are dropped)
+    """
+    alarm_index = None
+    if df is not None and not df.empty:
+        entry = _alarm_index_cache.get(id(df))
+        if entry is not None and entry[0] is df and entry[1] == len(df):
+            alarm_index = entry[2]
+        combined = pd.concat([df, df_to_add], ignore_index=True)
+    else:
+        combined = df_to_add
+    invalidate_time_axis_cache()
+
+    if alarm_index is not None and 'Alarm' in df_to_add.columns:
+        new_times = df_times(df_to_add)
+        if (new_times is not None) == alarm_index.uses_time and alarm_index.can_extend(new_times):
+            alarm_index.extend(df_to_add['Alarm'].to_numpy(), new_times)
+            _alarm_index_cache[id(combined)] = (combined, len(combined), alarm_index)
+            print(f"🚨 Alarm index extended with {len(df_to_add):,} rows")
+        else:
+            # Older rows (or a different time axis): get_alarm_index rebuilds from the combined data
+            print("🚨 Appended rows are not newer than the alarm index; it will be rebuilt")
+    return combined
+
+def segment_mask(df, segment_filter):
+    """
+    Row mask for a segment filter (see ModeSegments.mask_for).
+    
+    Returns:
+    - Boolean array, or None when every row is kept (no filter, or no 'Mode' column)
+    """
+    if segment_filter is None:
+        return None
+    segments = get_mode_segments(df)
+    if segments is None:
+        print(f"⚠️ No 'Mode' column - segment filter '{segment_filter}' ignored")
+        return None
+    return segments.mask_for(segment_filter)
+
+def time_of_day_text(df, index):
+    """
+    Format the time at a row index as HH:MM:SS using the cached epoch array.
+    Avoids building a pandas Timestamp for every slider event.
+    """
+    epoch_ns = get_time_axis(df)['epoch_ns']
+    if epoch_ns is None:
+        return None
+    seconds_of_day = (int(epoch_ns[index]) // 1_000_000_000) % 86400
+    return f"{seconds_of_day // 3600:02d}:{(seconds_of_day // 60) % 60:02d}:{seconds_of_day % 60:02d}"
+    
+# ==================== EXTINCTION COEFFICIENT IMPLEMENTATION ====================
+
+#Spellings of the laser power column in PAX files, preferred first
+laser_power_columns = (
+    'Detected Laser power (W)',
+    'Detected Laser Power (W)', 
+    'Laser Power (W)',
+    'Laser power (W)' #annoyingly, caps mattering here 
+)
+
+def find_laser_power_column(df, laser_power_column='Detected Laser power (W)'):
+    """
+    Find the laser power column, trying the known spellings if the preferred one is missing.
+    
+    Returns:
+    - laser_power_column: Name of the column present in df
+    """
+    if laser_power_column in df.columns:
+        return laser_power_column
+    
+    # Try alternative column names
+    for alt_name in laser_power_columns:
+        if alt_name in df.columns:
+            return alt_name
+    
+    available_cols = [col for col in df.columns if 'laser' in col.lower() or 'power' in col.lower()]
+    raise ValueError(f"Laser power column not found. Available power-related columns: {available_cols}")
+
+def calculate_extinction_coefficient(df, i0_low_idx, i0_high_idx, 
+                                   laser_power_column='Detected Laser power (W)',
+                                   calculated_column_name='Extinction_Coefficient',
+                                   segment_filter=None):
+    """
+    Calculate extinction coefficient using Beer-Lambert law: -ln(I/I0)
+    
+    Parameters:
+    - df: DataFrame containing the data
+    - i0_low_idx: Lower index of I0 region (from slider)
+    - i0_high_idx: Higher index of I0 region (from slider)
+    - laser_power_column: Column containing laser power measurements
+    - calculated_column_name: Name for the new calculated column
+    - segment_filter: Optional Mode segment filter (e.g. 'Zero only'); only matching rows
+      of the I0 region go into the baseline
+    
+    Returns:
+    - df: DataFrame with new calculated column added
+    - i0_mean: Baseline value used for calculation
+    """
+    
+    df[calculated_column_name], i0_mean = extinction_values(df, i0_low_idx, i0_high_idx, laser_power_column, segment_filter)
+    
+    print(f"✅ Created extinction coefficient column: '{calculated_column_name}'")
+    print(f"📊 I0 baseline: {i0_mean:.6f} W")
+    print(f"📈 I0 region: indices {i0_low_idx} to {i0_high_idx} ({i0_high_idx - i0_low_idx} points)")
+    print(f"📉 Extinction range: {df[calculated_column_name].min():.6f} to {df[calculated_column_name].max():.6f}")
+    
+    return df, i0_mean
+
+def extinction_values(df, i0_low_idx, i0_high_idx, laser_power_column='Detected Laser power (W)', segment_filter=None):
+    """
+    The extinction coefficient (1/Mm) of every row from one I0 region, without
+    writing a column (see calculate_extinction_coefficient).
+    
+    Returns:
+    - values: float numpy array, one value per row
+    - i0_mean: Baseline value used for calculation
+    """
+    # Validate inputs
+    laser_power_column = find_laser_power_column(df, laser_power_column)
+    
+    if i0_low_idx >= len(df) or i0_high_idx >= len(df) or i0_low_idx >= i0_high_idx:
+        raise ValueError(f"Invalid I0 region indices: {i0_low_idx} to {i0_high_idx} (dataframe length: {len(df)})")
+    
+    # Calculate I0 baseline (mean of clean air region)
+    i0_region_data = df[laser_power_column].iloc[i0_low_idx:i0_high_idx]
+    mask = segment_mask(df, segment_filter)
+    if mask is not None:
+        i0_region_data = i0_region_data[mask[i0_low_idx:i0_high_idx]]
+        print(f"🧭 Segment filter '{segment_filter}': {len(i0_region_data)} I0 points kept")
+        if i0_region_data.empty:
+            raise ValueError(f"No rows of the I0 region ({i0_low_idx} to {i0_high_idx}) are in '{segment_filter}' segments")
+    i0_mean = i0_region_data.mean()
+    
+    if pd.isna(i0_mean) or i0_mean <= 0:
+        raise ValueError(f"Invalid I0 baseline calculated: {i0_mean}. Check I0 region data quality.")
+    
+    # Calculate extinction coefficient using Beer-Lambert law: -ln(I/I0)
+    # Add small epsilon to prevent log(0) errors
+    epsilon = 1e-10
+    current_power = df[laser_power_column].to_numpy(dtype=float) + epsilon
+    baseline_power = i0_mean + epsilon
+    
+    # Ensure we don't take log of negative or zero values
+    intensity_ratio = np.maximum(current_power / baseline_power, epsilon)
+    
+    #Of note, np.log is the natural logarithm 
+    return -(1/.354) * np.log(intensity_ratio) * 1000000, i0_mean  # Convert to 1/Mm
+
+def calculate_extinction_coefficient_drift(df, zero_periods=None,
+                                          laser_power_column='Detected Laser power (W)',
+                                          calculated_column_name='Extinction_Coefficient',
+                                          baseline_column_name='I0_Baseline (W)',
+                                          min_points=10):
+    """
+    Calculate extinction coefficient with a time-varying I0 baseline: -ln(I/I0(t))
+    
+    The mean laser power of every zero and flush period (both pass filtered, particle-free
+    air through the cell) is taken as an I0 sample at the middle of that period, and the baseline for every row is linearly interpolated
+    between them (held flat before the first and after the last period). This follows
+    laser power drift on multi-day data instead of using one I0 for everything.
+    
+    Parameters:
+    - df: DataFrame containing the data
+    - zero_periods: List of (start, stop) row ranges (like .iloc[start:stop]) of particle-free
+      air; default is every 'zero' and 'flush' run of the Mode column, or, without such runs,
+      every particle-free region found by segments.find_i0_candidates
+    - laser_power_column: Column containing laser power measurements
+    - calculated_column_name: Extinction column to create or overwrite
+    - baseline_column_name: Column that receives the interpolated I0 baseline (None to skip)
+    - min_points: Zero periods with fewer valid points are ignored
+    
+    Returns:
+    - df: DataFrame with the extinction (and baseline) column written in place
+    - info: dict with 'periods' (list of (start, stop, i0_mean)), 'baseline_min', 'baseline_max'
+    """
+    laser_power_column = find_laser_power_column(df, laser_power_column)
+    power = df[laser_power_column].to_numpy(dtype=float)
+    
+    if zero_periods is None:
+        mode_segments = get_mode_segments(df)
+        zero_periods = mode_segments.periods('zero', 'flush', min_length=min_points) if mode_segments is not None else []
+        if zero_periods:
+            print(f"🧭 Using {len(zero_periods)} zero/flush period(s) from the Mode column")
+        else:
+            zero_periods = [(c['start'], c['stop']) for c in find_i0_candidates(df, max_candidates=len(df))]
+    
+    # Interpolate over time when it is a clean, increasing axis; otherwise over row position
+    position = np.arange(len(df), dtype=float)
+    if 'time' in df.columns:
+        time_num = get_time_axis(df)['num']
+        if np.all(np.isfinite(time_num)) and np.all(np.diff(time_num) >= 0):
+            position = time_num
+    
+    # Per-period means from prefix sums, so any number of periods costs O(n) in total
+    valid = np.isfinite(power) & (power > 0)
+    sum_valid = np.concatenate(([0], np.cumsum(valid)))
+    sum_power = np.concatenate(([0.0], np.cumsum(np.where(valid, power, 0.0))))
+    sum_position = np.concatenate(([0.0], np.cumsum(np.where(valid, position, 0.0))))
+    
+    periods = np.array(sorted((max(0, int(a)), min(len(df), int(b))) for a, b in zero_periods), dtype=int).reshape(-1, 2)
+    starts, stops = periods[:, 0], periods[:, 1]
+    counts = sum_valid[stops] - sum_valid[starts]
+    keep = counts >= min_points
+    starts, stops, counts = starts[keep], stops[keep], counts[keep]
+    if len(starts) == 0:
+        raise ValueError(f"No zero period has at least {min_points} valid laser power points")
+    
+    i0_means = (sum_power[stops] - sum_power[starts]) / counts
+    centers = (sum_position[stops] - sum_position[starts]) / counts
+    order = np.argsort(centers, kind='stable')
+    
+    baseline = np.interp(position, centers[order], i0_means[order])
+    
+    # Same Beer-Lambert expression as calculate_extinction_coefficient, in one pass
+    epsilon = 1e-10
+    intensity_ratio = np.maximum((power + epsilon) / (baseline + epsilon), epsilon)
+    df[calculated_column_name] = -(1/.354) * np.log(intensity_ratio) * 1000000  # Convert to 1/Mm
+    if baseline_column_name:
+        df[baseline_column_name] = baseline
+    
+    info = {
+        'periods': [(int(a), int(b), float(m)) for a, b, m in zip(starts, stops, i0_means)],
+        'baseline_min': float(baseline.min()),
+        'baseline_max': float(baseline.max()),
+    }
+    
+    print(f"✅ Created drift-corrected extinction column: '{calculated_column_name}'")
+    print(f"📊 I0 from {len(starts)} zero/flush period(s), baseline {info['baseline_min']:.6f} to {info['baseline_max']:.6f} W")
+    print(f"📉 Extinction range: {df[calculated_column_name].min():.6f} to {df[calculated_column_name].max():.6f}")
+    
+    return df, info
+
+# ==================== FILE LOADING AND TIME COLUMNS ====================
+
+def create_time_column(df):
+    """
+    Create a 'time' column using flexible logic:
+    1. Try to combine 'Local Date' and 'Local Time' columns
+    2. Try alternative time column combinations
+    3. Fall back to row index if time columns unavailable/malformed
+    
+    Parameters:
+    - df: DataFrame containing PAX data
+    
+    Returns:
+    - time_series: pandas Series with time data (either datetime or index)
+    - time_source: string describing what was used for time
+    """
+    
+    time_series = None
+    time_source = "unknown"
+    
+    # Strategy 1: Try standard Local Date + Local Time combination
+    try:
+        if 'Local Date' in df.columns and 'Local Time' in df.columns:
+            print("📅 Attempting to create time from 'Local Date' + 'Local Time'")
+            time_series = pd.to_datetime(
+                df['Local Date'].astype(str) + ',' + df['Local Time'].astype(str), 
+                format='%Y-%m-%d,%H:%M:%S'
+            )
+            time_source = "Local Date + Local Time"
+            print(f"✅ Successfully created time column from {time_source}")
+            return time_series, time_source
+    except Exception as e:
+        print(f"⚠️ Failed to create time from Local Date + Local Time: {str(e)}")
+    
+    # Strategy 2: Try alternative datetime column combinations
+    datetime_combinations = [
+        # (date_col, time_col, format)
+        ('Date', 'Time', '%Y-%m-%d,%H:%M:%S'),
+        ('Local Date', 'Local Time', '%m/%d/%Y,%H:%M:%S'),  # Alternative format
+        ('Local Date', 'Local Time', '%Y-%m-%d %H:%M:%S'),  # Space instead of comma
+        ('Date', 'Time', '%m/%d/%Y,%H:%M:%S'),
+    ]
+    
+    for date_col, time_col, fmt in datetime_combinations:
+        try:
+            if date_col in df.columns and time_col in df.columns:
+                print(f"📅 Attempting to create time from '{date_col}' + '{time_col}' with format {fmt}")
+                
+                if fmt.endswith(',%H:%M:%S'):
+                    # Use comma separator
+                    combined_str = df[date_col].astype(str) + ',' + df[time_col].astype(str)
+                else:
+                    # Use space separator
+                    combined_str = df[date_col].astype(str) + ' ' + df[time_col].astype(str)
+                
+                time_series = pd.to_datetime(combined_str, format=fmt)
+                time_source = f"{date_col} + {time_col}"
+                print(f"✅ Successfully created time column from {time_source}")
+                return time_series, time_source
+        except Exception as e:
+            print(f"⚠️ Failed with {date_col} + {time_col}: {str(e)}")
+            continue
+    
+    # Strategy 3: Try existing combined datetime columns
+    potential_time_columns = [
+        'DateTime', 'Timestamp', 'Time', 'Date_Time', 'LocalTime', 
+        'UTC_Time', 'Measurement_Time', 'Sample_Time'
+    ]
+    
+    for col in potential_time_columns:
+        try:
+            if col in df.columns:
+                print(f"📅 Attempting to use existing '{col}' column as time")
+                time_series = pd.to_datetime(df[col])
+                time_source = f"Existing {col} column"
+                print(f"✅ Successfully created time column from {time_source}")
+                return time_series, time_source
+        except Exception as e:
+            print(f"⚠️ Failed to use {col} as time: {str(e)}")
+            continue
+    
+    # Strategy 4: Fall back to row index
+    print("⚠️ No valid time columns found - falling back to row index")
+    try:
+        # Create a simple sequential time series based on row index
+        # Assuming 1-second intervals (common for PAX data)
+        time_series = pd.to_datetime('2000-01-01') + pd.to_timedelta(df.index, unit='s')
+        time_source = "Row index (1-second intervals)"
+        print(f"✅ Created time column from {time_source}")
+        return time_series, time_source
+    except Exception as e:
+        print(f"❌ Even row index fallback failed: {str(e)}")
+        # Last resort: just use integer index
+        time_series = df.index
+        time_source = "Integer row index"
+        print(f"🔧 Using {time_source} as fallback")
+        return time_series, time_source
+
+def process_single_file_with_flexible_time(file_path, file_format):
+    """
+    Process a single PAX file with flexible time handling.
+    
+    Parameters:
+    - file_path: Path to the file
+    - file_format: 'V1' for CSV, 'V2' for Excel
+    
+    Returns:
+    - df: Processed DataFrame with time column and cleaned data
+    - time_source: Description of what was used for time
+    """
+    
+    # Load the file
+    if file_format == "V1":
+        df = pd.read_csv(file_path)
+    elif file_format == "V2":
+        df = pd.read_excel(file_path)
+    else:
+        raise ValueError("Unsupported file format selected.")
+    
+    print(f"📂 Processing file: {os.path.basename(file_path)}")
+    print(f"📊 Original columns: {list(df.columns)}")
+    print(f"📈 Original shape: {df.shape}")
+    
+    # Clean NaN values before any operations
+    clearNaN(df)
+    
+    # Create time column with flexible logic
+    time_series, time_source = create_time_column(df)
+    
+    # Drop unnecessary columns (only if they exist)
+    columns_to_drop = [
+        'Sec UTC', 'DOY UTC', 'Year UTC', 'Sec Local', 'DOY Local', 'Year Local',
+        'Local Date', 'Local Time', 'Reserved.1', 'Reserved.2', 'Reserved.3',
+        'Reserved.4', 'Reserved.5'
+    ]
+    
+    existing_columns_to_drop = [col for col in columns_to_drop if col in df.columns]
+    if existing_columns_to_drop:
+        df.drop(columns=existing_columns_to_drop, inplace=True)
+        print(f"🗑️ Dropped columns: {existing_columns_to_drop}")
+    
+    # Add the time column
+    df['time'] = time_series
+    
+    print(f"⏰ Time source: {time_source}")
+    print(f"🕐 Time range: {df['time'].min()} to {df['time'].max()}")
+    print(f"✅ Final shape: {df.shape}")
+    
+    return df, time_source
+
+def convert_excel_serial_date(date_serial, time_serial):
+    """
+    Convert Excel serial date and time to proper datetime.
+    """
+    try:
+        # Excel epoch (accounting for the 1900 leap year bug)
+        excel_epoch = datetime(1899, 12, 30)
+        
+        # Convert date
+        date_part = excel_epoch + timedelta(days=int(date_serial))
+        
+        # Convert time (decimal fraction of day to hours/minutes/seconds)
+        time_seconds = time_serial * 24 * 60 * 60
+        time_part = timedelta(seconds=time_seconds)
+        
+        return date_part + time_part
+        
+    except Exception as e:
+        print(f"Warning: Excel date conversion failed: {e}")
+        return None
+
+def create_time_column_enhanced(df):
+    """
+    Enhanced time column creation that handles Excel serial dates.
+    """
+    
+    time_series = None
+    time_source = "unknown"
+    
+    
+    # Strategy 1: Try Excel serial date conversion
+    try:
+        if 'Local Date' in df.columns and 'Local Time' in df.columns:
+            # Check if these are numeric (Excel serial dates)
+            first_date = df['Local Date'].iloc[0]
+            first_time = df['Local Time'].iloc[0]
+            
+            if isinstance(first_date, (int, float)) and isinstance(first_time, (int, float)):
+                print("📅 Detected Excel serial date format - converting...")
+                
+                # Convert Excel serial dates to proper datetime
+                datetime_list = []
+                for idx, row in df.iterrows():
+                    dt = convert_excel_serial_date(row['Local Date'], row['Local Time'])
+                    if dt:
+                        datetime_list.append(dt)
+                    else:
+                        # Fallback for failed conversions
+                        datetime_list.append(datetime(2000, 1, 1) + timedelta(seconds=idx))
+                
+                time_series = pd.Series(datetime_list)
+                time_source = "Excel serial date conversion"
+                print(f"✅ Successfully converted Excel serial dates")
+                print(f"Time range: {time_series.min()} to {time_series.max()}")
+                return time_series, time_source
+                
+    except Exception as e:
+        print(f"⚠️ Excel serial date conversion failed: {str(e)}")
+    
+    # Strategy 2: Try standard string datetime conversion
+    try:
+        if 'Local Date' in df.columns and 'Local Time' in df.columns:
+            print("📅 Attempting standard string datetime conversion")
+            time_series = pd.to_datetime(
+                df['Local Date'].astype(str) + ',' + df['Local Time'].astype(str), 
+                format='%Y-%m-%d,%H:%M:%S'
+            )
+            time_source = "String datetime conversion"
+            print(f"✅ Successfully created time from strings")
+            return time_series, time_source
+    except Exception as e:
+        print(f"⚠️ String datetime conversion failed: {str(e)}")
+    
+    # Strategy 3: Fall back to row index
+    print("⚠️ Using row index fallback for time")
+    try:
+        time_series = pd.to_datetime('2000-01-01') + pd.to_timedelta(df.index, unit='s')
+        time_source = "Row index (1-second intervals)"
+        print(f"✅ Created synthetic time from row index")
+        return time_series, time_source
+    except Exception as e:
+        print(f"❌ Even row index fallback failed: {str(e)}")
+        time_series = df.index
+        time_source = "Integer row index"
+        return time_series, time_source
+
+def fix_pax_data_time_issue(df):
+    """
+    Quick fix specifically for PAX data files with Excel serial dates.
+    Call this right after loading your CSV file.
+    """
+    
+    print("🔧 Applying PAX data fixes...")
+    
+    # Fix 1: Convert Excel serial dates to proper datetime
+    # Only possible while the raw date/time columns are still present; after
+    # process_single_file_with_flexible_time they are dropped and 'time' is already built
+    if 'time' not in df.columns or ('Local Date' in df.columns and 'Local Time' in df.columns):
+        time_series, time_source = create_time_column_enhanced(df)
+        df['time'] = time_series
+        print(f"✅ Time column fixed: {time_source}")
+    else:
+        print("✅ Keeping existing time column")
+    
+    # Fix 2: Handle column name differences
+    if 'Laser power (W)' in df.columns and 'Detected Laser power (W)' not in df.columns:
+        df['Detected Laser power (W)'] = df['Laser power (W)']
+        print("✅ Added 'Detected Laser power (W)' alias")
+    
+    # Fix 3: Create extinction coefficient if missing Debug Ext Calculation
+    if 'Debug Ext Calculation' not in df.columns:
+        print("⚠️ Missing 'Debug Ext Calculation' - you'll need to create extinction coefficient")
+        print("💡 Use the 'Create Extinction Column' button after loading")
+    
+    return df
+
+class CalibrationError(ValueError):
+    """A calibration that could not be fitted, with the issues and recommendations found so far."""
+    def __init__(self, message, debug_info):
+        super().__init__(message)
+        self.debug_info = debug_info
+
+def enhanced_calibration_analysis(df, xlocA, xlocB, min_val, max_val, percent, mode='Scattering', segment_filter=None, outlier_column=None, ext_column=None):
+    """
+    Enhanced calibration analysis with comprehensive debugging and error handling.
+    
+    FIXED VERSION:
+    - X-axis data is now mode-dependent (Bscat for Scattering, Babs for Absorbing)
+    - Both percentage change and range filters now apply to X-axis data
+    - segment_filter: Optional Mode segment filter (e.g. 'Sampling only', see pax_config.segment_filters)
+    - outlier_column: Optional spike mask column of the X data (True = spike, see outliers.py);
+      spikes are rejected and percent changes are taken between the remaining points
+    - ext_column: Extinction column to fit; default 'Debug Ext Calculation' when present,
+      else 'Extinction_Coefficient'
+    
+    Raises CalibrationError (a ValueError) carrying the debug_info gathered up to the failure.
+    """
+    
+    print("🔍 Enhanced Calibration Analysis Starting...")
+    print("=" * 50)
+    
+    debug_info = {
+        'step_counts': {},
+        'issues': [],
+        'recommendations': [],
+        'data_stats': {}
+    }
+    
+    # Step 1: Validate inputs and data
+    print(f"📊 Step 1: Input Validation")
+    print(f"Mode: {mode}")
+    print(f"Calibration region: {xlocA} to {xlocB}")
+    print(f"Range filter: {min_val} to {max_val}")
+    print(f"Percentage limit: {percent}%")
+    
+    if xlocA >= xlocB:
+        error_msg = f"Invalid calibration region: start ({xlocA}) >= end ({xlocB})"
+        debug_info['issues'].append(error_msg)
+        raise CalibrationError(error_msg, debug_info)
+    
+    if xlocB >= len(df):
+        error_msg = f"Calibration end ({xlocB}) exceeds data length ({len(df)})"
+        debug_info['issues'].append(error_msg)
+        debug_info['recommendations'].append(f"Set calibration end to < {len(df)}")
+        raise CalibrationError(error_msg, debug_info)
+    
+    region_size = xlocB - xlocA
+    debug_info['step_counts']['region_size'] = region_size
+    
+    if region_size < 10:
+        warning = f"Small calibration region ({region_size} points)"
+        debug_info['issues'].append(warning)
+        debug_info['recommendations'].append("Consider expanding calibration region")
+    
+    # Step 2: Determine extinction column
+    print(f"\n🔬 Step 2: Extinction Column Detection")
+    
+    if ext_column is not None:
+        if ext_column not in df.columns:
+            error_msg = f"Extinction column '{ext_column}' not found"
+            debug_info['issues'].append(error_msg)
+            raise CalibrationError(error_msg, debug_info)
+        print(f"✅ Using requested '{ext_column}'")
+    elif 'Debug Ext Calculation' in df.columns:
+        ext_column = 'Debug Ext Calculation'
+        print(f"✅ Using existing '{ext_column}'")
+    elif 'Extinction_Coefficient' in df.columns:
+        ext_column = 'Extinction_Coefficient'
+        print(f"✅ Using calculated '{ext_column}'")
+    else:
+        error_msg = "No extinction column found - need to create extinction coefficient first"
+        debug_info['issues'].append(error_msg)
+        debug_info['recommendations'].append("Create extinction coefficient using I0 baseline")
+        
+        # Try to find laser power column for guidance
+        laser_columns = ['Detected Laser power (W)', 'Laser power (W)', 'Detected Laser Power (W)']
+        found_laser = None
+        for col in laser_columns:
+            if col in df.columns:
+                found_laser = col
+                break
+        
+        if found_laser:
+            debug_info['recommendations'].append(f"Use '{found_laser}' to calculate extinction coefficient")
+        
+        raise CalibrationError(error_msg, debug_info)
+    
+    # Step 3: Extract calibration region data (FIXED - Mode-dependent X-axis)
+    print(f"\n🎯 Step 3: Data Extraction")
+    
+    try:
+        filtered_time = df['time'].iloc[xlocA:xlocB] if 'time' in df.columns else df.index[xlocA:xlocB]
+        
+        # X-axis data depends on calibration mode (FIXED)
+        if mode == 'Scattering':
+            if 'Bscat (1/Mm)' not in df.columns:
+                error_msg = "Bscat (1/Mm) column not found for scattering mode"
+                debug_info['issues'].append(error_msg)
+                raise CalibrationError(error_msg, debug_info)
+            filtered_dfx = df['Bscat (1/Mm)'].iloc[xlocA:xlocB]
+            x_column_name = 'Bscat (1/Mm)'
+        else:  # Absorbing mode
+            if 'Babs (1/Mm)' not in df.columns:
+                error_msg = "Babs (1/Mm) column not found for absorbing mode"
+                debug_info['issues'].append(error_msg)
+                debug_info['recommendations'].append("Ensure PAX data includes absorption measurements")
+                raise CalibrationError(error_msg, debug_info)
+            filtered_dfx = df['Babs (1/Mm)'].iloc[xlocA:xlocB]
+            x_column_name = 'Babs (1/Mm)'
+        
+        # Y-axis data (unchanged logic)
+        if mode == 'Scattering':
+            filtered_dfy = df[ext_column].iloc[xlocA:xlocB]
+            y_column_name = ext_column
+        else:  # Absorbing mode
+            filtered_dfy = (df[ext_column].iloc[xlocA:xlocB] - 
+                           df['Bscat (1/Mm)'].iloc[xlocA:xlocB])
+            y_column_name = f"{ext_column} - Bscat"
+        
+        initial_count = len(filtered_dfy)
+        debug_info['step_counts']['initial'] = initial_count
+        
+        print(f"✅ Extracted {initial_count} points")
+        print(f"X-data ({x_column_name}) range: {filtered_dfx.min():.3f} to {filtered_dfx.max():.3f}")
+        print(f"Y-data ({y_column_name}) range: {filtered_dfy.min():.6f} to {filtered_dfy.max():.6f}")
+        
+        # Store data statistics
+        debug_info['data_stats'] = {
+            'x_min': float(filtered_dfx.min()),
+            'x_max': float(filtered_dfx.max()),
+            'y_min': float(filtered_dfy.min()),
+            'y_max': float(filtered_dfy.max()),
+            'y_mean': float(filtered_dfy.mean()),
+            'y_std': float(filtered_dfy.std())
+        }
+        
+    except Exception as e:
+        error_msg = f"Data extraction failed: {str(e)}"
+        debug_info['issues'].append(error_msg)
+        raise CalibrationError(error_msg, debug_info)
+    
+    # Step 4: Apply percentage change filter to X-axis data (FIXED)
+    print(f"\n📈 Step 4: Percentage Change Filter (applied to {x_column_name})")
+    
+    if outlier_column is not None:
+        # Spikes go first, so the point after a spike is compared with the one before it
+        # instead of being rejected for the jump back down
+        not_spike = ~df[outlier_column].iloc[xlocA:xlocB].to_numpy(dtype=bool)
+        debug_info['step_counts']['spikes'] = int((~not_spike).sum())
+        print(f"⚡ Spike filter '{outlier_column}': {int((~not_spike).sum())} of {initial_count} points rejected")
+        x_pct_change = (filtered_dfx[not_spike].pct_change() * 100).reindex(filtered_dfx.index)
+    else:
+        not_spike = None
+        x_pct_change = filtered_dfx.pct_change() * 100  # FIXED: Now applied to X-axis
+    
+    # Handle the first NaN value from pct_change
+    mask_pct = (x_pct_change.abs() <= percent) | (x_pct_change.isna())
+    if not_spike is not None:
+        mask_pct = mask_pct & not_spike
+    
+    # Optional Mode segment filter (e.g. sampling only); percent changes are still taken
+    # between neighbouring rows, so the first rows after a zero period are judged too
+    row_mask = segment_mask(df, segment_filter)
+    if row_mask is not None:
+        region_mask = row_mask[xlocA:xlocB]
+        debug_info['step_counts']['segment_excluded'] = int((~region_mask).sum())
+        print(f"🧭 Segment filter '{segment_filter}': {int(region_mask.sum())} of {initial_count} points in matching Mode segments")
+        if not region_mask.any():
+            error_msg = f"No points of the calibration region are in '{segment_filter}' segments"
+            debug_info['issues'].append(error_msg)
+            debug_info['recommendations'].append("Choose another segment filter or move the calibration region")
+            raise CalibrationError(error_msg, debug_info)
+        mask_pct = mask_pct & region_mask
+    
+    filtered_dfy_pct = filtered_dfy[mask_pct]
+    filtered_dfx_pct = filtered_dfx[mask_pct]
+    filtered_time_pct = filtered_time[mask_pct]
+    
+    after_pct_count = len(filtered_dfy_pct)
+    debug_info['step_counts']['after_percent'] = after_pct_count
+    
+    print(f"Points before: {initial_count}")
+    print(f"Points after: {after_pct_count}")
+    print(f"Points removed: {initial_count - after_pct_count}")
+    
+    if after_pct_count == 0:
+        # Analyze percentage changes to give better recommendations
+        pct_changes_valid = x_pct_change.dropna()  # FIXED: Reference X-axis changes
+        if len(pct_changes_valid) > 0:
+            max_pct = pct_changes_valid.abs().max()
+            p95_pct = pct_changes_valid.abs().quantile(0.95)
+            
+            error_msg = f"All points removed by percentage change filter ({percent}%)"
+            debug_info['issues'].append(error_msg)
+            debug_info['recommendations'].append(f"Increase percentage limit to at least {max_pct:.1f}%")
+            debug_info['recommendations'].append(f"Recommended: {p95_pct:.1f}% (95th percentile)")
+            
+            print(f"❌ {error_msg}")
+            print(f"Max {x_column_name} percentage change: {max_pct:.2f}%")
+            print(f"95th percentile: {p95_pct:.2f}%")
+        
+        raise CalibrationError(f"No data points survived percentage change filter on {x_column_name}", debug_info)
+    
+    # Step 5: Apply range filter to X-axis data (FIXED - now consistent)
+    print(f"\n📊 Step 5: Range Filter (applied to {x_column_name})")
+    
+    mask_range = (filtered_dfx_pct >= min_val) & (filtered_dfx_pct <= max_val)
+    
+    filtered_dfx_final = filtered_dfx_pct[mask_range]
+    filtered_dfy_final = filtered_dfy_pct[mask_range]
+    filtered_time_final = filtered_time_pct[mask_range]
+    
+    final_count = len(filtered_dfy_final)
+    debug_info['step_counts']['final'] = final_count
+    
+    print(f"Points before: {after_pct_count}")
+    print(f"Points after: {final_count}")
+    print(f"Points removed: {after_pct_count - final_count}")
+    
+    if final_count == 0:
+        data_min = filtered_dfx_pct.min()  # FIXED: Reference X-axis data
+        data_max = filtered_dfx_pct.max()  # FIXED: Reference X-axis data
+        
+        error_msg = f"All points removed by range filter ({min_val} to {max_val}) on {x_column_name}"
+        debug_info['issues'].append(error_msg)
+        
+        # Provide specific recommendations based on data range
+        if data_max < min_val:
+            debug_info['recommendations'].append(f"Lower min value to below {data_max:.3f}")
+        elif data_min > max_val:
+            debug_info['recommendations'].append(f"Raise max value to above {data_min:.3f}")
+        else:
+            debug_info['recommendations'].append(f"Expand range to {data_min:.3f} to {data_max:.3f}")
+        
+        print(f"❌ {error_msg}")
+        print(f"{x_column_name} data actually ranges from {data_min:.6f} to {data_max:.6f}")
+        
+        raise CalibrationError(f"No data points survived range filter on {x_column_name}", debug_info)
+    
+    # Step 6: Final validation
+    print(f"\n✅ Step 6: Final Results")
+    print(f"Final data points: {final_count}")
+    print(f"Data retention: {(final_count/initial_count*100):.1f}%")
+    
+    if final_count < 5:
+        warning = f"Very few points remaining ({final_count}) - regression may be unreliable"
+        debug_info['issues'].append(warning)
+        debug_info['recommendations'].append("Consider relaxing filter parameters")
+    
+    # Calculate correlation for quality assessment
+    if final_count > 1:
+        correlation = np.corrcoef(filtered_dfx_final, filtered_dfy_final)[0, 1]
+        debug_info['data_stats']['correlation'] = float(correlation)
+        print(f"Correlation: {correlation:.3f}")
+        
+        if abs(correlation) < 0.1:
+            debug_info['issues'].append("Very low correlation between X and Y data")
+    
+    # Return the filtered data (UPDATED - now includes correct column names)
+    filtered_data = {
+        'x': filtered_dfx_final,
+        'y': filtered_dfy_final,
+        'time': filtered_time_final,
+        'count': final_count,
+        'x_column': x_column_name,  # FIXED: Now reflects actual column used
+        'y_column': y_column_name,
+        'ext_column': ext_column
+    }
+    
+    print("=" * 50)
+    print("🎉 Analysis completed successfully!")
+    
+    return filtered_data, debug_info
+
+# ==================== MODEL ====================
+
+@dataclass
+class LoadResult:
+    """Outcome of PAXModel.load / PAXModel.append."""
+    rows: int
+    files: list
+    time_sources: dict = field(default_factory=dict)  # file name -> time source description
+    failed: dict = field(default_factory=dict)  # file path -> error message
+
+@dataclass
+class ExtinctionResult:
+    """Outcome of PAXModel.add_extinction / PAXModel.add_drift_extinction."""
+    column: str
+    i0_baseline: float  # Mean I0 (drift: mean of the zero-period I0 samples)
+    periods: list = field(default_factory=list)  # (start, stop, i0_mean) per zero period (drift only)
+
+@dataclass
+class CalibrationResult:
+    """Outcome of PAXModel.calibrate: the regression plus the filtered points behind it."""
+    slope: float
+    intercept: float
+    r2: float
+    p_value: float
+    std_err: float
+    count: int
+    x: np.ndarray
+    y: np.ndarray
+    x_column: str
+    y_column: str
+    issues: list = field(default_factory=list)
+    recommendations: list = field(default_factory=list)
+    step_counts: dict = field(default_factory=dict)
+    ext_column: str = ''  # Extinction column that was fitted
+
+class PAXModel:
+    """
+    One PAX dataset and the operations on it, without any GUI.
+
+    Every change to the data bumps self.version, so callers can key their own
+    caches on it (the GUI's DataStore works the same way).
+    """
+    def __init__(self, df=None):
+        self.df = pd.DataFrame() if df is None else df
+        self.version = 0
+
+    def _changed(self):
+        invalidate_time_axis_cache()
+        self.version += 1
+
+    @staticmethod
+    def read_file(file_path, file_format=None):
+        """
+        Load and clean one PAX file with the flexible time handling.
+        
+        Parameters:
+        - file_path: .csv (V1) or .xlsx (V2) file
+        - file_format: 'V1' or 'V2'; default from the file extension
+        
+        Returns:
+        - df, time_source
+        """
+        if file_format is None:
+            file_format = file_formats.get(os.path.splitext(file_path)[1].lower())
+        df, time_source = process_single_file_with_flexible_time(file_path, file_format)
+        df = fix_pax_data_time_issue(df)
+        df['source_file'] = os.path.basename(file_path)
+        return df, time_source
+
+    def load(self, *file_paths, file_format=None):
+        """
+        Replace the data with one or more files, combined in time order.
+        Files that fail to load are reported in the result instead of raising,
+        unless none could be loaded.
+        
+        Returns:
+        - LoadResult
+        """
+        dataframes, result = [], LoadResult(rows=0, files=[])
+        for file_path in file_paths:
+            try:
+                df, time_source = self.read_file(file_path, file_format)
+            except Exception as e:
+                print(f"❌ Failed to load {os.path.basename(file_path)}: {str(e)}")
+                result.failed[file_path] = str(e)
+                continue
+            dataframes.append(df)
+            result.files.append(file_path)
+            result.time_sources[os.path.basename(file_path)] = time_source
+        if not dataframes:
+            raise ValueError(f"No files could be loaded: {result.failed}")
+
+        df = pd.concat(dataframes, ignore_index=True) if len(dataframes) > 1 else dataframes[0]
+        if len(dataframes) > 1 and np.issubdtype(df['time'].dtype, np.datetime64):
+            df = df.sort_values('time', kind='stable', ignore_index=True)
+        self.df = df
+        self._changed()
+        result.rows = len(df)
+        return result
+
+    def append(self, file_path, file_format=None):
+        """
+        Append one file after the current data (no re-sorting), like the GUI's
+        concatenate. Cached alarm intervals are extended instead of rebuilt.
+        
+        Returns:
+        - LoadResult
+        """
+        df, time_source = self.read_file(file_path, file_format)
+        self.df = append_rows(self.df, df)
+        self.version += 1  # append_rows already dropped the cached indexes of the old data
+        return LoadResult(rows=len(self.df), files=[file_path], time_sources={os.path.basename(file_path): time_source})
+
+    def clean(self):
+        """Replace infinities with NaN and back-fill gaps, in place."""
+        clearNaN(self.df)
+        self._changed()
+
+    def resample(self, rule):
+        """
+        Average the numeric columns onto a coarser time resolution.
+        
+        Parameters:
+        - rule: pandas offset alias, e.g. '1min' or '1h'
+        
+        Returns:
+        - New DataFrame with a 'time' column at the bucket starts (the model is unchanged)
+        """
+        if not np.issubdtype(self.df['time'].dtype, np.datetime64):
+            raise ValueError("Resampling needs a datetime 'time' column")
+        numeric = self.df.select_dtypes(include='number')
+        averaged = numeric.groupby(self.df['time'].dt.floor(rule)).mean()
+        return averaged.rename_axis('time').reset_index()
+
+    def time_axis(self):
+        """Cached numeric time axis (see get_time_axis)."""
+        return get_time_axis(self.df)
+
+    def mode_segments(self):
+        """Cached Mode run-length index, or None without a 'Mode' column."""
+        return get_mode_segments(self.df)
+
+    def alarm_index(self):
+        """Cached alarm episode index, or None without an 'Alarm' column."""
+        return get_alarm_index(self.df)
+
+    def add_extinction(self, i0_low, i0_high, segment_filter=None, column='Extinction_Coefficient'):
+        """
+        Add the extinction column from one I0 region (rows i0_low..i0_high).
+        
+        Returns:
+        - ExtinctionResult
+        """
+        self.df, i0_mean = calculate_extinction_coefficient(self.df, i0_low, i0_high,
+                                                            calculated_column_name=column,
+                                                            segment_filter=segment_filter)
+        self.version += 1  # Same rows, so the cached indexes stay valid
+        return ExtinctionResult(column=column, i0_baseline=float(i0_mean))
+
+    def add_drift_extinction(self, zero_periods=None, column='Extinction_Coefficient'):
+        """
+        Add the extinction column with an I0 baseline interpolated between zero periods.
+        
+        Returns:
+        - ExtinctionResult
+        """
+        self.df, info = calculate_extinction_coefficient_drift(self.df, zero_periods, calculated_column_name=column)
+        self.version += 1
+        return ExtinctionResult(column=column, i0_baseline=float(np.mean([p[2] for p in info['periods']])),
+                                periods=info['periods'])
+
+    def calibrate(self, calib_low, calib_high, min_val, max_val, percent, mode='Scattering', segment_filter=None, spike_window=None, ext_column=None):
+        """
+        Filter the calibration region and fit the regression, exactly like the
+        calibration window.
+        
+        Parameters:
+        - spike_window: Optional Hampel filter window (samples); spikes of the X column
+          are then written to its outlier column and rejected (see outliers.py)
+        - ext_column: Extinction column to fit (default as enhanced_calibration_analysis:
+          'Debug Ext Calculation' when the file has it)
+        
+        Returns:
+        - CalibrationResult
+        """
+        from scipy import stats
+        outlier_column = None
+        if spike_window:
+            x_column = 'Bscat (1/Mm)' if mode == 'Scattering' else 'Babs (1/Mm)'
+            outlier_column = outlier_column_name(x_column)
+            self.df[outlier_column] = hampel_outliers(self.df[x_column].to_numpy(dtype=float), spike_window)
+            self.version += 1
+        filtered_data, debug_info = enhanced_calibration_analysis(
+            self.df, calib_low, calib_high, min_val, max_val, percent, mode, segment_filter=segment_filter,
+            outlier_column=outlier_column, ext_column=ext_column
+        )
+        x, y = np.asarray(filtered_data['x'], dtype=float), np.asarray(filtered_data['y'], dtype=float)
+        slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+        return CalibrationResult(
+            slope=slope, intercept=intercept, r2=r_value ** 2, p_value=p_value, std_err=std_err,
+            count=filtered_data['count'], x=x, y=y,
+            x_column=filtered_data['x_column'], y_column=filtered_data['y_column'],
+            issues=debug_info['issues'], recommendations=debug_info['recommendations'],
+            step_counts=debug_info['step_counts'], ext_column=filtered_data['ext_column'],
+        )
@@ -1,13 +1,18 @@
-import seaborn as sns
 from matplotlib.figure import Figure
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from collections import OrderedDict
+import numpy as np
 
 from data_processing import *
+from memo import analysis_memo
+from alarms import any_channel
+from outliers import is_outlier_column
+from figures import big5_layout, sanity_4x_layout, draw_big5, draw_4x
 from constants import *
 
 def create_figure(figsize=(6, 6)):
@@ -25,7 +30,8 @@ def create_axes(figure, position=(1, 1, 1)):
 #make figure as its own element
 class FigureCreate:
     def __init__(self, figsize=(6, 6)):
-        self.fig = plt.figure(figsize=figsize)
+        # A plain Figure (not plt.figure) so startup does not have to import pyplot
+        self.fig = Figure(figsize=figsize)
     
     def get_figure(self):
         return self.fig
@@ -42,21 +48,22 @@ def plot_data(df, selection, ax, xloc1, xloc2, xlocA, xlocB):
     Plot the selected data on the provided axes.
     """
     ax.clear()
+    t = get_time_axis(df)['num']
     for trace in selection:
         locator = mdates.AutoDateLocator()
         formatter = mdates.ConciseDateFormatter(locator)
         ax.xaxis.set_major_locator(locator)
         ax.xaxis.set_major_formatter(formatter)
         
-        sns.lineplot(data=df, x='time', y=df.columns[trace], ax=ax)
+        ax.plot(t, df[df.columns[trace]].to_numpy())
         ax.tick_params(axis='x', rotation=20)
 
-    ax.axvline(df['time'][xloc1], color='green', linestyle='--')
-    ax.axvline(df['time'][xloc2], color='red', linestyle='--')
-    ax.axvspan(df['time'][xloc1], df['time'][xloc2], facecolor='gray', alpha=.25)
-    ax.axvline(df['time'][xlocA], color='#90EE90', linestyle=':')
-    ax.axvline(df['time'][xlocB], color='#FF7276', linestyle=':')
-    ax.axvspan(df['time'][xlocA], df['time'][xlocB], facecolor='gray', alpha=.25)
+    ax.axvline(t[xloc1], color='green', linestyle='--')
+    ax.axvline(t[xloc2], color='red', linestyle='--')
+    ax.axvspan(t[xloc1], t[xloc2], facecolor='gray', alpha=.25)
+    ax.axvline(t[xlocA], color='#90EE90', linestyle=':')
+    ax.axvline(t[xlocB], color='#FF7276', linestyle=':')
+    ax.axvspan(t[xlocA], t[xlocB], facecolor='gray', alpha=.25)
     
 
 def slider_changed(event, df, label_widget, plot_callback):
@@ -71,10 +78,13 @@ def slider_changed(event, df, label_widget, plot_callback):
     slider_value = float(event)
     index = int(min(max(0, slider_value), max_index))
     
-    # Update the label with current time value
+    # Update the label with current time value (read from the cached epoch array)
     try:
-        time_value = df['time'].iloc[index]
-        label_widget.config(text=f"Time: {time_value.strftime('%H:%M:%S')}")
+        time_text = time_of_day_text(df, index)
+        if time_text is None:
+            label_widget.config(text=f"Index: {index}")
+        else:
+            label_widget.config(text=f"Time: {time_text}")
     except (IndexError, KeyError):
         label_widget.config(text=f"Index: {index}")
     
@@ -102,7 +112,253 @@ def updateVLine(line, frame):
     line.set_xdata(frame)
     return line
 
-def plot_data_subplots(df, selection, fig, subplot_mode=False, xloc1=0, xloc2=100, xlocA=200, xlocB=300):
+class SubplotGrid:
+    """
+    Scrollable stack of subplots that all share the x-axis.
+    
+    Only the panels inside the visible window are shown (hidden axes are skipped by
+    the renderer), and a panel is only built the first time it scrolls into view,
+    so selecting dozens of channels costs no more than the few that are on screen.
+    """
+    def __init__(self, fig, panels_per_view=4):
+        self.fig = fig
+        self.panels_per_view = panels_per_view
+        self.first_panel = 0
+        self.panels = {}  # listbox index -> {'ax': axes, 'marker_artists': [...], 'markers': (...)}
+        self.df = None
+        self.data_version = None
+        self.selection = ()
+        self.markers = None
+        self.segment_filter = None
+        self.show_alarms = False
+        self.aggregation = None
+        self.hide_spikes = False
+
+    def reset(self):
+        """Forget all panels (call after anything else clears the figure)."""
+        self.panels = {}
+        self.df = None
+        self.data_version = None
+        self.selection = ()
+        self.segment_filter = None
+        self.show_alarms = False
+        self.aggregation = None
+        self.hide_spikes = False
+        self.first_panel = 0
+
+    def visible_axes(self):
+        """Return the axes currently on screen, top to bottom."""
+        first, last = self.visible_range()
+        return [self.panels[trace]['ax'] for trace in self.selection[first:last] if trace in self.panels]
+
+    def visible_range(self, selection=None):
+        """
+        Return (first, last) panel positions currently on screen, last exclusive; with a
+        selection, the positions show() would put on screen for it.
+        """
+        if selection is None:
+            selection = self.selection
+        first = self.first_panel
+        if tuple(selection) != self.selection:
+            first = min(first, max(0, len(selection) - self.panels_per_view))
+        return first, min(first + self.panels_per_view, len(selection))
+
+    def scroll_to(self, first_panel):
+        """Move the visible window so it starts at the given panel position."""
+        max_first = max(0, len(self.selection) - self.panels_per_view)
+        self.first_panel = int(min(max(0, first_panel), max_first))
+        self.layout()
+
+    def show(self, df, selection, markers, data_version=None, segment_filter=None, show_alarms=False, aggregation=None, hide_spikes=False):
+        """
+        Display the selection, reusing existing panels when only the markers moved.
+        
+        Parameters:
+        - df: DataFrame containing the data
+        - selection: List of selected column indices from listbox
+        - markers: Tuple of the four slider indices (xloc1, xloc2, xlocA, xlocB)
+        - data_version: Optional dataset version; panels are rebuilt when it changes
+        - segment_filter: Optional Mode segment filter; rows outside it are not drawn
+        - show_alarms: Shade the red/yellow alarm episodes behind every panel
+        - aggregation: Optional bucket size (e.g. '1h'); panels then show bucket means
+        - hide_spikes: Leave out the rows flagged in each column's spike mask (see plot_trace)
+        """
+        selection = tuple(selection)
+        if (df is not self.df or selection != self.selection or data_version != self.data_version
+                or segment_filter != self.segment_filter or show_alarms != self.show_alarms
+                or aggregation != self.aggregation or hide_spikes != self.hide_spikes):
+            self.fig.clear()
+            self.panels = {}
+            self.df = df
+            self.data_version = data_version
+            self.segment_filter = segment_filter
+            self.show_alarms = show_alarms
+            self.aggregation = aggregation
+            self.hide_spikes = hide_spikes
+            self.selection = selection
+            self.first_panel = min(self.first_panel, max(0, len(selection) - self.panels_per_view))
+        self.markers = tuple(markers)
+        self.layout()
+
+    def layout(self):
+        """Create the panels in the visible window (if needed) and position them."""
+        if self.df is None:
+            return
+        first, last = self.visible_range()
+        visible = self.selection[first:last]
+        
+        for panel in self.panels.values():
+            panel['ax'].set_visible(False)
+        
+        # Manual layout; cheaper than tight_layout and stable while scrolling
+        top, bottom, left, right, gap = 0.96, 0.08, 0.1, 0.97, 0.05
+        slot_height = (top - bottom) / max(len(visible), 1)
+        
+        for slot, trace in enumerate(visible):
+            panel = self.panels.get(trace)
+            if panel is None:
+                panel = self._create_panel(trace)
+            ax = panel['ax']
+            ax.set_position([left, top - (slot + 1) * slot_height, right - left, slot_height - gap])
+            ax.tick_params(axis='x', labelbottom=(slot == len(visible) - 1))
+            if panel['markers'] != self.markers:
+                self._draw_markers(panel)
+            ax.set_visible(True)
+
+    def _create_panel(self, trace):
+        leader = next(iter(self.panels.values()))['ax'] if self.panels else None
+        ax = self.fig.add_axes([0, 0, 1, 1], sharex=leader)
+        column = self.df.columns[trace]
+        plot_trace(ax, self.df, column, self.segment_filter, self.data_version, self.aggregation, hide_spikes=self.hide_spikes)
+        if self.show_alarms:
+            draw_alarm_spans(ax, alarm_spans(self.df))
+        
+        # Format the subplot
+        locator = mdates.AutoDateLocator()
+        formatter = mdates.ConciseDateFormatter(locator)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(formatter)
+        ax.tick_params(axis='x', rotation=20, labelsize='small')
+        ax.tick_params(axis='y', labelsize='small')
+        ax.set_title(column, fontsize=10)
+        ax.grid(True, alpha=0.3)
+        
+        panel = {'ax': ax, 'marker_artists': [], 'markers': None}
+        self.panels[trace] = panel
+        return panel
+
+    def _draw_markers(self, panel):
+        for artist in panel['marker_artists']:
+            artist.remove()
+        panel['marker_artists'] = []
+        
+        ax = panel['ax']
+        t = get_time_axis(self.df)['num']
+        xloc1, xloc2, xlocA, xlocB = self.markers
+        # Add vertical lines and spans
+        try:
+            panel['marker_artists'] = [
+                ax.axvline(t[xloc1], color='green', linestyle='--', alpha=0.7),
+                ax.axvline(t[xloc2], color='red', linestyle='--', alpha=0.7),
+                ax.axvspan(t[xloc1], t[xloc2], facecolor='gray', alpha=0.15),
+                ax.axvline(t[xlocA], color='#90EE90', linestyle=':', alpha=0.7),
+                ax.axvline(t[xlocB], color='#FF7276', linestyle=':', alpha=0.7),
+                ax.axvspan(t[xlocA], t[xlocB], facecolor='blue', alpha=0.1),
+            ]
+        except IndexError:
+            pass  # Skip if indices are out of range
+        panel['markers'] = self.markers
+
+def spike_rows(df, column, segment_filter=None):
+    """
+    Rows of a column flagged by its spike mask column (see outliers.py) within the
+    segment filter, or None when the column has no mask.
+    """
+    name = outlier_column_name(column)
+    if name not in df.columns:
+        return None
+    spikes = df[name].to_numpy(dtype=bool)
+    mask = segment_mask(df, segment_filter)
+    return np.flatnonzero(spikes if mask is None else spikes & mask)
+
+def segment_values(df, column, segment_filter=None, data_version=None, hide_spikes=False):
+    """
+    Column values as a float array with the rows outside the segment filter set to NaN,
+    so the line shows gaps there instead of joining across them. With hide_spikes the
+    rows flagged in the column's spike mask are set to NaN as well. With a data_version
+    (DataStore.columns_version) the masked array is memoized, so redraws and panel
+    rebuilds do not mask the column again.
+    """
+    def compute():
+        values = df[column].to_numpy()
+        mask = segment_mask(df, segment_filter)
+        spikes = spike_rows(df, column) if hide_spikes else None
+        if mask is None and spikes is None:
+            return values
+        values = values.astype(float) if mask is None else np.where(mask, values.astype(float), np.nan)
+        if spikes is not None:
+            values[spikes] = np.nan  # astype/where made a copy
+        return values
+    
+    if (segment_filter is None and not hide_spikes) or data_version is None:
+        return compute()
+    key = ('segment_values', data_version, id(df), len(df), column, segment_filter, hide_spikes)
+    return analysis_memo.get_or_compute(key, compute)[0]
+
+def plot_trace(ax, df, column, segment_filter=None, data_version=None, aggregation=None, label=None, hide_spikes=False):
+    """
+    Plot one column against time: every row, or with an aggregation (bucket size such
+    as '1h') the bucket means as steps with a shaded min-max band. With hide_spikes the
+    rows in the column's spike mask are left out of the line and marked with red
+    crosses (raw data only; bucket statistics include every row).
+    """
+    if aggregation is None:
+        t = get_time_axis(df)['num']
+        lines = ax.plot(t, segment_values(df, column, segment_filter, data_version, hide_spikes), label=label)
+        spikes = spike_rows(df, column, segment_filter) if hide_spikes else None
+        if spikes is not None and len(spikes):
+            ax.plot(t[spikes], df[column].to_numpy(dtype=float)[spikes], 'x', color='red', markersize=4, label='_nolegend_')
+        return lines
+    buckets = time_aggregator.aggregate([column], aggregation, segment_filter)[column]
+    if buckets.empty:
+        return ax.plot([], [], label=label)
+    # Repeat the last bucket at its end time so the last step has its full width
+    t = mdates.date2num(buckets.index.to_numpy())
+    t = np.append(t, t[-1] + pd.Timedelta(aggregation) / pd.Timedelta('1D'))
+    mean, low, high = (np.append(buckets[stat].to_numpy(), buckets[stat].iloc[-1]) for stat in ('mean', 'min', 'max'))
+    lines = ax.plot(t, mean, drawstyle='steps-post', label=label)
+    ax.fill_between(t, low, high, step='post', color=lines[0].get_color(), alpha=0.2, linewidth=0)
+    return lines
+
+def alarm_spans(df):
+    """
+    Time-axis spans of every alarm episode (any channel), per severity.
+    Built from the cached alarm index, so it is cheap to call on every redraw.
+    
+    Returns:
+    - {'red': [(start, width), ...], 'yellow': [...]}, empty if there is no 'Alarm' column
+    """
+    index = get_alarm_index(df)
+    if index is None:
+        return {}
+    t = get_time_axis(df)['num']
+    step = float(np.median(np.diff(t))) if len(t) > 1 else 1.0
+    spans = {}
+    for severity in ('yellow', 'red'):
+        start_rows, stop_rows = index.row_intervals(any_channel, severity)
+        starts = t[start_rows]
+        spans[severity] = list(zip(starts, t[stop_rows - 1] - starts + step))
+    return spans
+
+def draw_alarm_spans(ax, spans):
+    """Shade alarm episodes over the full height of an axis, red drawn over yellow."""
+    for severity, face in (('yellow', '#f1c40f'), ('red', '#e74c3c')):
+        if spans.get(severity):
+            # One collection per severity; x in data units, y in axes units
+            ax.broken_barh(spans[severity], (0, 1), transform=ax.get_xaxis_transform(),
+                           facecolors=face, alpha=0.2, linewidth=0, zorder=0)
+
+def plot_data_subplots(df, selection, fig, subplot_mode=False, xloc1=0, xloc2=100, xlocA=200, xlocB=300, grid=None, data_version=None, segment_filter=None, show_alarms=False, aggregation=None, hide_spikes=False):
     """
     Plot the selected data either on one axis or multiple subplots.
     
@@ -112,87 +368,277 @@ def plot_data_subplots(df, selection, fig, subplot_mode=False, xloc1=0, xloc2=10
     - fig: The matplotlib figure object
     - subplot_mode: Boolean - True for subplots, False for single axis
     - xloc1, xloc2, xlocA, xlocB: Slider position indices
+    - grid: Optional SubplotGrid kept by the caller so panels and the scroll position
+      survive between calls. Subplot mode has no limit on the number of panels.
+    - data_version: Optional version of the plotted columns (DataStore.columns_version) so a kept
+      grid rebuilds its panels after the data changes
+    - segment_filter: Optional Mode segment filter (e.g. 'Sampling only'); other rows are left out
+    - show_alarms: Shade the red/yellow alarm episodes (from the Alarm column) behind the traces
+    - aggregation: Optional bucket size (e.g. '1h', see constants.aggregation_levels); bucket
+      means with a min-max band are drawn instead of every row
+    - hide_spikes: Leave out (and mark) the rows flagged in each column's spike mask column;
+      the caller makes the masks current first (data_processing.spike_mask_columns)
     """
+    if subplot_mode and len(selection) > 1:
+        # Multiple subplots mode, shared x-axis, only the visible panels are built
+        if grid is None:
+            grid = SubplotGrid(fig)
+        grid.show(df, selection, (xloc1, xloc2, xlocA, xlocB), data_version, segment_filter, show_alarms, aggregation, hide_spikes)
+        return
+    
     # Clear the entire figure
     fig.clear()
+    if grid is not None:
+        grid.reset()
     
     if not selection:
         return
     
-    if subplot_mode and len(selection) > 1:
-        # Multiple subplots mode
-        num_plots = min(len(selection), 4)  # Maximum 4 subplots
-        
-        # Determine subplot layout
-        if num_plots == 1:
-            rows, cols = 1, 1
-        elif num_plots == 2:
-            rows, cols = 2, 1
-        elif num_plots == 3:
-            rows, cols = 3, 1
-        else:  # 4 plots
-            rows, cols = 2, 2
+    # Shared numeric time axis; converted once per dataset, not once per trace
+    t = get_time_axis(df)['num']
+    
+    # Single axis mode (original behavior)
+    ax = fig.add_subplot(1, 1, 1)
+    
+    # Plot all selected traces on the same axis
+    for trace in selection:
+        plot_trace(ax, df, df.columns[trace], segment_filter, data_version, aggregation, label=df.columns[trace], hide_spikes=hide_spikes)
+    if show_alarms:
+        draw_alarm_spans(ax, alarm_spans(df))
+    ax.set_xlabel('time')
+    if len(selection) == 1:
+        ax.set_ylabel(df.columns[selection[0]])
+    
+    # Add vertical lines and spans
+    try:
+        ax.axvline(t[xloc1], color='green', linestyle='--')
+        ax.axvline(t[xloc2], color='red', linestyle='--')
+        ax.axvspan(t[xloc1], t[xloc2], facecolor='gray', alpha=.25)
+        ax.axvline(t[xlocA], color='#90EE90', linestyle=':')
+        ax.axvline(t[xlocB], color='#FF7276', linestyle=':')
+        ax.axvspan(t[xlocA], t[xlocB], facecolor='gray', alpha=.25)
+    except IndexError:
+        pass
+    
+    # Format the main plot
+    locator = mdates.AutoDateLocator()
+    formatter = mdates.ConciseDateFormatter(locator)
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(formatter)
+    ax.tick_params(axis='x', rotation=20)
+    
+    # Add legend if multiple traces
+    if len(selection) > 1:
+        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+
+class RenderCache:
+    """
+    LRU cache of rendered canvas bitmaps with a memory budget.
+    
+    Building the artists and rasterizing every point are the slow part of a redraw,
+    so a caller checks blit() with the key of the view it is about to show before
+    building the figure: on a hit the stored RGBA buffer is copied into the canvas
+    renderer and blitted, and the figure is not touched at all.
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def blit(self, canvas, key):
+        """
+        Show the cached bitmap of a view, if there is one.
         
-        # Create subplots
-        for i, trace in enumerate(selection[:4]):  # Limit to 4 subplots
-            ax = fig.add_subplot(rows, cols, i + 1)
-            
-            # Plot the data
-            sns.lineplot(data=df, x='time', y=df.columns[trace], ax=ax)
-            
-            # Add vertical lines and spans
-            try:
-                ax.axvline(df['time'].iloc[xloc1], color='green', linestyle='--', alpha=0.7)
-                ax.axvline(df['time'].iloc[xloc2], color='red', linestyle='--', alpha=0.7)
-                ax.axvspan(df['time'].iloc[xloc1], df['time'].iloc[xloc2], facecolor='gray', alpha=0.15)
-                ax.axvline(df['time'].iloc[xlocA], color='#90EE90', linestyle=':', alpha=0.7)
-                ax.axvline(df['time'].iloc[xlocB], color='#FF7276', linestyle=':', alpha=0.7)
-                ax.axvspan(df['time'].iloc[xlocA], df['time'].iloc[xlocB], facecolor='blue', alpha=0.1)
-            except IndexError:
-                pass  # Skip if indices are out of range
-            
-            # Format the subplot
-            locator = mdates.AutoDateLocator()
-            formatter = mdates.ConciseDateFormatter(locator)
-            ax.xaxis.set_major_locator(locator)
-            ax.xaxis.set_major_formatter(formatter)
-            ax.tick_params(axis='x', rotation=20, labelsize='small')
-            ax.tick_params(axis='y', labelsize='small')
-            ax.set_title(df.columns[trace], fontsize=10)
-            ax.grid(True, alpha=0.3)
+        Parameters:
+        - canvas: A FigureCanvasAgg based canvas (e.g. FigureCanvasTkAgg)
+        - key: Hashable description of everything that affects the picture
         
-        # Adjust layout to prevent overlap
-        fig.tight_layout(pad=1.5)
+        Returns:
+        - True if the bitmap came from the cache (the canvas now shows it)
+        """
+        renderer = canvas.get_renderer()
+        key = (key, int(renderer.width), int(renderer.height))
+        bitmap = self._entries.get(key)
+        if bitmap is None:
+            self.misses += 1
+            return False
+        self._entries.move_to_end(key)
+        np.asarray(renderer.buffer_rgba())[...] = bitmap
+        canvas.blit()
+        self.hits += 1
+        return True
+    
+    def draw(self, canvas, key):
+        """
+        Draw the canvas, or blit a cached bitmap for the same key. The figure must
+        already show the view of the key.
         
+        Returns:
+        - True if the bitmap came from the cache
+        """
+        if self.blit(canvas, key):
+            return True
+        canvas.draw()
+        renderer = canvas.get_renderer()
+        self.put((key, int(renderer.width), int(renderer.height)), np.asarray(renderer.buffer_rgba()).copy())
+        return False
+
+    def put(self, key, bitmap):
+        """Store a bitmap, evicting the least recently used ones to stay within budget."""
+        if bitmap.nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key).nbytes
+        self._entries[key] = bitmap
+        self.current_bytes += bitmap.nbytes
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+
+    def clear(self):
+        """Drop every cached bitmap."""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+def compute_xy_view(df, x_column, y_column, region=None, threshold=xy_density_threshold, bins=xy_density_bins, data_version=None):
+    """
+    Compute (and memoize) what plot_xy draws: the finite x/y pairs when there are few
+    enough for a scatter plot, else their 2D histogram counts. A cache hit converts no
+    column at all.
+    
+    Parameters:
+    - df: DataFrame containing the data
+    - x_column, y_column: Column names
+    - region: Optional (start, stop) row indices; None for all rows
+    - threshold: Number of finite x/y pairs above which the pairs are binned
+    - bins: Number of bins along each axis
+    - data_version: (DataStore.uid, DataStore.columns_version of the two columns) of the
+      store df belongs to, used in the cache key; None computes without caching
+    
+    Returns:
+    - dict with 'count' (finite pairs) and either 'x', 'y' or 'counts' (bins x bins,
+      x along the first axis), 'xedges', 'yedges'
+    """
+    def compute():
+        x, y = _xy_values(df, x_column, y_column, region)
+        view = {'count': len(x)}
+        if len(x) > threshold:
+            counts, xedges, yedges = np.histogram2d(x, y, bins=bins)
+            if counts.max() > 0:  # LogNorm needs at least one filled bin
+                view.update(counts=counts, xedges=xedges, yedges=yedges)
+                return view
+        view.update(x=x, y=y)
+        return view
+    
+    if data_version is None:
+        return compute()
+    key = ('xy_view', data_version, x_column, y_column, region, threshold, bins)
+    return analysis_memo.get_or_compute(key, compute)[0]
+
+def _xy_values(df, x_column, y_column, region):
+    start, stop = region if region is not None else (0, len(df))
+    x = df[x_column].to_numpy(dtype=float)[start:stop]
+    y = df[y_column].to_numpy(dtype=float)[start:stop]
+    finite = np.isfinite(x) & np.isfinite(y)
+    return x[finite], y[finite]
+
+def plot_xy(df, x_column, y_column, fig, region=None, threshold=xy_density_threshold, bins=xy_density_bins, data_version=None):
+    """
+    Plot any column against another. Small selections are drawn as a scatter plot;
+    above the threshold the points are binned into a 2D histogram (log colour scale),
+    which stays fast for millions of points.
+    
+    Parameters:
+    - df: DataFrame containing the data
+    - x_column, y_column: Column names
+    - fig: The matplotlib figure object (cleared first)
+    - region: Optional (start, stop) row indices; None for all rows
+    - threshold: Number of finite x/y pairs above which density rendering is used
+    - bins: Number of bins along each axis for density rendering
+    - data_version: (DataStore.uid, columns version) used to cache the view, see compute_xy_view
+    """
+    fig.clear()
+    ax = fig.add_subplot(1, 1, 1)
+    
+    # Decided on the finite x/y pairs, not the rows: a mostly-NaN region stays a scatter plot
+    view = compute_xy_view(df, x_column, y_column, region, threshold, bins, data_version)
+    if 'counts' not in view:
+        ax.scatter(view['x'], view['y'], s=4, alpha=0.5)
+        ax.set_title(f"{y_column} vs {x_column} ({view['count']:,} points)", fontsize=10)
     else:
-        # Single axis mode (original behavior)
-        ax = fig.add_subplot(1, 1, 1)
-        
-        # Plot all selected traces on the same axis
-        for trace in selection:
-            sns.lineplot(data=df, x='time', y=df.columns[trace], ax=ax, label=df.columns[trace])
-        
-        # Add vertical lines and spans
-        try:
-            ax.axvline(df['time'].iloc[xloc1], color='green', linestyle='--')
-            ax.axvline(df['time'].iloc[xloc2], color='red', linestyle='--')
-            ax.axvspan(df['time'].iloc[xloc1], df['time'].iloc[xloc2], facecolor='gray', alpha=.25)
-            ax.axvline(df['time'].iloc[xlocA], color='#90EE90', linestyle=':')
-            ax.axvline(df['time'].iloc[xlocB], color='#FF7276', linestyle=':')
-            ax.axvspan(df['time'].iloc[xlocA], df['time'].iloc[xlocB], facecolor='gray', alpha=.25)
-        except IndexError:
-            pass
-        
-        # Format the main plot
-        locator = mdates.AutoDateLocator()
-        formatter = mdates.ConciseDateFormatter(locator)
-        ax.xaxis.set_major_locator(locator)
-        ax.xaxis.set_major_formatter(formatter)
-        ax.tick_params(axis='x', rotation=20)
-        
-        # Add legend if multiple traces
-        if len(selection) > 1:
-            ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+        mesh = ax.pcolormesh(view['xedges'], view['yedges'], np.ma.masked_equal(view['counts'].T, 0), norm=LogNorm(), cmap='viridis')
+        fig.colorbar(mesh, ax=ax, label='Points per bin')
+        ax.set_title(f"{y_column} vs {x_column} ({view['count']:,} points, binned {bins}x{bins})", fontsize=10)
+    
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_column)
+    ax.grid(True, alpha=0.3)
+
+def plot_xy_window(df, parent_window, gui_instance):
+    """
+    Open a window to plot any two columns of the loaded data against each other.
+    
+    Parameters:
+    - df: pandas DataFrame containing the data to plot.
+    - parent_window: Tkinter parent window.
+    - gui_instance: Reference to the main PAXView instance (listbox selection and calibration sliders)
+    """
+    if df.empty:
+        messagebox.showwarning("No Data", "Please load data files first!")
+        return
+    
+    excluded_columns = ['Alarm', 'time', 'source_file']
+    columns = [col for col in df.columns
+               if col not in excluded_columns and not is_outlier_column(col) and pd.api.types.is_numeric_dtype(df[col])]
+    
+    # Start from the first two selected listbox columns when there are any
+    selected = [gui_instance.listbox.get(i) for i in gui_instance.listbox.curselection()]
+    selected = [col for col in selected if col in columns]
+    defaults = (selected + columns)[:2]
+    
+    newXY = tk.Toplevel(parent_window)
+    newXY.title("X vs Y Plot")
+    newXY.geometry("900x800")
+    
+    controls = tk.Frame(newXY)
+    controls.pack(side="top", fill="x", padx=5, pady=5)
+    
+    tk.Label(controls, text="X:").grid(row=0, column=0)
+    x_var = tk.StringVar(value=defaults[0] if defaults else "")
+    ttk.Combobox(controls, textvariable=x_var, values=columns, width=30, state='readonly').grid(row=0, column=1)
+    tk.Label(controls, text="Y:").grid(row=0, column=2)
+    y_var = tk.StringVar(value=defaults[-1] if defaults else "")
+    ttk.Combobox(controls, textvariable=y_var, values=columns, width=30, state='readonly').grid(row=0, column=3)
+    
+    region_only = tk.BooleanVar(value=False)
+    tk.Checkbutton(controls, text="Calib. region only", variable=region_only).grid(row=0, column=4, padx=5)
+    
+    fig = Figure(figsize=(9, 7), dpi=100)
+    canvas = FigureCanvasTkAgg(fig, master=newXY)
+    
+    def redraw():
+        if not x_var.get() or not y_var.get():
+            return
+        region = None
+        if region_only.get():
+            region = (int(gui_instance.current_valueCalibLow.get()), int(gui_instance.current_valueCalibHigh.get()) + 1)
+        store = constants.data_store
+        data_version = (store.uid, store.columns_version((x_var.get(), y_var.get())))
+        plot_xy(store.df, x_var.get(), y_var.get(), fig, region=region, data_version=data_version)
+        canvas.draw()
+    
+    tk.Button(controls, text="Plot", command=redraw, bg='light blue').grid(row=0, column=5, padx=5)
+    
+    canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+    toolbar = NavigationToolbar2Tk(canvas, newXY, pack_toolbar=False)
+    toolbar.update()
+    toolbar.pack()
+    redraw()
 
 #Old
 def plot_big5(df, parent_window):
@@ -215,27 +661,7 @@ def plot_big5(df, parent_window):
 
 	# Create the figure
 	fig = Figure(figsize=(12, 8), dpi=100)
-
-	# Add subplots
-	plot1 = fig.add_subplot(321)
-	plot2 = fig.add_subplot(323)
-	plot3 = fig.add_subplot(325)
-	plot4 = fig.add_subplot(322)
-	plot5 = fig.add_subplot(324)
-
-	axes = [plot1, plot2, plot3, plot4, plot5]
-	labels = ['Bscat (1/Mm)', 'Babs (1/Mm)', 'Bext (1/Mm)', 'Single Scat Albedo', 'BC Mass (ug/m3)']
-	y_labels = ['Bscat', 'Babs', 'Bext', 'SSA', 'BC Mass']
-
-	# Configure each subplot
-	for ax, label, y_label in zip(axes, labels, y_labels):
-		locator = mdates.AutoDateLocator()
-		formatter = mdates.ConciseDateFormatter(locator)
-		ax.xaxis.set_major_locator(locator)
-		ax.xaxis.set_major_formatter(formatter)
-		ax.plot(df['time'], df[label], label=label)
-		ax.tick_params(axis='both', labelsize='small', labelrotation=20)
-		ax.set_ylabel(y_label)
+	draw_big5(fig, df)
 
 	# Add the figure to the Tkinter window
 	canvas = FigureCanvasTkAgg(fig, master=newBig5)
@@ -269,28 +695,7 @@ def plot_4x(df, parent_window):
 
 	# Create the figure
 	fig = Figure(figsize=(12, 8), dpi=100)
-     
-
-	# Add subplots
-	plot1 = fig.add_subplot(221)
-	plot2 = fig.add_subplot(222)
-	plot3 = fig.add_subplot(223)
-	plot4 = fig.add_subplot(224)
-
-	axes = [plot1, plot2, plot3, plot4]
-	labels = ['Bscat RAW', 'Bext (1/Mm)', 'Detected Laser power (W)', 'Placeholder']
-	y_labels = ['Bscat RAW', 'Bext', 'Laser Power', 'Placeholder. "Generate calibration frame" for r^2']
-	columns = ['scat_raw', 'Bext (1/Mm)', 'Detected Laser power (W)', 'time']  # Placeholder for the last column
-
-	# Configure each subplot
-	for ax, label, y_label, column in zip(axes, labels, y_labels, columns):
-		locator = mdates.AutoDateLocator()
-		formatter = mdates.ConciseDateFormatter(locator)
-		ax.xaxis.set_major_locator(locator)
-		ax.xaxis.set_major_formatter(formatter)
-		ax.plot(df['time'], df[column], label=label)
-		ax.tick_params(axis='both', labelsize='small', labelrotation=20)
-		ax.set_ylabel(y_label)
+	draw_4x(fig, df)
 
 	# Add the figure to the Tkinter window
 	canvas = FigureCanvasTkAgg(fig, master=new4x)
@@ -301,3 +706,448 @@ def plot_4x(df, parent_window):
 	toolbar = NavigationToolbar2Tk(canvas, new4x, pack_toolbar=False)
 	toolbar.update()
 	toolbar.pack()
+
+def draw_alarm_timeline(fig, df, timeline):
+    """
+    Draw one row per alarm channel that was ever red or yellow, with a bar for
+    every episode. Shared by the Tk window and any headless export.
+    
+    Parameters:
+    - fig: matplotlib Figure to draw on
+    - df: DataFrame the timeline was decoded from (for the time axis)
+    - timeline: AlarmTimeline of df
+    
+    Returns:
+    - channels: The channel names drawn, top to bottom
+    """
+    t = get_time_axis(df)['num']
+    step = float(np.median(np.diff(t))) if len(t) > 1 else 1.0
+    channels = [name for name in timeline.channel_names
+                if name in set(timeline.channels_in_alarm('red')) | set(timeline.channels_in_alarm('yellow'))]
+    
+    ax = fig.add_subplot(1, 1, 1)
+    for row, name in enumerate(reversed(channels)):
+        for color, face in (('yellow', '#f1c40f'), ('red', '#e74c3c')):
+            runs = np.array(timeline.intervals(name, color), dtype=int).reshape(-1, 2)
+            if len(runs):
+                # Each episode spans from its first row to one sample past its last row
+                starts = t[runs[:, 0]]
+                widths = t[runs[:, 1] - 1] - starts + step
+                ax.broken_barh(list(zip(starts, widths)), (row - 0.4, 0.8), facecolors=face)
+    
+    ax.set_yticks(range(len(channels)))
+    ax.set_yticklabels(list(reversed(channels)), fontsize=8)
+    ax.set_ylim(-0.6, max(len(channels), 1) - 0.4)
+    if len(t):
+        ax.set_xlim(t[0], t[-1] + step)
+    locator = mdates.AutoDateLocator()
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax.grid(True, axis='x', alpha=0.3)
+    ax.set_title("Alarm timeline (red / yellow)")
+    return channels
+
+def alarm_timeline_window(df, parent_window):
+    """
+    Show the decoded Alarm column as a timeline, plus a red-alarm summary, in a new window.
+    
+    Parameters:
+    - df: DataFrame with an 'Alarm' column
+    - parent_window: Tkinter parent window
+    """
+    if df.empty:
+        messagebox.showwarning("No Data", "Please load data first!")
+        return
+    timeline = get_alarm_timeline(df)
+    if timeline is None:
+        messagebox.showerror("No Alarm Column", "This data has no 'Alarm' column.")
+        return
+    
+    window = tk.Toplevel(parent_window)
+    window.title("Alarm Timeline")
+    window.geometry("1200x800")
+    
+    # Which channels were red, and when
+    epoch_ns = get_time_axis(df)['epoch_ns']
+    times = epoch_ns.astype('datetime64[ns]') if epoch_ns is not None else None
+    red = timeline.summary('red', times)
+    if red.empty:
+        summary_text = "No red alarms in this data"
+    else:
+        lines = [f"{r.channel}: {r.episodes} episode(s), {r.rows} rows, {r.first} to {r.last}" for r in red.itertuples()]
+        summary_text = "Red alarms:\n" + "\n".join(lines[:10]) + (f"\n... and {len(lines) - 10} more" if len(lines) > 10 else "")
+    tk.Label(window, text=summary_text, justify="left", anchor="w").pack(fill="x", padx=10, pady=5)
+    
+    fig = Figure(figsize=(12, 5), dpi=100)
+    channels = draw_alarm_timeline(fig, df, timeline)
+    if channels:
+        fig.subplots_adjust(left=0.22, right=0.98)
+    
+    canvas = FigureCanvasTkAgg(fig, master=window)
+    canvas.draw()
+    canvas.get_tk_widget().pack(fill="both", expand=True)
+    
+    toolbar = NavigationToolbar2Tk(canvas, window, pack_toolbar=False)
+    toolbar.update()
+    toolbar.pack()
+    
+    # Every episode, newest last, from the interval index
+    events = get_alarm_index(df).events()
+    columns = ('channel', 'severity', 'start', 'end', 'duration')
+    tree = ttk.Treeview(window, columns=columns, show='headings', height=8)
+    for column in columns:
+        tree.heading(column, text=column.capitalize())
+        tree.column(column, width=220 if column == 'channel' else 160)
+    max_rows = 5000
+    for event in events.head(max_rows).itertuples(index=False):
+        tree.insert('', 'end', values=tuple(str(v) for v in event))
+    tk.Label(window, text=f"{len(events):,} alarm episode(s)" + (f", first {max_rows:,} listed" if len(events) > max_rows else ""),
+             anchor="w").pack(fill="x", padx=10)
+    tree.pack(fill="x", padx=10, pady=(0, 10))
+
+def draw_instrument_overlay(fig, instrument_set, columns, names=None):
+    """
+    Draw the same channel(s) of several instruments on shared time axes, one panel
+    per column and one line per instrument. Every line reads the instrument's own
+    data and cached time axis, so no aligned copy is made for the view.
+    
+    Parameters:
+    - fig: matplotlib Figure to draw on
+    - instrument_set: instruments.InstrumentSet
+    - columns: Columns to plot
+    - names: Instruments to include (default all)
+    """
+    names = names or instrument_set.names
+    axes = None
+    for position, column in enumerate(columns, start=1):
+        axes = fig.add_subplot(len(columns), 1, position, sharex=axes)
+        for name in names:
+            df = instrument_set[name].df
+            if column in df.columns and not df.empty:
+                axes.plot(instrument_set.time_axis(name)['num'], df[column].to_numpy(), label=name, linewidth=0.8)
+        axes.set_ylabel(column, fontsize=8)
+        axes.tick_params(axis='both', labelsize='small')
+        axes.grid(True, alpha=0.3)
+        if position == 1:
+            axes.legend(fontsize=8, loc='upper right')
+    if axes is not None:
+        locator = mdates.AutoDateLocator()
+        axes.xaxis.set_major_locator(locator)
+        axes.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+def instrument_overlay_window(parent_window, gui_instance):
+    """
+    Window for intercomparisons: load several instruments side by side (one store
+    per serial number), overlay a channel from all of them, and compare or export
+    them aligned on a common time grid.
+    
+    Parameters:
+    - parent_window: Tkinter parent window
+    - gui_instance: Reference to the main PAXView instance (to hand an instrument to the main view)
+    """
+    from instruments import instrument_name
+    from controller import writeToLog
+    
+    window = tk.Toplevel(parent_window)
+    window.title("Instruments")
+    window.geometry("1200x900")
+    
+    top = tk.Frame(window)
+    top.pack(side="top", fill="x", padx=10, pady=5)
+    
+    tree_columns = ('name', 'rows', 'start', 'end')
+    tree = ttk.Treeview(top, columns=tree_columns, show='headings', selectmode='browse', height=5)
+    for column, width in zip(tree_columns, (160, 100, 180, 180)):
+        tree.heading(column, text=column.capitalize())
+        tree.column(column, width=width)
+    tree.grid(row=0, column=0, rowspan=4, sticky='nsew')
+    
+    tk.Label(top, text="Channels:").grid(row=0, column=2, sticky='w', padx=(10, 0))
+    channel_list = tk.Listbox(top, selectmode='multiple', height=6, width=30, exportselection=False)
+    channel_list.grid(row=1, column=2, rowspan=3, sticky='ns', padx=(10, 0))
+    
+    options = tk.Frame(top)
+    options.grid(row=0, column=3, rowspan=4, sticky='n', padx=10)
+    tk.Label(options, text="Grid:").grid(row=0, column=0, sticky='w')
+    grid_var = tk.StringVar(value='Reference times')
+    ttk.Combobox(options, textvariable=grid_var, values=('Reference times', '1s', '10s', '1min', '10min', '1h'),
+                 width=16, state='readonly').grid(row=0, column=1)
+    tk.Label(options, text="Tolerance:").grid(row=1, column=0, sticky='w')
+    tolerance_var = tk.StringVar(value='2s')
+    tk.Entry(options, textvariable=tolerance_var, width=18).grid(row=1, column=1)
+    tk.Label(options, text="Reference:").grid(row=2, column=0, sticky='w')
+    reference_var = tk.StringVar()
+    reference_select = ttk.Combobox(options, textvariable=reference_var, width=16, state='readonly')
+    reference_select.grid(row=2, column=1)
+    
+    fig = Figure(figsize=(11, 6), dpi=100)
+    canvas = FigureCanvasTkAgg(fig, master=window)
+    result_label = tk.Label(window, text="", justify="left", anchor="w", font=('Courier', 9))
+    
+    def refresh():
+        tree.delete(*tree.get_children())
+        for name in instruments.names:
+            start, end = instruments.time_range(name)
+            tree.insert('', 'end', iid=name, values=(name, f"{len(instruments[name].df):,}", start, end))
+        selected = [channel_list.get(i) for i in channel_list.curselection()]
+        channel_list.delete(0, 'end')
+        for i, column in enumerate(instruments.common_columns()):
+            channel_list.insert('end', column)
+            if column in selected:
+                channel_list.selection_set(i)
+        reference_select['values'] = instruments.names
+        if reference_var.get() not in instruments.names:
+            reference_var.set(instruments.names[0] if instruments.names else '')
+    
+    def selected_channels():
+        channels = [channel_list.get(i) for i in channel_list.curselection()]
+        if not channels:
+            messagebox.showwarning("No Channel", "Select one or more channels first.", parent=window)
+        return channels
+    
+    def add_files():
+        file_paths = filedialog.askopenfilenames(
+            parent=window, title="Choose Instrument Files",
+            filetypes=(("PAX Data", "*.csv *.xlsx"), ("Comma Separated", "*.csv"), ("Excel", "*.xlsx"))
+        )
+        if not file_paths:
+            return
+        try:
+            results = instruments.load_files(file_paths)
+        except Exception as e:
+            messagebox.showerror("Loading Error", f"Error loading instrument files: {str(e)}", parent=window)
+            return
+        failed = {path: error for result in results.values() for path, error in result.failed.items()}
+        if failed:
+            messagebox.showwarning("Some Files Failed", "\n".join(f"{os.path.basename(p)}: {e}" for p, e in failed.items()), parent=window)
+        writeToLog(f"Loaded instrument(s): {', '.join(results)}", gui_instance.log)
+        refresh()
+    
+    def add_loaded_data():
+        df = constants.data_store.df
+        if df.empty:
+            messagebox.showwarning("No Data", "Please load data files first!", parent=window)
+            return
+        name = instrument_name(str(df['source_file'].iloc[0])) if 'source_file' in df.columns else 'Main data'
+        instruments.add(name, df.copy(deep=False))  # Shares the column data; later edits to the main data stay there
+        refresh()
+    
+    def remove():
+        for name in tree.selection():
+            instruments.remove(name)
+        refresh()
+    
+    def use_as_main_data():
+        names = tree.selection()
+        if not names:
+            return
+        update_df_main(instruments[names[0]].df.copy(deep=False))
+        gui_instance.select_listbox_columns([])
+        gui_instance.update_slider_ranges_after_load()
+        writeToLog(f"Main data is now {names[0]} (undo to go back)", gui_instance.log)
+    
+    def overlay():
+        channels = selected_channels()
+        if not channels:
+            return
+        fig.clear()
+        draw_instrument_overlay(fig, instruments, channels)
+        fig.tight_layout()
+        canvas.draw()
+    
+    def aligned_data(channels):
+        grid = grid_var.get()
+        return instruments.align(channels, freq=None if grid == 'Reference times' else grid,
+                                 reference=reference_var.get() or None, tolerance=tolerance_var.get())
+    
+    def compare():
+        channels = selected_channels()
+        if not channels:
+            return
+        try:
+            aligned = aligned_data(channels)
+        except Exception as e:
+            messagebox.showerror("Alignment Error", str(e), parent=window)
+            return
+        lines = []
+        for channel in channels:
+            for r in instruments.compare(aligned, channel, reference_var.get() or None).itertuples():
+                lines.append(f"{channel}: {r.instrument} vs {r.reference}: {r.pairs:,} pairs, "
+                             f"mean diff {r.mean_difference:.3g}, slope {r.slope:.4f}, intercept {r.intercept:.3g}, R² {r.r2:.4f}")
+        result_label.config(text="\n".join(lines) if lines else "Load at least two instruments to compare")
+    
+    def save_aligned():
+        channels = selected_channels()
+        if not channels:
+            return
+        path = filedialog.asksaveasfilename(parent=window, title="Save Aligned Data", defaultextension='.csv',
+                                            filetypes=(("Comma Separated", "*.csv"),))
+        if not path:
+            return
+        try:
+            aligned = aligned_data(channels)
+            aligned.to_csv(path, index=False)
+        except Exception as e:
+            messagebox.showerror("Save Error", str(e), parent=window)
+            return
+        writeToLog(f"Saved {len(aligned):,} aligned rows to {os.path.basename(path)}", gui_instance.log)
+    
+    buttons = tk.Frame(top)
+    buttons.grid(row=0, column=1, rowspan=4, sticky='n', padx=5)
+    for row, (text, command) in enumerate((("Add Files…", add_files), ("Add Loaded Data", add_loaded_data),
+                                           ("Remove", remove), ("Use as Main Data", use_as_main_data))):
+        tk.Button(buttons, text=text, command=command, width=16, bg='light blue').grid(row=row, column=0, pady=1)
+    for row, (text, command) in enumerate((("Overlay", overlay), ("Compare", compare), ("Save Aligned…", save_aligned)), start=3):
+        tk.Button(options, text=text, command=command, width=16, bg='light green').grid(row=row, column=0, columnspan=2, pady=1)
+    
+    result_label.pack(side="top", fill="x", padx=10)
+    canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+    toolbar = NavigationToolbar2Tk(canvas, window, pack_toolbar=False)
+    toolbar.update()
+    toolbar.pack()
+    refresh()
+
+def draw_allan_deviation(fig, results):
+    """
+    Log-log Allan deviation curves, one per channel, with the minimum (best averaging
+    time and noise floor) marked.
+    
+    Parameters:
+    - fig: matplotlib Figure to draw on
+    - results: dict of column name -> allan.AllanResult
+    """
+    ax = fig.add_subplot(1, 1, 1)
+    for column, result in results.items():
+        if not len(result.adev):
+            continue
+        lines = ax.loglog(result.taus, result.adev, marker='.', markersize=3, label=column)
+        tau, adev = result.minimum()
+        ax.plot(tau, adev, 'o', color=lines[0].get_color(), markerfacecolor='none', markersize=9)
+    ax.set_xlabel("Averaging time τ (s)")
+    ax.set_ylabel("Allan deviation (channel units)")
+    ax.grid(True, which='both', alpha=0.3)
+    if results:
+        ax.legend(fontsize=8)
+    ax.set_title("Overlapping Allan deviation")
+
+def allan_deviation_window(parent_window, gui_instance):
+    """
+    Noise analysis of the rows between the I0 sliders (e.g. a long filtered-air
+    period): overlapping Allan deviation of the chosen columns on a log-log plot.
+    
+    Parameters:
+    - parent_window: Tkinter parent window
+    - gui_instance: Reference to the main PAXView instance (sliders, segment filter, listbox)
+    """
+    from allan import allan_deviation_sweep, sample_interval
+    
+    df = constants.data_store.df
+    if df.empty:
+        messagebox.showwarning("No Data", "Please load data files first!")
+        return
+    
+    excluded_columns = ['Alarm', 'time', 'source_file']
+    columns = [col for col in df.columns
+               if col not in excluded_columns and not is_outlier_column(col) and pd.api.types.is_numeric_dtype(df[col])]
+    selected = [gui_instance.listbox.get(i) for i in gui_instance.listbox.curselection()]
+    defaults = [col for col in selected if col in columns] or [col for col in ('Babs (1/Mm)', 'Bscat (1/Mm)') if col in columns]
+    
+    window = tk.Toplevel(parent_window)
+    window.title("Allan Deviation")
+    window.geometry("1000x850")
+    
+    controls = tk.Frame(window)
+    controls.pack(side="top", fill="x", padx=10, pady=5)
+    tk.Label(controls, text="Channels:").grid(row=0, column=0, sticky='nw')
+    channel_list = tk.Listbox(controls, selectmode='multiple', height=6, width=32, exportselection=False)
+    channel_list.grid(row=0, column=1, rowspan=3, sticky='w')
+    for i, column in enumerate(columns):
+        channel_list.insert('end', column)
+        if column in defaults:
+            channel_list.selection_set(i)
+    
+    region_label = tk.Label(controls, text="", justify="left", anchor="w")
+    region_label.grid(row=0, column=2, sticky='w', padx=10)
+    use_workers = tk.BooleanVar(value=False)
+    tk.Checkbutton(controls, text="Use worker processes (many channels)", variable=use_workers).grid(row=1, column=2, sticky='w', padx=10)
+    
+    fig = Figure(figsize=(9, 6), dpi=100)
+    canvas = FigureCanvasTkAgg(fig, master=window)
+    
+    columns_tree = ('channel', 'points', 'tau0', 'best_tau', 'min_adev', 'adev_1s', 'adev_60s')
+    tree = ttk.Treeview(window, columns=columns_tree, show='headings', height=5)
+    for column, heading in zip(columns_tree, ("Channel", "Points", "τ0 (s)", "Best τ (s)", "Min. deviation", "At 1 s", "At 60 s")):
+        tree.heading(column, text=heading)
+        tree.column(column, width=180 if column == 'channel' else 110)
+    
+    def region():
+        low, high = sorted((int(gui_instance.current_valueI0Low.get()), int(gui_instance.current_valueI0High.get())))
+        return low, min(high, len(constants.data_store.df) - 1) + 1
+    
+    def show_region():
+        low, high = region()
+        segment_filter = gui_instance.current_segment_filter()
+        region_label.config(text=f"Rows {low:,} to {high - 1:,} (I0 sliders), {high - low:,} samples"
+                                 + (f", {segment_filter}" if segment_filter else ""))
+    
+    def compute():
+        channels = [channel_list.get(i) for i in channel_list.curselection()]
+        if not channels:
+            messagebox.showwarning("No Channel", "Select one or more channels first.", parent=window)
+            return
+        show_region()
+        df = constants.data_store.df
+        low, high = region()
+        if high - low < 3:
+            messagebox.showwarning("Region Too Short", "Move the I0 sliders apart to select the rows to analyse.", parent=window)
+            return
+        gui_instance.refresh_derived_columns(channels)
+        segment_filter = gui_instance.current_segment_filter()
+        mask = segment_mask(df, segment_filter)
+        epoch_ns = get_time_axis(df)['epoch_ns']
+        tau0 = sample_interval(None if epoch_ns is None else epoch_ns[low:high])
+        
+        # Results are memoized per column version, region and filter; only new ones are computed
+        results, todo = {}, {}
+        for column in channels:
+            key = ('allan', column, constants.data_store.column_version(column), id(df), low, high, segment_filter)
+            cached = analysis_memo.get(key)
+            if cached is not None:
+                results[column] = cached
+                continue
+            values = df[column].to_numpy(dtype=float)[low:high]
+            if mask is not None:
+                values = np.where(mask[low:high], values, np.nan)  # Left out like NaNs
+            todo[column] = (key, values)
+        if todo:
+            window.config(cursor='watch')
+            window.update_idletasks()
+            try:
+                computed = allan_deviation_sweep({column: values for column, (_, values) in todo.items()}, tau0,
+                                                 workers=None if use_workers.get() else 1)
+            finally:
+                window.config(cursor='')
+            for column, result in computed.items():
+                analysis_memo.put(todo[column][0], result)
+                results[column] = result
+        results = {column: results[column] for column in channels}
+        
+        fig.clear()
+        draw_allan_deviation(fig, results)
+        fig.tight_layout()
+        canvas.draw()
+        
+        tree.delete(*tree.get_children())
+        for column, result in results.items():
+            tau, adev = result.minimum()
+            tree.insert('', 'end', values=(column, f"{result.points:,}" + (f" ({result.dropped:,} left out)" if result.dropped else ""),
+                                           f"{result.tau0:g}", f"{tau:g}", f"{adev:.4g}", f"{result.at(1.0):.4g}", f"{result.at(60.0):.4g}"))
+    
+    tk.Button(controls, text="Compute", command=compute, bg='light green', width=16).grid(row=2, column=2, sticky='w', padx=10)
+    
+    canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+    toolbar = NavigationToolbar2Tk(canvas, window, pack_toolbar=False)
+    toolbar.update()
+    toolbar.pack()
+    tree.pack(fill="x", padx=10, pady=(0, 10))
+    show_region()
@@ -0,0 +1,437 @@
+"""Automatic segmentation of PAX runs into steady plateaus and ramps.
+
+Everything here works on numpy arrays with cumulative-sum rolling statistics, so a
+multi-hour run is segmented in a few vectorized passes. The results are row indices
+that the I0 and calibration sliders can jump to.
+"""
+import numpy as np
+
+from calibration_engine import calibration_xy, fit_from_sums
+from pax_config import pax_mode_states, segment_filters, mode_settle_rows
+
+def rolling_stats(values, window):
+    """
+    Centered rolling mean, standard deviation and time slope (per row) of a series.
+    NaNs are skipped; windows are truncated at the edges.
+
+    Parameters:
+    - values: 1-D array
+    - window: Window length in rows
+
+    Returns:
+    - mean, std, slope: Arrays the same length as values
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    valid = np.isfinite(values)
+    t = np.arange(n, dtype=float)
+    # Center on the overall mean to keep the squared sums well conditioned
+    offset = float(values[valid].mean()) if valid.any() else 0.0
+    v = np.where(valid, values - offset, 0.0)
+    w = valid.astype(float)
+
+    def prefix(a):
+        return np.concatenate(([0.0], np.cumsum(a)))
+
+    sum_w, sum_v, sum_vv = prefix(w), prefix(v), prefix(v * v)
+    sum_t, sum_tt, sum_tv = prefix(w * t), prefix(w * t * t), prefix(t * v)
+
+    half = window // 2
+    lo = np.clip(np.arange(n) - half, 0, n)
+    hi = np.clip(np.arange(n) + window - half, 0, n)
+
+    count = sum_w[hi] - sum_w[lo]
+    sv = sum_v[hi] - sum_v[lo]
+    svv = sum_vv[hi] - sum_vv[lo]
+    st = sum_t[hi] - sum_t[lo]
+    stt = sum_tt[hi] - sum_tt[lo]
+    stv = sum_tv[hi] - sum_tv[lo]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = sv / count
+        var = np.maximum(svv / count - mean * mean, 0.0)
+        var_t = stt / count - (st / count) ** 2
+        slope = (stv / count - (st / count) * mean) / var_t
+    mean = mean + offset
+    std = np.sqrt(var)
+    slope = np.where(var_t > 0, slope, 0.0)
+    return mean, std, slope
+
+def find_runs(mask, min_length=1):
+    """
+    Start/stop row pairs of the runs of True in a boolean mask.
+
+    Returns:
+    - runs: List of (start, stop) tuples, stop exclusive (like .iloc[start:stop])
+    """
+    padded = np.concatenate(([False], np.asarray(mask, dtype=bool), [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    starts, stops = edges[0::2], edges[1::2]
+    keep = (stops - starts) >= min_length
+    return list(zip(starts[keep].tolist(), stops[keep].tolist()))
+
+def level_change_points(values, window, threshold=6.0):
+    """
+    Rows where the level of a series jumps, found by comparing the mean of the
+    window before each row with the mean of the window after it.
+
+    Parameters:
+    - values: 1-D array
+    - window: Rows on each side of a candidate change point
+    - threshold: Jump size, in pooled standard errors, that counts as a change
+
+    Returns:
+    - change_points: Sorted array of row indices (at most one per window)
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 2 * window:
+        return np.array([], dtype=int)
+    valid = np.isfinite(values)
+    offset = float(values[valid].mean()) if valid.any() else 0.0
+    v = np.where(valid, values - offset, 0.0)
+    sum_w = np.concatenate(([0.0], np.cumsum(valid)))
+    sum_v = np.concatenate(([0.0], np.cumsum(v)))
+    sum_vv = np.concatenate(([0.0], np.cumsum(v * v)))
+
+    split = np.arange(window, n - window + 1)
+    stats = []
+    for lo, hi in ((split - window, split), (split, split + window)):
+        count = sum_w[hi] - sum_w[lo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (sum_v[hi] - sum_v[lo]) / count
+            var = np.maximum((sum_vv[hi] - sum_vv[lo]) / count - mean * mean, 0.0)
+        stats.append((count, mean, var))
+    (n_a, mean_a, var_a), (n_b, mean_b, var_b) = stats
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stderr = np.sqrt(var_a / n_a + var_b / n_b)
+        score = np.abs(mean_b - mean_a) / stderr
+    score = np.where(np.isfinite(score), score, 0.0)
+
+    # Keep local maxima above the threshold, greedily strongest first, one per window
+    candidates = np.flatnonzero(score >= threshold)
+    chosen = []
+    taken = np.zeros(len(split), dtype=bool)
+    for i in candidates[np.argsort(-score[candidates])]:
+        if taken[i]:
+            continue
+        chosen.append(split[i])
+        taken[max(0, i - window):i + window] = True
+    return np.sort(np.array(chosen, dtype=int))
+
+def segment_signal(values, window=60, steady_tolerance=0.05, zero_level=None, ramp_t=4.0, min_length=None):
+    """
+    Split a signal into 'plateau', 'ramp' and 'noisy' segments.
+
+    A row is on a ramp when the rolling slope is significant (slope over its
+    standard error from the rolling residual scatter), and steady when it is not
+    and the rolling standard deviation is small compared to the level (or to a few
+    noise levels near zero). Runs of the same class are segments; plateaus are
+    further split wherever the level jumps.
+
+    Parameters:
+    - values: 1-D array (e.g. Bscat)
+    - window: Rolling window in rows (60 rows is one minute of 1 Hz data)
+    - steady_tolerance: Allowed rolling std as a fraction of the level
+    - zero_level: Noise scale of the signal (default: noise_level(values))
+    - ramp_t: Slope t-statistic above which a row is on a ramp
+    - min_length: Shortest segment kept, in rows (default: window)
+
+    Returns:
+    - segments: List of dicts with 'start', 'stop', 'kind', 'mean', 'std', 'slope'
+    """
+    values = np.asarray(values, dtype=float)
+    if min_length is None:
+        min_length = window
+    if zero_level is None:
+        zero_level = noise_level(values)
+
+    mean, std, slope = rolling_stats(values, window)
+    # Variance of a straight line over the window is slope² * var(t); what is left is scatter
+    var_t = (window * window - 1) / 12.0
+    residual_std = np.sqrt(np.maximum(std * std - slope * slope * var_t, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope_t = np.abs(slope) / (residual_std / np.sqrt(window * var_t))
+    slope_t = np.where(np.isfinite(slope_t), slope_t, 0.0)
+
+    ramp = slope_t >= ramp_t
+    steady = ~ramp & (std <= np.maximum(steady_tolerance * np.abs(mean), 2 * zero_level))
+    kind_codes = np.where(steady, 0, np.where(ramp, 1, 2))
+    kind_names = ('plateau', 'ramp', 'noisy')
+
+    # Segment boundaries: class changes plus level jumps inside steady stretches
+    boundaries = set((np.flatnonzero(np.diff(kind_codes)) + 1).tolist())
+    jumps = level_change_points(values, window)
+    boundaries.update(jumps[kind_codes[jumps] == 0].tolist())
+    cuts = [0] + sorted(b for b in boundaries if 0 < b < len(values)) + [len(values)]
+
+    segments = []
+    for start, stop in zip(cuts[:-1], cuts[1:]):
+        if stop - start < min_length:
+            continue
+        codes = kind_codes[start:stop]
+        kind = kind_names[int(np.bincount(codes, minlength=3).argmax())]
+        chunk = values[start:stop]
+        chunk = chunk[np.isfinite(chunk)]
+        if chunk.size == 0:
+            continue
+        segments.append({
+            'start': int(start),
+            'stop': int(stop),
+            'kind': kind,
+            'mean': float(chunk.mean()),
+            'std': float(chunk.std()),
+            'slope': float(np.median(slope[start:stop])),
+        })
+    return segments
+
+def noise_level(values):
+    """
+    Robust estimate of the point-to-point noise of a signal (scaled MAD of the
+    first differences), used as the 'near zero' scale.
+    """
+    diffs = np.diff(np.asarray(values, dtype=float))
+    diffs = diffs[np.isfinite(diffs)]
+    if diffs.size == 0:
+        return 1.0
+    mad = np.median(np.abs(diffs - np.median(diffs)))
+    return float(max(1.4826 * mad / np.sqrt(2), 1e-9))
+
+def find_i0_candidates(df, columns=('Bscat (1/Mm)', 'Babs (1/Mm)'), window=60, zero_sigmas=3.0, max_candidates=10):
+    """
+    Rank particle-free (I0) regions: steady plateaus where scattering and
+    absorption sit at the noise floor.
+
+    Parameters:
+    - df: DataFrame with the optical columns
+    - columns: Columns that must all be near zero (missing ones are skipped)
+    - window: Rolling window in rows
+    - zero_sigmas: How many noise levels from zero still counts as particle-free
+    - max_candidates: Number of candidates to return
+
+    Returns:
+    - candidates: List of dicts with 'start', 'stop', 'score', 'mean', 'std', 'kind',
+      best first; 'stop' is clamped to the last row so it can go on a slider
+    """
+    present = [c for c in columns if c in df.columns]
+    if not present:
+        raise KeyError(f"None of the columns {list(columns)} are in the data")
+
+    # Particle-free when every optical signal is quiet near zero
+    quiet = np.ones(len(df), dtype=bool)
+    signals = []
+    for column in present:
+        values = df[column].to_numpy(dtype=float)
+        level = noise_level(values)
+        mean, std, _ = rolling_stats(values, window)
+        quiet &= (np.abs(mean) <= zero_sigmas * level) & (std <= zero_sigmas * level * 2)
+        signals.append((values, level))
+
+    candidates = []
+    for start, stop in find_runs(quiet, min_length=window):
+        values, level = signals[0]
+        chunk = values[start:stop]
+        chunk = chunk[np.isfinite(chunk)]
+        if chunk.size == 0:
+            continue
+        # Long, flat and close to zero ranks highest
+        score = np.log10(stop - start) / (1.0 + abs(chunk.mean()) / level + chunk.std() / level)
+        candidates.append({
+            'start': int(start),
+            'stop': int(min(stop, len(df) - 1)),
+            'kind': 'I0',
+            'score': float(score),
+            'mean': float(chunk.mean()),
+            'std': float(chunk.std()),
+            'column': present[0],
+        })
+    candidates.sort(key=lambda c: c['score'], reverse=True)
+    return candidates[:max_candidates]
+
+def find_calibration_candidates(df, mode='Scattering', ext_column=None, window=60, max_candidates=10):
+    """
+    Rank calibration regions: stretches where Bscat (or Babs) sweeps over a wide
+    range through ramps and steps, and, when an extinction column exists, the
+    calibration Y tracks X linearly.
+
+    Each ramp is a candidate, and so is every run of consecutive above-zero
+    segments between particle-free stretches (a full dilution series).
+
+    Parameters:
+    - df: DataFrame with Bscat/Babs (and optionally the extinction column)
+    - mode: 'Scattering' or 'Absorbing'
+    - ext_column: Extinction column name, or None to rank on X alone
+    - window: Rolling window in rows
+    - max_candidates: Number of candidates to return
+
+    Returns:
+    - candidates: List of dicts with 'start', 'stop', 'score', 'r2', 'x_min', 'x_max',
+      'kind', best first
+    """
+    x_column = 'Bscat (1/Mm)' if mode == 'Scattering' else 'Babs (1/Mm)'
+    if ext_column is not None:
+        x, y, x_column, _ = calibration_xy(df, mode, ext_column)
+    else:
+        x = df[x_column].to_numpy(dtype=float)
+        y = None
+
+    zero_level = noise_level(x)
+    segments = segment_signal(x, window=window, zero_level=zero_level)
+
+    spans = [(s['start'], s['stop'], 'ramp') for s in segments if s['kind'] == 'ramp']
+    active = [s for s in segments if s['mean'] > 3 * zero_level]
+    group = []
+    for segment in active + [None]:
+        if group and (segment is None or segment['start'] > group[-1]['stop'] + window):
+            if len(group) > 1:
+                spans.append((group[0]['start'], group[-1]['stop'], 'series'))
+            group = []
+        if segment is not None:
+            group.append(segment)
+
+    # Prefix sums give the R² of any span in O(1)
+    if y is not None:
+        finite = np.isfinite(x) & np.isfinite(y)
+        x0 = float(x[finite].mean()) if finite.any() else 0.0
+        y0 = float(y[finite].mean()) if finite.any() else 0.0
+        xc = np.where(finite, x - x0, 0.0)
+        yc = np.where(finite, y - y0, 0.0)
+        prefix = [np.concatenate(([0.0], np.cumsum(a))) for a in (finite.astype(float), xc, yc, xc * xc, yc * yc, xc * yc)]
+
+    candidates = []
+    for start, stop, kind in spans:
+        chunk = x[start:stop]
+        chunk = chunk[np.isfinite(chunk)]
+        if chunk.size < 2:
+            continue
+        x_min, x_max = float(chunk.min()), float(chunk.max())
+        r2 = None
+        if y is not None:
+            sums = [p[stop] - p[start] for p in prefix]
+            r2 = float(fit_from_sums(*sums)[2])
+            if not np.isfinite(r2):
+                r2 = 0.0
+        # Wide dynamic range and many points rank high; a poor linear fit pulls it down
+        score = np.log10(1.0 + (x_max - x_min) / zero_level) * np.log10(stop - start)
+        if r2 is not None:
+            score *= r2
+        candidates.append({
+            'start': int(start),
+            'stop': int(min(stop, len(x) - 1)),
+            'kind': kind,
+            'score': float(score),
+            'r2': r2,
+            'x_min': x_min,
+            'x_max': x_max,
+            'column': x_column,
+        })
+    candidates.sort(key=lambda c: c['score'], reverse=True)
+    return candidates[:max_candidates]
+
+class ModeSegments:
+    """
+    Run-length index of the PAX Mode column: (start, stop, state) intervals built
+    with one vectorized pass, so "sampling only" / "zero only" style masks never
+    rescan the column.
+
+    States come from pax_config.pax_mode_states; unknown codes are named "mode <code>"
+    and missing values "unknown".
+    """
+    def __init__(self, mode_values, state_names=None):
+        state_names = dict(pax_mode_states if state_names is None else state_names)
+        try:
+            codes = np.asarray(mode_values, dtype=float)
+        except (TypeError, ValueError):
+            # Text modes (e.g. "Zero"): number the distinct labels and use them as the state names
+            labels, codes = np.unique(np.asarray(mode_values).astype(str), return_inverse=True)
+            codes = codes.astype(float)
+            state_names = {i: label.strip().lower() for i, label in enumerate(labels)}
+        self.length = len(codes)
+
+        # NaN never equals itself, so map it to a sentinel before looking for changes
+        codes = np.where(np.isnan(codes), -1.0, codes)
+        change = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        self.starts = np.concatenate(([0], change)).astype(int) if self.length else np.array([], dtype=int)
+        self.stops = np.concatenate((change, [self.length])).astype(int) if self.length else np.array([], dtype=int)
+        run_codes = codes[self.starts] if self.length else np.array([])
+
+        def state_name(code):
+            if code == -1:
+                return 'unknown'
+            code = int(code) if float(code).is_integer() else code
+            return state_names.get(code, f"mode {code}")
+
+        self.states = np.array([state_name(code) for code in run_codes], dtype=object)
+        unmapped = sorted({state for state in self.states if state.startswith('mode ')})
+        if unmapped:
+            print(f"⚠️ Mode codes not in pax_config.pax_mode_states: {', '.join(unmapped)}; they are left out of the segment filters")
+        self._masks = {}
+
+    @classmethod
+    def from_df(cls, df, column='Mode'):
+        """Build the index from a DataFrame column (KeyError if it is missing)."""
+        return cls(df[column].to_numpy())
+
+    def __len__(self):
+        return len(self.starts)
+
+    def intervals(self, *states):
+        """
+        Runs of the given states (all runs if none are given).
+
+        Returns:
+        - intervals: List of (start, stop, state) tuples, stop exclusive
+        """
+        keep = np.isin(self.states, states) if states else np.ones(len(self.states), dtype=bool)
+        return list(zip(self.starts[keep].tolist(), self.stops[keep].tolist(), self.states[keep].tolist()))
+
+    def mask(self, *states, trim=0):
+        """
+        Boolean row mask of the given states, expanded from the intervals.
+
+        Parameters:
+        - states: State names to keep
+        - trim: Rows dropped at the start of every run (settling after a mode change)
+
+        Returns:
+        - mask: Boolean array, one entry per row (cached; do not modify)
+        """
+        key = (tuple(sorted(states)), trim)
+        cached = self._masks.get(key)
+        if cached is not None:
+            return cached
+
+        keep = np.isin(self.states, states)
+        mask = np.repeat(keep, self.stops - self.starts)
+        if trim > 0:
+            # Clear the first `trim` rows of each kept run
+            offsets = np.arange(self.length) - np.repeat(self.starts, self.stops - self.starts)
+            mask &= offsets >= trim
+        self._masks[key] = mask
+        return mask
+
+    def mask_for(self, segment_filter, trim=None):
+        """
+        Row mask for a segment filter: a key of pax_config.segment_filters, a state
+        name or a tuple of state names. None (or "All data") means every row.
+
+        Returns:
+        - mask: Boolean array, or None when nothing is filtered out
+        """
+        if segment_filter is None:
+            return None
+        if isinstance(segment_filter, str):
+            states = segment_filters.get(segment_filter, (segment_filter,))
+        else:
+            states = tuple(segment_filter)
+        if states is None:
+            return None
+        return self.mask(*states, trim=mode_settle_rows if trim is None else trim)
+
+    def periods(self, *states, trim=None, min_length=1):
+        """
+        (start, stop) row ranges of the given states with the settling rows trimmed,
+        e.g. periods('zero') for the I0 baseline.
+        """
+        trim = mode_settle_rows if trim is None else trim
+        return [(start + trim, stop) for start, stop, _ in self.intervals(*states) if stop - start - trim >= min_length]
@@ -0,0 +1,241 @@
+"""Save and reopen a whole working session in one binary file.
+
+A .paxsession file holds the dataset column by column plus a JSON header with the
+GUI state (slider positions, calibration settings, selected columns, notes) and the
+derived column parameters. Numeric and time columns are stored as raw arrays at
+aligned offsets and memory-mapped on open, so reopening does not parse anything and
+only the pages that are actually read come off the disk. Text columns (Alarm,
+source_file) are stored as integer codes plus their distinct values. Nullable
+columns (boolean, Int64, ...) are stored as float with NaN for missing values and
+cast back to their dtype on open.
+
+A session can be saved over the file it was opened from: release_session() first
+loads the columns still mapped from that file into memory (Windows refuses to
+replace a file that is mapped).
+
+Layout:
+    b'PAXSESS1', header length (uint64, little endian), JSON header,
+    then every column buffer, each starting at a multiple of 64 bytes
+
+Example:
+    save_session('week5.paxsession', constants.data_store.df, {'notes': 'Cal after cleaning'})
+    df, state = load_session('week5.paxsession')
+"""
+import gc
+import json
+import os
+import struct
+import weakref
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+session_extension = '.paxsession'
+session_magic = b'PAXSESS1'
+session_format_version = 1
+_alignment = 64
+
+#Session file (normalized path) -> weak references to the arrays memory-mapped from it
+_session_maps = {}
+
+def _column_buffer(series):
+    """
+    Convert one column to a raw array and the header entry needed to rebuild it.
+
+    Returns:
+    - values: 1-D numpy array with a fixed-size dtype
+    - entry: dict with the column's kind, (for text) its distinct values and (for
+      nullable columns) the pandas dtype to cast back to
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        values = series.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+        return values, {'kind': 'datetime', 'tz': str(dtype.tz)}
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return np.ascontiguousarray(series.to_numpy()), {'kind': 'array'}
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        # Nullable booleans/integers keep their missing values by going through float
+        return series.to_numpy(dtype=float, na_value=np.nan), {'kind': 'array', 'pandas_dtype': str(dtype)}
+    codes, categories = pd.factorize(series, use_na_sentinel=True)
+    return codes.astype(np.int32), {'kind': 'text', 'categories': [str(value) for value in categories]}
+
+def save_session(path, df, state=None):
+    """
+    Write the dataset and session state to a .paxsession file.
+
+    The file is written next to the target and renamed into place, so a failed save
+    never leaves a half-written session behind.
+
+    Parameters:
+    - path: Target file
+    - df: Dataset to store
+    - state: JSON-serializable dict of GUI/analysis state (sliders, selection, notes, ...)
+
+    Returns:
+    - Size of the file in bytes
+    """
+    columns, buffers = [], []
+    offset = 0
+    for name in df.columns:
+        values, entry = _column_buffer(df[name])
+        entry.update({'name': str(name), 'dtype': values.dtype.str, 'offset': offset})
+        columns.append(entry)
+        buffers.append(values)
+        offset += -(-values.nbytes // _alignment) * _alignment
+
+    index = None
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        values, entry = _column_buffer(df.index.to_series())
+        entry.update({'name': df.index.name, 'dtype': values.dtype.str, 'offset': offset})
+        index = entry
+        buffers.append(values)
+
+    header = {
+        'format_version': session_format_version,
+        'saved': datetime.now().isoformat(timespec='seconds'),
+        'rows': len(df),
+        'columns': columns,
+        'index': index,
+        'state': state or {},
+    }
+    header_bytes = json.dumps(header, default=_json_default).encode('utf-8')
+    data_start = _data_start(len(header_bytes))
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(session_magic)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for values in buffers:
+            f.write(b'\0' * (data_start + _aligned_offset(f.tell() - data_start) - f.tell()))
+            f.write(values.tobytes())
+    try:
+        os.replace(temp_path, path)
+    except PermissionError:
+        os.remove(temp_path)
+        raise PermissionError(f"{os.path.basename(path)} is still open (memory-mapped); "
+                              f"close the windows showing its data and save again") from None
+    size = os.path.getsize(path)
+    print(f"💾 Saved session: {len(df):,} rows x {len(columns)} columns -> {path} ({size / 1e6:.1f} MB)")
+    return size
+
+def read_session_header(path):
+    """
+    Read only the JSON header of a session (state, columns, row count).
+
+    Returns:
+    - header: dict
+    - data_start: File offset of the first column buffer
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(session_magic)) != session_magic:
+            raise ValueError(f"{os.path.basename(path)} is not a PAX session file")
+        (header_length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    if header.get('format_version', 0) > session_format_version:
+        raise ValueError(f"{os.path.basename(path)} was saved by a newer version of the program")
+    return header, _data_start(header_length)
+
+def load_session(path):
+    """
+    Open a .paxsession file. Numeric and time columns are memory-mapped copy-on-write:
+    nothing is read until it is used, and edits stay in memory (the file is not changed).
+
+    Returns:
+    - df: The stored dataset
+    - state: The stored session state dict
+    """
+    header, data_start = read_session_header(path)
+    rows = header['rows']
+
+    def column(entry):
+        dtype = np.dtype(entry['dtype'])
+        if rows == 0:
+            values = np.empty(0, dtype=dtype)
+        else:
+            values = np.memmap(path, dtype=dtype, mode='c', offset=data_start + entry['offset'], shape=(rows,))
+            maps.append(weakref.ref(values))
+        if entry['kind'] == 'text':
+            categories = np.array(entry['categories'] + [np.nan], dtype=object)
+            return categories[values]  # Code -1 (missing) picks the trailing NaN
+        if entry['kind'] == 'datetime':
+            return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(entry['tz'])
+        if 'pandas_dtype' in entry:
+            return pd.array(values).astype(entry['pandas_dtype'])  # In memory, not mapped
+        return values
+
+    maps = _session_maps.setdefault(_session_key(path), [])
+    data = {entry['name']: column(entry) for entry in header['columns']}
+    index = None
+    if header.get('index') is not None:
+        index = pd.Index(column(header['index']), name=header['index']['name'])
+    df = pd.DataFrame(data, index=index, columns=[entry['name'] for entry in header['columns']], copy=False)
+    print(f"📂 Opened session saved {header.get('saved', '?')}: {rows:,} rows x {len(header['columns'])} columns")
+    return df, header.get('state', {})
+
+def session_is_mapped(path):
+    """True while any array memory-mapped from the session file at path is still in use."""
+    return bool(_live_maps(path))
+
+def unmapped_copy(values, path):
+    """
+    In-memory copy of a Series or Index whose values are memory-mapped from the
+    session file at path.
+
+    Returns:
+    - The copy, or None if the values do not come from that file
+    """
+    maps = _live_maps(path)
+    if not maps:
+        return None
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        array = values.array.asi8
+    else:
+        array = values.to_numpy()
+    if not any(np.may_share_memory(array, mapped) for mapped in maps):
+        return None
+    return values.copy(deep=True)
+
+def release_session(path, store):
+    """
+    Load every column a DataStore (its data and undo history) still maps from the
+    session file at path into memory, so the file can be saved over.
+
+    Parameters:
+    - path: Session file
+    - store: DataStore holding the opened session
+
+    Returns:
+    - True if the file is no longer mapped (other holders, e.g. plotted lines, may keep it open)
+    """
+    if session_is_mapped(path):
+        count = store.replace_column_data(lambda values: unmapped_copy(values, path))
+        gc.collect()
+        print(f"📥 Loaded {count} mapped column(s) of {os.path.basename(path)} into memory")
+    return not session_is_mapped(path)
+
+def _session_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def _live_maps(path):
+    key = _session_key(path)
+    maps = [ref() for ref in _session_maps.get(key, [])]
+    maps = [mapped for mapped in maps if mapped is not None]
+    if maps:
+        _session_maps[key] = [weakref.ref(mapped) for mapped in maps]
+    else:
+        _session_maps.pop(key, None)
+    return maps
+
+def _data_start(header_length):
+    return _aligned_offset(len(session_magic) + 8 + header_length)
+
+def _aligned_offset(offset):
+    return -(-offset // _alignment) * _alignment
+
+def _json_default(value):
+    # numpy scalars from slider/calibration values
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
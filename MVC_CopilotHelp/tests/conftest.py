@@ -0,0 +1,34 @@
+"""Shared fixtures: the program's modules are flat files next to this folder."""
+import os
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_pax_frame(rows=3000, start='2025-01-31', seed=0):
+    """Small PAX-like dataset: 1 s samples, a filtered-air start, then a Bscat/Babs ramp."""
+    rng = np.random.default_rng(seed)
+    ramp = np.where(np.arange(rows) < rows // 10, 0.0, np.linspace(0, 200, rows))
+    bscat = ramp + rng.normal(0, 0.5, rows)
+    babs = 0.3 * ramp + rng.normal(0, 0.5, rows)
+    laser = 0.05 * np.exp(-(bscat + babs) * 1e-6 * 0.354) * (1 + rng.normal(0, 1e-5, rows))
+    mode = np.where(np.arange(rows) % 1000 < 100, 'Zero', 'Sampling')
+    return pd.DataFrame({
+        'time': pd.date_range(start, periods=rows, freq='s'),
+        'Bscat (1/Mm)': bscat,
+        'Babs (1/Mm)': babs,
+        'Laser power (W)': laser,
+        'Detected Laser power (W)': laser,
+        'Mode': mode,
+        'Alarm': np.where(np.arange(rows) % 500 == 0, 'Laser power low', ''),
+    })
+
+@pytest.fixture
+def pax_frame():
+    return make_pax_frame()
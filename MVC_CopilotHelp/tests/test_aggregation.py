@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import TimeAggregator, aggregation_stats
+from conftest import make_pax_frame
+from data_store import DataStore
+
+columns = ['Bscat (1/Mm)', 'Babs (1/Mm)']
+
+def resampled(df, rule):
+    """Reference statistics straight from pandas."""
+    grouped = df.set_index('time')[columns].resample(rule)
+    result = pd.concat({column: grouped[column].agg(list(aggregation_stats)) for column in columns}, axis=1)
+    return result[result[columns[0], 'count'] > 0]
+
+@pytest.mark.parametrize('rule', ['1min', '1h'])
+def test_append_updates_buckets_like_a_full_resample(rule):
+    store = DataStore()
+    store.replace(make_pax_frame(rows=3000, start='2025-01-31 00:00:30'))
+    aggregator = TimeAggregator(store)
+    aggregator.aggregate(columns, rule)
+
+    # The appended rows continue the last partial bucket
+    store.append(make_pax_frame(rows=2000, start='2025-01-31 00:50:30', seed=1))
+    updated = aggregator.aggregate(columns, rule)
+    expected = resampled(store.df, rule)
+
+    np.testing.assert_array_equal(updated.index.to_numpy(), expected.index.to_numpy().astype('datetime64[ns]'))
+    np.testing.assert_allclose(updated.to_numpy(dtype=float), expected[updated.columns].to_numpy(dtype=float))
+
+    rebuilt = TimeAggregator(store).aggregate(columns, rule)
+    pd.testing.assert_frame_equal(updated, rebuilt)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import controller
+from alarms import AlarmIntervalIndex, AlarmTimeline, any_channel
+from pax_config import alarm_names
+from pax_model import append_rows, get_alarm_index
+
+def alarm_text(red=(), yellow=()):
+    """Alarm string with the given channel indices red/yellow and every other channel green."""
+    chars = ['g'] * len(alarm_names)
+    for k in red:
+        chars[k] = 'r'
+    for k in yellow:
+        chars[k] = 'y'
+    return ''.join(chars)
+
+def alarm_day(day, red_rows, rows=600):
+    """One file of 1 s rows starting at midnight, channel 0 red on the given row range."""
+    alarm = np.full(rows, alarm_text(), dtype=object)
+    alarm[red_rows[0]:red_rows[1]] = alarm_text(red=[0])
+    return pd.DataFrame({'time': pd.date_range(day, periods=rows, freq='s'), 'Alarm': alarm})
+
+def test_timeline_matches_alarm_translate(monkeypatch):
+    rng = np.random.default_rng(0)
+    texts = [''.join(rng.choice(['g', 'y', 'r'], size=len(alarm_names), p=[0.8, 0.1, 0.1])) for _ in range(20)]
+    texts += ['', 'r', 'gy', alarm_text(red=[len(alarm_names) - 1])]  # Short strings: the missing channels are green
+    values = [texts[i] for i in rng.integers(0, len(texts), 200)] + [None]
+    timeline = AlarmTimeline(values)
+
+    logged = []
+    monkeypatch.setattr(controller, 'writeToLog', lambda msg, log: logged.append(msg))
+    for row, text in enumerate(values):
+        logged.clear()
+        controller.alarm_translate(text or '', alarm_names, None)
+        expected = sorted((line.rsplit(' ', 1)[0].strip(), line.rsplit(' ', 1)[1].lower()) for line in logged)
+        # By position: several channels share the name 'Reserved'
+        decoded = sorted((name, color) for color in ('red', 'yellow') for k, name in enumerate(alarm_names)
+                         if timeline.channel_flags(k, color)[row])
+        assert decoded == expected, text
+
+def test_channels_sharing_a_name_are_merged():
+    reserved = [k for k, name in enumerate(alarm_names) if name == 'Reserved']
+    timeline = AlarmTimeline([alarm_text(red=[reserved[1]]), alarm_text(red=[reserved[0]]), alarm_text()])
+    assert timeline.channels_in_alarm('red') == ['Reserved']
+    assert timeline.channel_flags('Reserved', 'red').tolist() == [True, True, False]
+
+def ns(t):
+    return pd.Timestamp(t).value
+
+def test_lookups_across_episodes():
+    df = alarm_day('2025-01-01', (100, 160))
+    df.loc[300:329, 'Alarm'] = alarm_text(red=[0], yellow=[2])
+    index = AlarmIntervalIndex.from_df(df)
+    channel = alarm_names[0]
+
+    assert index.first_after(channel, 'red', '2025-01-01') == (ns('2025-01-01 00:01:40'), ns('2025-01-01 00:02:40'))
+    assert index.first_after(channel, 'red', '2025-01-01 00:01:41')[0] == ns('2025-01-01 00:05:00')
+    assert index.first_after(channel, 'red', '2025-01-01 00:05:01') is None
+    assert index.active_at(alarm_names[2], 'yellow', '2025-01-01 00:05:10')
+
+    # 60 s + 30 s in total; a window cutting both episodes counts only the part inside
+    assert index.total_duration(channel, 'red') == 90 * 10**9
+    assert index.total_duration(channel, 'red', '2025-01-01 00:02:00', '2025-01-01 00:05:10') == (40 + 10) * 10**9
+    assert index.row_intervals(any_channel, 'red')[0].tolist() == [100, 300]
+
+def test_daily_totals_split_at_midnight():
+    df = alarm_day('2025-01-01 23:50', (0, 1200), rows=1200)
+    totals = AlarmIntervalIndex.from_df(df).daily_totals('red')
+    assert totals[alarm_names[0]].tolist() == pytest.approx([10 / 60, 10 / 60])
+    assert [str(day) for day in totals.index] == ['2025-01-01', '2025-01-02']
+
+def test_extend_continues_an_episode_over_the_file_boundary():
+    first, second = alarm_day('2025-01-01', (500, 600)), alarm_day('2025-01-01 00:10', (0, 50))
+    index = AlarmIntervalIndex.from_df(first)
+    index.extend(second['Alarm'].to_numpy(), second['time'].to_numpy().astype('datetime64[ns]').view('int64'))
+
+    starts, ends = index.intervals(alarm_names[0], 'red')
+    assert starts.tolist() == [ns('2025-01-01 00:08:20')] and ends.tolist() == [ns('2025-01-01 00:10:50')]
+    assert index.row_intervals(alarm_names[0], 'red')[1].tolist() == [650]
+    rebuilt = AlarmIntervalIndex.from_df(pd.concat([first, second], ignore_index=True))
+    assert rebuilt.intervals(alarm_names[0], 'red')[1].tolist() == ends.tolist()
+
+def test_appending_an_earlier_day_rebuilds_the_index():
+    today, yesterday = alarm_day('2025-01-02', (100, 200)), alarm_day('2025-01-01', (300, 360))
+    index = get_alarm_index(today)
+    assert not index.can_extend(yesterday['time'].to_numpy().astype('datetime64[ns]').view('int64'))
+    with pytest.raises(ValueError):
+        index.extend(yesterday['Alarm'].to_numpy(), yesterday['time'].to_numpy().astype('datetime64[ns]').view('int64'))
+
+    combined = append_rows(today, yesterday)
+    index = get_alarm_index(combined)
+    assert index.first_after(alarm_names[0], 'red', '2025-01-01')[0] == ns('2025-01-01 00:05:00')
+    totals = index.daily_totals('red')
+    assert totals[alarm_names[0]].tolist() == pytest.approx([60 / 3600, 100 / 3600])
+
+def test_unsorted_frame_is_indexed_in_time_order():
+    df = pd.concat([alarm_day('2025-01-02', (100, 200)), alarm_day('2025-01-01', (300, 360))], ignore_index=True)
+    index = AlarmIntervalIndex.from_df(df)
+    starts, _ = index.intervals(alarm_names[0], 'red')
+    assert starts.tolist() == [ns('2025-01-01 00:05:00'), ns('2025-01-02 00:01:40')]
+    # Row ranges still point at the rows of each episode in the frame
+    assert index.row_intervals(alarm_names[0], 'red')[0].tolist() == [900, 100]
+    assert index.row_intervals(alarm_names[0], 'red')[1].tolist() == [960, 200]
+    assert len(index.daily_totals('red')) == 2
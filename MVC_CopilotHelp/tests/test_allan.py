@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from allan import allan_deviation_sweep, averaging_factors, overlapping_allan_deviation
+
+def naive_allan_deviation(values, m):
+    """Textbook overlapping Allan deviation: average every pair of neighbouring m-sample windows."""
+    squares = []
+    for i in range(len(values) - 2 * m + 1):
+        first = values[i:i + m].mean()
+        second = values[i + m:i + 2 * m].mean()
+        squares.append((second - first) ** 2)
+    return np.sqrt(np.mean(squares) / 2), len(squares)
+
+def test_matches_the_naive_loop():
+    rng = np.random.default_rng(0)
+    # White noise on a random walk on a large offset, so the running sum has to stay precise
+    values = 1e4 + rng.normal(0, 1, 2000) + np.cumsum(rng.normal(0, 0.05, 2000))
+    result = overlapping_allan_deviation(values, tau0=2.0, factors=[1, 2, 7, 50, 333, 1000, 1001])
+    assert result.taus.tolist() == [2.0, 4.0, 14.0, 100.0, 666.0, 2000.0]  # m = 1001 has no pair left
+    for m, adev, count in zip([1, 2, 7, 50, 333, 1000], result.adev, result.counts):
+        expected, expected_count = naive_allan_deviation(values, m)
+        assert adev == pytest.approx(expected, rel=1e-9) and count == expected_count
+
+def test_nans_are_dropped_and_counted():
+    rng = np.random.default_rng(1)
+    values = rng.normal(0, 1, 500)
+    with_gaps = values.copy()
+    with_gaps[::50] = np.nan
+    result = overlapping_allan_deviation(with_gaps, factors=[1, 5, 20])
+    assert result.dropped == 10 and result.points == 490
+    for m, adev in zip([1, 5, 20], result.adev):
+        assert adev == pytest.approx(naive_allan_deviation(values[np.isfinite(with_gaps)], m)[0], rel=1e-9)
+
+def test_white_noise_averages_down_and_short_inputs_are_empty():
+    values = np.random.default_rng(2).normal(0, 1, 20000)
+    result = overlapping_allan_deviation(values)
+    assert result.taus[0] == 1.0 and result.adev[0] == pytest.approx(1.0, rel=0.05)
+    assert result.at(100.0) == pytest.approx(0.1, rel=0.3)
+    assert len(averaging_factors(2)) == 0 and len(overlapping_allan_deviation([1.0, 2.0]).adev) == 0
+    assert np.isnan(overlapping_allan_deviation([]).minimum()[0])
+
+def test_sweep_returns_every_channel_in_order():
+    rng = np.random.default_rng(3)
+    channels = {'Babs (1/Mm)': rng.normal(0, 1, 300), 'Bscat (1/Mm)': rng.normal(0, 2, 300)}
+    results = allan_deviation_sweep(channels, tau0=1.0)
+    assert list(results) == list(channels)
+    np.testing.assert_allclose(results['Bscat (1/Mm)'].adev, overlapping_allan_deviation(channels['Bscat (1/Mm)']).adev)
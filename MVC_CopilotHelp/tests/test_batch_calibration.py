@@ -0,0 +1,23 @@
+from batch_calibration import calibrate_job
+from conftest import make_pax_frame
+
+def job_for(path, **settings):
+    job = {'file': str(path), 'mode': 'Scattering', 'i0_low': 0, 'i0_high': 200, 'calib_low': 500, 'calib_high': 2900,
+           'min': 0.0, 'max': 300.0, 'percent': 50.0, 'segment_filter': None}
+    job.update(settings)
+    return job
+
+def test_fitted_job_reports_the_extinction_it_built(tmp_path):
+    path = tmp_path / 'PAX-9_20250131.csv'
+    make_pax_frame().to_csv(path, index=False)
+    result = calibrate_job(job_for(path))
+    assert result['status'] in ('ok', 'warning') and result['error'] is None
+    assert result['serial'] == 'PAX-9' and result['extinction_column'] == 'Extinction_Coefficient'
+
+def test_failed_fit_keeps_issues_and_recommendations(tmp_path):
+    path = tmp_path / 'PAX-9_20250131.csv'
+    make_pax_frame().to_csv(path, index=False)
+    result = calibrate_job(job_for(path, min=1000.0, max=2000.0))
+    assert result['status'] == 'failed'
+    assert 'range filter' in result['error']
+    assert result['issues'] and result['recommendations']
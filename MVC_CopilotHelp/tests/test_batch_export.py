@@ -0,0 +1,17 @@
+import datetime
+import os
+
+from batch_export import find_files
+
+def touch(directory, name):
+    path = os.path.join(directory, name)
+    open(path, 'w').close()
+    return path
+
+def test_directory_scans_only_take_pax_data_files(tmp_path):
+    data = [touch(tmp_path, 'PAX-123_20250130.csv'), touch(tmp_path, 'PAX-123_20250131.xlsx')]
+    manifest = touch(tmp_path, 'manifest.csv')
+    touch(tmp_path, 'calibration_results.csv')
+    assert find_files([str(tmp_path)]) == sorted(data)
+    assert find_files([str(tmp_path)], since=datetime.date(2025, 1, 31)) == [data[1]]
+    assert find_files([manifest]) == [manifest]  # Named explicitly
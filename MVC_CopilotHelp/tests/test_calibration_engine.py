@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from calibration_engine import IncrementalCalibration
+from conftest import make_pax_frame
+from outliers import hampel_outliers, outlier_column_name
+from pax_model import enhanced_calibration_analysis
+
+def calibration_frame():
+    df = make_pax_frame(rows=4000)
+    rng = np.random.default_rng(3)
+    df['Extinction_Coefficient'] = 1.05 * (df['Bscat (1/Mm)'] + df['Babs (1/Mm)']) + rng.normal(0, 1, len(df))
+    spikes = rng.choice(np.arange(500, 4000), 40, replace=False)
+    df.loc[spikes, 'Bscat (1/Mm)'] += 80  # Isolated spikes for the percent and Hampel filters
+    return df
+
+@pytest.mark.parametrize('mode', ['Scattering', 'Absorbing'])
+@pytest.mark.parametrize('start, stop, percent', [(500, 3900, 5.0), (1200, 2600, 2.0), (400, 3999, 50.0)])
+def test_fit_matches_enhanced_calibration_analysis(mode, start, stop, percent):
+    df = calibration_frame()
+    engine = IncrementalCalibration(df, mode)
+    engine.set_filters(5, 180, percent)
+    fit = engine.fit(start, stop)
+
+    filtered, _ = enhanced_calibration_analysis(df, start, stop, 5, 180, percent, mode)
+    reference = stats.linregress(filtered['x'], filtered['y'])
+    assert fit['count'] == filtered['count']
+    assert fit['slope'] == pytest.approx(reference.slope, rel=1e-9)
+    assert fit['intercept'] == pytest.approx(reference.intercept, rel=1e-7, abs=1e-9)
+    assert fit['r2'] == pytest.approx(reference.rvalue ** 2, rel=1e-9)
+
+def test_fit_with_spike_mask_matches_outlier_column():
+    df = calibration_frame()
+    column = outlier_column_name('Bscat (1/Mm)')
+    df[column] = hampel_outliers(df['Bscat (1/Mm)'].to_numpy(), window=21)
+    assert df[column].sum() >= 30
+
+    engine = IncrementalCalibration(df, 'Scattering', outlier_mask=df[column].to_numpy())
+    engine.set_filters(5, 180, 5.0)
+    fit = engine.fit(500, 3900)
+
+    filtered, _ = enhanced_calibration_analysis(df, 500, 3900, 5, 180, 5.0, 'Scattering', outlier_column=column)
+    reference = stats.linregress(filtered['x'], filtered['y'])
+    assert fit['count'] == filtered['count']
+    assert fit['slope'] == pytest.approx(reference.slope, rel=1e-9)
+    assert fit['r2'] == pytest.approx(reference.rvalue ** 2, rel=1e-9)
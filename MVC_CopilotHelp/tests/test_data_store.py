@@ -0,0 +1,67 @@
+import pandas as pd
+
+from conftest import make_pax_frame
+from data_store import DataStore
+
+def test_undo_and_redo_of_replace_append_and_clear():
+    first, second, extra = make_pax_frame(rows=300), make_pax_frame(rows=200, seed=1), make_pax_frame(rows=100, start='2025-02-01')
+    changes = []
+    store = DataStore()
+    store.subscribe(changes.append)
+
+    store.replace(first)
+    store.replace(second, label="Load second file")
+    store.append(extra)
+    store.clear()
+    assert store.empty and store.undo_label == "Clear data"
+
+    assert store.undo().kind == 'replace' and len(store.df) == 300
+    assert store.undo_label == "Append 100 rows"
+    store.undo()
+    pd.testing.assert_frame_equal(store.df, second)
+    store.undo()
+    pd.testing.assert_frame_equal(store.df, first)
+    store.undo()
+    assert store.empty and store.undo() is None and store.undo_label is None
+
+    assert store.redo_label == "Load data"
+    for expected in (first, second):
+        store.redo()
+        pd.testing.assert_frame_equal(store.df, expected)
+    store.redo()
+    pd.testing.assert_frame_equal(store.df, pd.concat([second, extra], ignore_index=True))
+    store.redo()
+    assert store.empty and store.redo() is None
+    assert all(change.restored for change in changes[4:]) and all(change.rows_changed for change in changes)
+
+def test_new_mutation_after_undo_drops_the_redo_steps():
+    store = DataStore()
+    store.replace(make_pax_frame(rows=100))
+    store.append(make_pax_frame(rows=50, start='2025-02-01'))
+    store.undo()
+    store.clear()
+    assert store.redo_label is None and store.undo_label == "Clear data"
+    store.undo()
+    assert len(store.df) == 100
+
+def test_undo_of_a_column_update_keeps_the_rows():
+    store = DataStore(make_pax_frame(rows=100))
+    store.replace(store.df)
+    rows_version = store.rows_version
+    edited = store.df.copy()
+    edited['Bscat (1/Mm)'] = 0.0
+    store.update_columns(['Bscat (1/Mm)'], edited)
+    change = store.undo()
+    assert change.kind == 'columns' and change.columns == {'Bscat (1/Mm)'}
+    assert store.rows_version == rows_version and (store.df['Bscat (1/Mm)'] != 0).any()
+    store.redo()
+    assert (store.df['Bscat (1/Mm)'] == 0).all()
+
+def test_history_is_trimmed_to_the_step_limit():
+    store = DataStore(undo_max_steps=3)
+    for rows in range(10, 70, 10):
+        store.replace(make_pax_frame(rows=rows))
+    undone = 0
+    while store.undo() is not None:
+        undone += 1
+    assert undone == 3 and len(store.df) == 30
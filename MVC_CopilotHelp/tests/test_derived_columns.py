@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from conftest import make_pax_frame
+from data_store import DataStore
+from derived_columns import DerivedColumnRegistry, register_outlier_column, register_pax_columns
+from outliers import is_outlier_column
+
+@pytest.mark.parametrize('spelling', ['Detected Laser power (W)', 'Detected Laser Power (W)',
+                                      'Laser Power (W)', 'Laser power (W)'])
+def test_extinction_from_every_laser_power_spelling(spelling):
+    df = make_pax_frame().drop(columns=['Laser power (W)', 'Detected Laser power (W)'])
+    df[spelling] = make_pax_frame()['Laser power (W)']
+    registry = DerivedColumnRegistry(DataStore(df))
+    register_pax_columns(registry)
+    registry.set_params(i0_low=0, i0_high=200)
+    info = registry.materialize('Extinction_Coefficient')
+    assert info['i0_mean'] == pytest.approx(df[spelling].iloc[:200].mean())
+    assert np.isfinite(registry.store.df['Extinction_Coefficient']).all()
+
+def test_laser_power_alias_follows_appended_rows():
+    store = DataStore(make_pax_frame(rows=3000).drop(columns=['Detected Laser power (W)']))
+    registry = DerivedColumnRegistry(store)
+    register_pax_columns(registry)
+    registry.materialize('Detected Laser power (W)')
+    store.append(make_pax_frame(rows=500, start='2025-02-01').drop(columns=['Detected Laser power (W)']))
+    registry.refresh(['Detected Laser power (W)'])
+    assert np.isfinite(store.df['Detected Laser power (W)']).all()
+
+def test_slider_refreshes_keep_user_actions_undoable():
+    store = DataStore(undo_max_steps=3)
+    store.replace(make_pax_frame())
+    registry = DerivedColumnRegistry(store)
+    register_pax_columns(registry)
+    registry.set_params(i0_low=0, i0_high=200)
+    registry.materialize('Extinction_Coefficient', record=True)
+    assert store.undo_label == "Recalculate Extinction_Coefficient"
+    for high in range(210, 400, 10):
+        registry.set_params(i0_high=high)
+        registry.refresh(['Extinction_Coefficient'])
+    assert store.undo_label == "Recalculate Extinction_Coefficient"
+    assert registry.info('Extinction_Coefficient')['i0_mean'] == pytest.approx(
+        store.df['Laser power (W)'].iloc[:390].mean())
+    store.undo()
+    assert 'Extinction_Coefficient' not in store.df.columns
+    assert store.undo_label == "Load data"
+
+def test_spike_masks_are_not_undo_steps():
+    store = DataStore()
+    store.replace(make_pax_frame())
+    registry = DerivedColumnRegistry(store)
+    name = register_outlier_column(registry, 'Bscat (1/Mm)')
+    for window in (5, 11, 21):
+        registry.set_params(spike_window=window)
+        registry.materialize(name, overwrite=True)
+    assert is_outlier_column(name) and not is_outlier_column('Bscat (1/Mm)')
+    assert store.df[name].dtype == bool
+    assert store.undo_label == "Load data"
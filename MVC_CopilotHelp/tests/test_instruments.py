@@ -0,0 +1,28 @@
+import numpy as np
+
+from conftest import make_pax_frame
+from instruments import InstrumentSet
+from pax_model import build_time_axis
+
+def test_time_axes_are_kept_per_instrument():
+    instruments = InstrumentSet()
+    for number in range(6):
+        instruments.add(f"PAX-{number}", make_pax_frame(rows=3000, start=f"2025-01-{number + 1:02d}", seed=number))
+    first = {name: instruments.time_axis(name) for name in instruments.names}
+    for name in instruments.names:
+        assert instruments.time_axis(name) is first[name]
+        np.testing.assert_array_equal(first[name]['num'], build_time_axis(instruments[name].df)['num'])
+
+def test_remove_and_add_again_uses_the_new_data():
+    instruments = InstrumentSet()
+    instruments.add('PAX-1', make_pax_frame(start='2025-01-01'))
+    instruments.add('REF', make_pax_frame(start='2025-01-01', seed=1))
+    before = instruments.align(['Bscat (1/Mm)'], freq='1min')
+    instruments.time_axis('PAX-1')
+
+    instruments.remove('PAX-1')
+    replacement = make_pax_frame(start='2025-01-01', seed=7)
+    instruments.add('PAX-1', replacement)
+    after = instruments.align(['Bscat (1/Mm)'], freq='1min')
+    np.testing.assert_array_equal(instruments.time_axis('PAX-1')['num'], build_time_axis(replacement)['num'])
+    assert not after['Bscat (1/Mm) [PAX-1]'].equals(before['Bscat (1/Mm) [PAX-1]'])
@@ -0,0 +1,44 @@
+import numpy as np
+
+from memo import Memo, estimate_bytes
+
+def block(kb):
+    return np.zeros(kb * 1024 // 8)
+
+def test_least_recently_used_entries_are_evicted_first():
+    memo = Memo(max_bytes=3 * 1024)
+    for key in 'abc':
+        memo.put(key, block(1))
+    assert memo.get('a') is not None  # 'b' is now the oldest
+    memo.put('d', block(1))
+    assert 'b' not in memo and all(key in memo for key in 'acd')
+    assert memo.evictions == 1 and memo.current_bytes == 3 * 1024
+
+def test_budget_counts_bytes_not_entries():
+    memo = Memo(max_bytes=4 * 1024)
+    memo.put('small', block(1))
+    memo.put('large', block(3))
+    memo.put('more', block(2))
+    assert list(memo._entries) == ['more'] and memo.evictions == 2
+    assert memo.current_bytes == estimate_bytes(block(2)) <= memo.max_bytes
+
+def test_value_over_the_budget_is_not_cached():
+    memo = Memo(max_bytes=2 * 1024)
+    memo.put('key', block(1))
+    memo.put('key', block(4))
+    # The old value would be stale, so it goes too
+    assert 'key' not in memo and memo.current_bytes == 0
+    value, hit = memo.get_or_compute('key', lambda: block(4))
+    assert not hit and len(value) == 512 and len(memo) == 0
+
+def test_get_or_compute_counts_hits_and_misses():
+    memo = Memo(max_bytes=1024 * 1024)
+    calls = []
+    compute = lambda: calls.append(1) or block(1)
+    assert memo.get_or_compute(('col', 3), compute)[1] is False
+    assert memo.get_or_compute(('col', 3), compute)[1] is True
+    assert memo.get_or_compute(('col', 4), compute)[1] is False
+    stats = memo.stats()
+    assert len(calls) == 2 and (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 2)
+    memo.clear()
+    assert memo.current_bytes == 0 and memo.stats()['hits'] == 1
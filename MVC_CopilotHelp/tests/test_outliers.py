@@ -0,0 +1,50 @@
+import numpy as np
+
+from outliers import hampel_outliers, is_outlier_column, outlier_column_name
+
+def naive_hampel(values, window, n_sigmas=3.0):
+    """Per-sample reference: window centred on each valid sample, clamped to the valid ends."""
+    x = values[np.isfinite(values)]
+    half = min(window // 2, (len(x) - 1) // 2)
+    spikes = np.zeros(len(x), dtype=bool)
+    for i in range(len(x)):
+        start = min(max(i - half, 0), len(x) - 2 * half - 1)
+        chunk = x[start:start + 2 * half + 1]
+        median = np.median(chunk)
+        spikes[i] = abs(x[i] - median) > n_sigmas * 1.4826 * np.median(np.abs(chunk - median))
+    outliers = np.zeros(len(values), dtype=bool)
+    outliers[np.isfinite(values)] = spikes
+    return outliers
+
+def test_matches_a_per_sample_loop():
+    rng = np.random.default_rng(0)
+    values = np.sin(np.linspace(0, 20, 1000)) * 50 + rng.normal(0, 1, 1000)
+    values[rng.choice(1000, 25, replace=False)] += 30
+    for window in (5, 21, 60):
+        assert (hampel_outliers(values, window=window) == naive_hampel(values, window | 1)).all()
+
+def test_nans_are_skipped_not_flagged():
+    rng = np.random.default_rng(1)
+    values = rng.normal(0, 1, 300)
+    values[150] = 40.0
+    values[[10, 149, 151, 152]] = np.nan  # The spike's neighbours are gone; the window spans the next valid samples
+    spikes = hampel_outliers(values, window=7)
+    assert spikes[150] and not spikes[np.isnan(values)].any()
+    assert (spikes == naive_hampel(values, 7)).all()
+    assert not hampel_outliers(np.full(50, np.nan)).any()
+
+def test_spikes_in_the_edge_windows():
+    values = np.random.default_rng(2).normal(0, 1, 200)
+    values[[0, 2, 197, 199]] = [25.0, -25.0, 25.0, 25.0]
+    spikes = hampel_outliers(values, window=21)
+    assert spikes[[0, 2, 197, 199]].all() and (spikes == naive_hampel(values, 21)).all()
+
+def test_short_inputs():
+    assert not hampel_outliers([1.0, 100.0]).any()
+    # A window longer than the data shrinks to the whole series
+    values = np.array([1.0, 1.1, 0.9, 1.0, 50.0, 1.05, 0.95])
+    assert hampel_outliers(values, window=101).tolist() == [False] * 4 + [True, False, False]
+
+def test_outlier_column_names():
+    assert outlier_column_name('Bscat (1/Mm)') == 'Bscat (1/Mm) outlier'
+    assert is_outlier_column('Bscat (1/Mm) outlier') and not is_outlier_column('Bscat (1/Mm)') and not is_outlier_column(3)
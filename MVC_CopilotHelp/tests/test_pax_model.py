@@ -0,0 +1,51 @@
+import gc
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_pax_frame
+from pax_model import calculate_extinction_coefficient_drift, get_mode_segments, get_time_axis
+from segments import ModeSegments
+
+def test_time_axis_not_taken_from_a_freed_frame():
+    # Frames of the same length created one after another often reuse a freed id
+    for day in range(1, 20):
+        df = pd.DataFrame({'time': pd.date_range(f'2025-01-{day:02d}', periods=1000, freq='s')})
+        assert get_time_axis(df)['epoch_ns'][0] == df['time'].iloc[0].value
+        del df
+        gc.collect()
+
+def test_mode_segments_follow_the_frame():
+    for seed in range(5):
+        df = make_pax_frame(rows=3000, seed=seed)
+        if seed % 2:
+            df['Mode'] = 'Sampling'
+        expected = ModeSegments.from_df(df).mask_for('Sampling only')
+        assert (get_mode_segments(df).mask_for('Sampling only') == expected).all()
+        del df
+
+def test_unmapped_mode_codes_are_reported(capsys):
+    segments = ModeSegments([0, 0, 1, 1, 7, 7, 0])
+    assert segments.states.tolist() == ['sampling', 'zero', 'mode 7', 'sampling']
+    assert 'mode 7' in capsys.readouterr().out
+    assert segments.mask_for('Sampling only', trim=0).tolist() == [True, True, False, False, False, False, True]
+
+def test_drift_baseline_uses_zero_and_flush_runs():
+    df = make_pax_frame(rows=3000)
+    # Zero run at the start, a flush run in the middle, sampling elsewhere (codes from pax_config)
+    df['Mode'] = np.where(np.arange(3000) < 100, 1, np.where((np.arange(3000) >= 1500) & (np.arange(3000) < 1600), 2, 0))
+    df['Detected Laser power (W)'] = np.where(np.arange(3000) < 1500, 0.05, 0.04)
+    _, info = calculate_extinction_coefficient_drift(df)
+    assert [(a, b) for a, b, _ in info['periods']] == [(10, 100), (1510, 1600)]
+    assert info['baseline_min'] == pytest.approx(0.04) and info['baseline_max'] == pytest.approx(0.05)
+
+@pytest.mark.parametrize('module', ['pax_model', 'batch_export', 'batch_calibration'])
+def test_headless_modules_leave_gui_state_alone(module):
+    code = f"import sys, {module}; print(sorted({{'constants', 'tkinter', 'data_processing'}} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == '[]'
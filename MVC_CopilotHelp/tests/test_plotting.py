@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+from conftest import make_pax_frame
+from data_store import DataStore
+from plotting import compute_xy_view, plot_xy
+
+def test_xy_plot_of_a_mostly_nan_region_is_a_scatter_plot():
+    df = make_pax_frame(rows=5000)
+    df.loc[10:, 'Babs (1/Mm)'] = np.nan
+    fig = Figure()
+    plot_xy(df, 'Bscat (1/Mm)', 'Babs (1/Mm)', fig, threshold=100)
+    assert len(fig.axes[0].collections[0].get_offsets()) == 10
+    assert len(fig.axes) == 1  # No colorbar, so no density mesh
+
+def test_xy_plot_bins_many_points():
+    df = make_pax_frame(rows=5000)
+    fig = Figure()
+    plot_xy(df, 'Bscat (1/Mm)', 'Babs (1/Mm)', fig, threshold=100)
+    assert len(fig.axes) == 2  # Density mesh with its colorbar
+
+def test_cached_xy_view_converts_no_column(monkeypatch):
+    import plotting
+    df = make_pax_frame(rows=5000)
+    version = (DataStore().uid, 1)
+    first = compute_xy_view(df, 'Bscat (1/Mm)', 'Babs (1/Mm)', threshold=100, data_version=version)
+    monkeypatch.setattr(plotting, '_xy_values', lambda *args: pytest.fail("columns converted again"))
+    fig = Figure()
+    plot_xy(df, 'Bscat (1/Mm)', 'Babs (1/Mm)', fig, threshold=100, data_version=version)
+    assert first['count'] == 5000 and len(fig.axes) == 2
+
+def test_xy_views_of_two_stores_never_mix():
+    df, other = make_pax_frame(rows=5000), make_pax_frame(rows=5000, seed=1)
+    other.loc[100:, 'Babs (1/Mm)'] = np.nan
+    first = compute_xy_view(df, 'Bscat (1/Mm)', 'Babs (1/Mm)', threshold=100, data_version=(DataStore().uid, 1))
+    second = compute_xy_view(other, 'Bscat (1/Mm)', 'Babs (1/Mm)', threshold=100, data_version=(DataStore().uid, 1))
+    assert first['count'] == 5000 and second['count'] == 100 and 'x' in second
+
+def test_render_cache_blits_a_view_before_it_is_built():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from plotting import RenderCache
+    fig = Figure(figsize=(3, 2))
+    canvas = FigureCanvasAgg(fig)
+    canvas.blit = lambda bbox=None: None  # Agg has nothing to push to a screen
+    cache = RenderCache()
+    fig.add_subplot(1, 1, 1).plot([0, 1], [0, 1])
+    assert not cache.blit(canvas, 'view')
+    cache.draw(canvas, 'view')
+    drawn = np.asarray(canvas.get_renderer().buffer_rgba()).copy()
+
+    fig.clear()
+    canvas.draw()
+    assert cache.blit(canvas, 'view')
+    np.testing.assert_array_equal(np.asarray(canvas.get_renderer().buffer_rgba()), drawn)
+
+def test_subplot_grid_predicts_the_visible_panels():
+    from plotting import SubplotGrid
+    df = make_pax_frame()
+    grid = SubplotGrid(Figure(), panels_per_view=2)
+    grid.show(df, (1, 2, 3, 4), (0, 10, 20, 30))
+    grid.scroll_to(2)
+    assert grid.visible_range((1, 2, 3)) == (1, 3)
+    grid.show(df, (1, 2, 3), (0, 10, 20, 30))
+    assert grid.visible_range() == (1, 3)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from conftest import make_pax_frame
+from data_store import DataStore
+from session import load_session, read_session_header, release_session, save_session, session_is_mapped
+
+def test_round_trip_keeps_data_and_state(tmp_path):
+    path = str(tmp_path / 'day.paxsession')
+    df = make_pax_frame()
+    df.loc[5, 'Bscat (1/Mm)'] = np.nan
+    df.loc[7, 'Alarm'] = None
+    state = {'sliders': {'i0_low': np.int64(0), 'i0_high': 200}, 'notes': 'Cal after cleaning'}
+    save_session(path, df, state)
+    loaded, loaded_state = load_session(path)
+    pd.testing.assert_frame_equal(loaded.copy(), df)
+    assert loaded_state == {'sliders': {'i0_low': 0, 'i0_high': 200}, 'notes': 'Cal after cleaning'}
+    assert read_session_header(path)[0]['rows'] == len(df)
+
+def test_round_trip_of_time_zones_and_index(tmp_path):
+    path = str(tmp_path / 'tz.paxsession')
+    df = make_pax_frame()
+    df['time'] = df['time'].dt.tz_localize('Europe/Berlin')
+    df.index = pd.Index(np.arange(len(df)) * 2 + 10, name='row')
+    save_session(path, df)
+    loaded, _ = load_session(path)
+    pd.testing.assert_frame_equal(loaded.copy(), df)
+
+def test_round_trip_of_an_empty_frame(tmp_path):
+    path = str(tmp_path / 'empty.paxsession')
+    df = make_pax_frame().iloc[:0]
+    save_session(path, df)
+    loaded, state = load_session(path)
+    assert list(loaded.columns) == list(df.columns) and loaded.empty and state == {}
+
+def test_bool_and_nullable_columns_keep_their_dtype(tmp_path):
+    path = str(tmp_path / 'flags.paxsession')
+    df = make_pax_frame()
+    df['Valid'] = df['Bscat (1/Mm)'] > 0
+    df['Checked'] = pd.array([True, None, False] * (len(df) // 3), dtype='boolean')
+    df['Count'] = pd.array([1, None, 3] * (len(df) // 3), dtype='Int64')
+    save_session(path, df)
+    loaded, _ = load_session(path)
+    pd.testing.assert_frame_equal(loaded.copy(), df)
+
+def test_save_over_the_open_session(tmp_path):
+    path = str(tmp_path / 'week.paxsession')
+    df = make_pax_frame()
+    save_session(path, df)
+
+    store = DataStore()
+    store.replace(load_session(path)[0])
+    edited = store.df.copy()
+    edited['Bscat (1/Mm)'] = 0.0
+    store.update_columns(['Bscat (1/Mm)'], edited, label="Zero Bscat")
+    assert session_is_mapped(path)
+
+    assert release_session(path, store)
+    assert not any(isinstance(store.df[column].to_numpy(), np.memmap) for column in store.df.columns)
+    save_session(path, store.df)
+    assert (load_session(path)[0]['Bscat (1/Mm)'] == 0).all()
+
+    # The undo history was moved into memory too and still holds the original values
+    store.undo()
+    pd.testing.assert_frame_equal(store.df.copy(), df)